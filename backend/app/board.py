@@ -0,0 +1,88 @@
+"""Change notifications for the admin kanban board (``/ws/kanban``).
+
+A card is the part of a conversation the board shows: its status, the admin
+holding it, and whether it is active or waiting for a human. Whenever tools
+change one of those, they ``publish`` the card. Every connected board
+receives it, so boards do not have to poll ``/api/admin/conversations``.
+
+``publish`` may be called from the event loop or a worker thread: some
+handlers call tools directly on the loop, others through the threadpool. It
+hands the encoded event to the event loop the subscribers live on. A
+subscriber that falls ``MAX_PENDING`` events behind gets its queue replaced
+by a single ``resync`` event, telling it to fetch the board again.
+"""
+import asyncio
+import threading
+from typing import Any, Dict, Optional, Set
+
+from app import serialization
+from app.records import MISSING, Conversation, unpack_timestamp
+
+MAX_PENDING = 1000
+RESYNC = serialization.dumps_text({"type": "resync"})
+
+
+def _value(value: Any) -> Any:
+    return None if value is MISSING else value
+
+
+def card(conversation: Conversation) -> Dict[str, Any]:
+    """The board fields of a conversation"""
+    return {
+        "conversation_id": _value(conversation.conversation_id),
+        "customer_name": _value(conversation.customer_name),
+        "problem_type": _value(conversation.problem_type),
+        "status": _value(conversation.status),
+        "admin_user": _value(conversation.admin_user),
+        "requires_human": _value(conversation.requires_human),
+        "is_active": _value(conversation.is_active),
+        "last_updated": unpack_timestamp(_value(conversation.last_updated))
+    }
+
+
+class Board:
+    """Subscribers to card changes, each an asyncio.Queue of encoded events"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def subscribe(self) -> asyncio.Queue:
+        """A queue of events for one board (call from the event loop)"""
+        queue: asyncio.Queue = asyncio.Queue()
+        with self.lock:
+            self._loop = asyncio.get_running_loop()
+            self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self.lock:
+            self.subscribers.discard(queue)
+
+    def publish(self, conversation: Conversation, action: str):
+        """Send the conversation's card to every board (from the loop or a worker thread)"""
+        with self.lock:
+            if not self.subscribers:
+                return
+            loop = self._loop
+        frame = serialization.dumps_text({"type": "conversation_updated", "action": action, "conversation": card(conversation)})
+        try:
+            loop.call_soon_threadsafe(self._deliver, frame)
+        except RuntimeError:
+            # The loop has closed (shutdown)
+            pass
+
+    def _deliver(self, frame: str):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for queue in subscribers:
+            if queue.qsize() >= MAX_PENDING:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+            else:
+                queue.put_nowait(frame)
+
+
+board = Board()
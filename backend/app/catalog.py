@@ -0,0 +1,302 @@
+"""Per-tenant policy and service-provider catalogs, reloaded without a restart.
+
+``CATALOG_DIR`` holds one directory per tenant (insurer)::
+
+    catalogs/
+        acme/
+            policies.json    # or policies.db - anything open_policy_store reads
+            providers.json   # {"repair_trucks": [...], "garages": [...]}, like SERVICE_PROVIDERS
+            tenant.json      # optional: {"customer_location": {"lat", "lon", "address_estimate"},
+                             #            "prompt_policy": "<policy number the prompts describe>"}
+
+A ``Catalog`` is one tenant's data with everything derived from it built up
+front: the policy store and its fuzzy name index, the compiled prompts, and
+a ``SpatialIndex`` per provider type for dispatch. It is never modified
+once built.
+
+``run()`` polls the tenant files and rebuilds any tenant whose files
+changed, off the event loop, then swaps the new snapshot in by replacing
+the registry's dict. ``POST /api/admin/catalogs/reload`` does the same on
+demand. A tenant that fails to load keeps serving its previous snapshot.
+
+Each HTTP request is bound to its tenant's snapshot once (``bind``, from the
+``X-Tenant-ID`` header or a ``tenant`` query parameter), and ``current()``
+returns that snapshot for the rest of the request, so a reload that lands
+mid-request does not mix two versions. WebSockets live for hours, so they
+are bound to the tenant and see each reload.
+
+The ``DEFAULT_TENANT`` serves requests that name no tenant. Without a
+directory of its own it is the built-in demo data (``tools.JOHN_DOE_POLICY``,
+``SERVICE_PROVIDERS`` and ``CUSTOMER_LOCATION``) with the
+``POLICY_STORE_PATH`` policy store.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from app import policy_store, prompts
+from app.geo import SpatialIndex
+from app.log import log_event
+
+logger = logging.getLogger(__name__)
+
+CATALOG_DIR = os.getenv("CATALOG_DIR")
+DEFAULT_TENANT = os.getenv("DEFAULT_TENANT", "default")
+# How often run() checks the tenant files for changes
+CHECK_INTERVAL = float(os.getenv("CATALOG_CHECK_INTERVAL", 5))
+
+POLICY_FILES = ("policies.json", "policies.db", "policies.sqlite", "policies.sqlite3")
+PROVIDERS_FILE = "providers.json"
+SETTINGS_FILE = "tenant.json"
+DEFAULT_ADDRESS_ESTIMATE = "Near Harrow, London"
+
+BUILTIN = (("builtin",),)
+
+
+class Catalog(NamedTuple):
+    """One tenant's policies and providers with their indexes; never modified once built"""
+    tenant: str
+    version: str
+    signature: Tuple
+    loaded_at: float
+    policies: policy_store.PolicyStore
+    # The policy whose coverage wording the prompts describe
+    policy: Dict[str, Any]
+    prompts: prompts.PromptSet
+    providers: Dict[str, List[Dict[str, Any]]]
+    trucks: Dict[str, SpatialIndex]
+    garages: SpatialIndex
+    location: Dict[str, Any]
+
+    def nearest_provider(self, provider_type: str, lat: float, lon: float) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """(distance km, provider) of the closest provider of this type"""
+        index = self.trucks.get(provider_type)
+        return index.nearest(lat, lon) if index else None
+
+    def nearest_garage(self, lat: float, lon: float) -> Optional[Tuple[float, Dict[str, Any]]]:
+        return self.garages.nearest(lat, lon)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "tenant": self.tenant,
+            "version": self.version,
+            "loaded_at": datetime.fromtimestamp(self.loaded_at).isoformat(),
+            "policies": len(self.policies),
+            "providers": {provider_type: len(index) for provider_type, index in self.trucks.items()},
+            "garages": len(self.garages),
+            "prompt_version": self.prompts.version
+        }
+
+
+def _version(signature: Tuple) -> str:
+    return "builtin" if signature == BUILTIN else f"{zlib.crc32(repr(signature).encode()):08x}"
+
+
+def build_catalog(tenant: str, policies: policy_store.PolicyStore, providers: Dict[str, Any],
+                  location: Dict[str, Any], policy: Dict[str, Any], signature: Tuple = BUILTIN) -> Catalog:
+    """A catalog with its indexes built (slow for large tenants - call off the event loop)"""
+    trucks: Dict[str, List[Dict[str, Any]]] = {}
+    for provider in providers["repair_trucks"]:
+        trucks.setdefault(provider["type"], []).append(provider)
+    policies.name_index()
+    return Catalog(
+        tenant=tenant,
+        version=_version(signature),
+        signature=signature,
+        loaded_at=time.time(),
+        policies=policies,
+        policy=policy,
+        prompts=prompts.compile_prompts(policy),
+        providers=providers,
+        trucks={provider_type: SpatialIndex(points) for provider_type, points in trucks.items()},
+        garages=SpatialIndex(providers["garages"]),
+        location={"address_estimate": DEFAULT_ADDRESS_ESTIMATE, **location}
+    )
+
+
+def _validate_providers(providers: Any) -> Dict[str, List[Dict[str, Any]]]:
+    if not isinstance(providers, dict):
+        raise ValueError(f"{PROVIDERS_FILE} must be an object with repair_trucks and garages")
+    for key in ("repair_trucks", "garages"):
+        for provider in providers.get(key, []):
+            if not isinstance(provider.get("lat"), (int, float)) or not isinstance(provider.get("lon"), (int, float)):
+                raise ValueError(f"{key} entry {provider.get('name')!r} needs numeric lat and lon")
+            if key == "repair_trucks" and not provider.get("type"):
+                raise ValueError(f"repair_trucks entry {provider.get('name')!r} needs a type")
+    return {"repair_trucks": providers.get("repair_trucks", []), "garages": providers.get("garages", [])}
+
+
+def load_builtin(tenant: str = DEFAULT_TENANT) -> Catalog:
+    """The built-in demo data, with the configured policy store"""
+    from app.tools import CUSTOMER_LOCATION, JOHN_DOE_POLICY, SERVICE_PROVIDERS
+    providers = {key: list(value) for key, value in SERVICE_PROVIDERS.items()}
+    return build_catalog(tenant, policy_store.get_policy_store(), providers, dict(CUSTOMER_LOCATION), JOHN_DOE_POLICY)
+
+
+def load_tenant(tenant: str, directory: str, signature: Tuple) -> Catalog:
+    """Read and index one tenant's directory"""
+    from app.tools import CUSTOMER_LOCATION, JOHN_DOE_POLICY
+    policies_path = next((os.path.join(directory, name) for name in POLICY_FILES
+                          if os.path.isfile(os.path.join(directory, name))), None)
+    if policies_path is None:
+        raise FileNotFoundError(f"no policies file ({', '.join(POLICY_FILES)})")
+    with open(os.path.join(directory, PROVIDERS_FILE), 'r') as f:
+        providers = _validate_providers(json.load(f))
+    settings: Dict[str, Any] = {}
+    settings_path = os.path.join(directory, SETTINGS_FILE)
+    if os.path.isfile(settings_path):
+        with open(settings_path, 'r') as f:
+            settings = json.load(f)
+
+    policies = policy_store.open_policy_store(policies_path)
+    policy = JOHN_DOE_POLICY
+    if settings.get("prompt_policy"):
+        entry = policies.find_by_number(settings["prompt_policy"])
+        if entry is None:
+            raise ValueError(f"prompt_policy {settings['prompt_policy']!r} is not in {os.path.basename(policies_path)}")
+        policy = entry.policy
+    location = settings.get("customer_location") or CUSTOMER_LOCATION
+    return build_catalog(tenant, policies, providers, dict(location), policy, signature)
+
+
+def _signature(directory: Optional[str]) -> Tuple:
+    """What a tenant's snapshot was built from: (file, mtime, size) of each of its files"""
+    if directory is None:
+        return BUILTIN
+    signature = []
+    for name in (*POLICY_FILES, PROVIDERS_FILE, SETTINGS_FILE):
+        try:
+            stat = os.stat(os.path.join(directory, name))
+        except OSError:
+            continue
+        signature.append((name, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _sources(catalog_dir: Optional[str]) -> Dict[str, Optional[str]]:
+    """Tenant -> its directory (None for the built-in data)"""
+    sources: Dict[str, Optional[str]] = {}
+    if catalog_dir and os.path.isdir(catalog_dir):
+        for name in sorted(os.listdir(catalog_dir)):
+            path = os.path.join(catalog_dir, name)
+            if os.path.isdir(path) and not name.startswith("."):
+                sources[name] = path
+    sources.setdefault(DEFAULT_TENANT, None)
+    return sources
+
+
+class Catalogs:
+    """The current snapshot of every tenant; reloads replace the whole dict"""
+
+    def __init__(self, catalog_dir: Optional[str] = CATALOG_DIR):
+        self.catalog_dir = catalog_dir
+        # Serializes reloads; readers never take it
+        self.lock = threading.Lock()
+        self.snapshots: Dict[str, Catalog] = {}
+        self.errors: Dict[str, Dict[str, Any]] = {}
+        self.loaded = False
+
+    def get(self, tenant: Optional[str] = None) -> Optional[Catalog]:
+        """The tenant's current snapshot (the default tenant's for None)"""
+        if not self.loaded:
+            self.refresh()
+        return self.snapshots.get(tenant or DEFAULT_TENANT)
+
+    def install(self, catalog: Catalog):
+        """Serve this snapshot for its tenant until the next reload of it"""
+        with self.lock:
+            self.snapshots = {**self.snapshots, catalog.tenant: catalog}
+            self.loaded = True
+
+    def refresh(self, force: bool = False, tenant: Optional[str] = None) -> Dict[str, List[str]]:
+        """Rebuild tenants whose files changed (all of them with force, or only the named one)"""
+        result: Dict[str, List[str]] = {"loaded": [], "unchanged": [], "failed": [], "removed": []}
+        with self.lock:
+            sources = _sources(self.catalog_dir)
+            snapshots = {name: catalog for name, catalog in self.snapshots.items() if name in sources}
+            result["removed"] = sorted(set(self.snapshots) - set(snapshots))
+            for name, directory in sources.items():
+                if tenant is not None and name != tenant:
+                    continue
+                signature = _signature(directory)
+                previous = snapshots.get(name)
+                failed = self.errors.get(name)
+                if not force and previous and previous.signature == signature:
+                    result["unchanged"].append(name)
+                    continue
+                if not force and failed and failed["signature"] == signature:
+                    result["failed"].append(name)
+                    continue
+                started = time.perf_counter()
+                try:
+                    catalog = load_tenant(name, directory, signature) if directory else load_builtin(name)
+                except Exception as e:
+                    self.errors[name] = {"signature": signature, "error": f"{type(e).__name__}: {e}",
+                                         "failed_at": datetime.now().isoformat()}
+                    result["failed"].append(name)
+                    log_event(logger, logging.ERROR, "catalog_load_failed", tenant=name,
+                              error_type=type(e).__name__, error=str(e), serving=previous.version if previous else None)
+                    continue
+                snapshots[name] = catalog
+                self.errors.pop(name, None)
+                result["loaded"].append(name)
+                log_event(logger, logging.INFO, "catalog_loaded", tenant=name, version=catalog.version,
+                          policies=len(catalog.policies), providers=len(catalog.providers["repair_trucks"]),
+                          seconds=round(time.perf_counter() - started, 3))
+            if DEFAULT_TENANT not in snapshots:
+                # The default tenant's directory has never loaded; serve the built-in data meanwhile
+                snapshots[DEFAULT_TENANT] = load_builtin()
+            for name in result["removed"]:
+                self.errors.pop(name, None)
+            self.snapshots = snapshots
+            self.loaded = True
+        return result
+
+    def status(self) -> Dict[str, Any]:
+        snapshots = self.snapshots
+        return {
+            "catalog_dir": self.catalog_dir,
+            "default_tenant": DEFAULT_TENANT,
+            "catalogs": [catalog.summary() for catalog in snapshots.values()],
+            "errors": {name: {k: v for k, v in error.items() if k != "signature"} for name, error in self.errors.items()}
+        }
+
+
+catalogs = Catalogs()
+
+_tenant_var: ContextVar[Optional[str]] = ContextVar("tenant", default=None)
+_catalog_var: ContextVar[Optional[Catalog]] = ContextVar("catalog", default=None)
+
+
+def bind(tenant: Optional[str], pin: bool = True) -> Optional[Catalog]:
+    """Serve the current context from this tenant's catalog - pinned to today's snapshot, or following reloads"""
+    catalog = catalogs.get(tenant)
+    if catalog is not None:
+        _tenant_var.set(catalog.tenant)
+        _catalog_var.set(catalog if pin else None)
+    return catalog
+
+
+def current() -> Catalog:
+    """The catalog bound to this request, else the default tenant's current one"""
+    catalog = _catalog_var.get()
+    if catalog is None:
+        catalog = catalogs.get(_tenant_var.get()) or catalogs.get()
+    return catalog
+
+
+async def run(check_interval: float = CHECK_INTERVAL):
+    """Reload tenants whose files changed until cancelled"""
+    while True:
+        try:
+            await asyncio.to_thread(catalogs.refresh)
+        except Exception as e:
+            log_event(logger, logging.ERROR, "catalog_refresh_failed", error_type=type(e).__name__, error=str(e))
+        await asyncio.sleep(check_interval)
@@ -0,0 +1,295 @@
+"""Local problem-type classifier tier that runs before the LLM.
+
+A small TF-IDF + multinomial logistic regression model trained from the stored
+claim and conversation history. ``classify`` answers high-confidence cases
+in-process; low-confidence or exclusion-ambiguous descriptions return ``None``
+so ``analyze_problem_description`` escalates them to the LLM.
+
+Training and evaluation CLI (run from ``backend/``):
+
+    python -m app.classifier train --claims ../claims.json claims.json \\
+        --conversations ../conversations.json conversations.json
+    python -m app.classifier report --claims ../claims.json claims.json \\
+        --conversations ../conversations.json conversations.json
+"""
+import argparse
+import json
+import math
+import os
+import random
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app import rules
+
+MODEL_FORMAT = "problem-type-classifier"
+MODEL_VERSION = 1
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "problem_classifier.json")
+MODEL_PATH = os.getenv("PROBLEM_CLASSIFIER_MODEL", DEFAULT_MODEL_PATH)
+
+DEFAULT_THRESHOLD = 0.8
+
+GENERAL_PROBLEM_TYPE = "general roadside assistance"
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+# Loaded model - None until load_model() finds an artifact
+_model: Optional[Dict[str, Any]] = None
+
+
+# ==================== FEATURES ====================
+def tokenize(text: str) -> List[str]:
+    """Unigrams plus adjacent-word bigrams"""
+    words = _TOKEN_RE.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _tfidf(tokens: List[str], idf: Dict[str, float]) -> Dict[str, float]:
+    """L2-normalised sublinear TF-IDF vector over known terms"""
+    counts: Dict[str, int] = {}
+    for token in tokens:
+        if token in idf:
+            counts[token] = counts.get(token, 0) + 1
+    vector = {t: (1 + math.log(c)) * idf[t] for t, c in counts.items()}
+    norm = math.sqrt(sum(v * v for v in vector.values()))
+    return {t: v / norm for t, v in vector.items()} if norm else {}
+
+
+def _softmax(scores: List[float]) -> List[float]:
+    top = max(scores)
+    exps = [math.exp(s - top) for s in scores]
+    total = sum(exps)
+    return [e / total for e in exps]
+
+
+# ==================== TRAINING DATA ====================
+def canonical_problem_type(label: str) -> Optional[str]:
+    """Map a stored free-text problem_type onto a rule-table problem type"""
+    if not label or label.strip().lower() in ("unknown", ""):
+        return None
+    matched = rules.match_rules(label).problem_type
+    if matched:
+        return matched[0]
+    if label.strip().lower() in ("general roadside assistance", "roadside assistance"):
+        return GENERAL_PROBLEM_TYPE
+    return None
+
+
+def _load_json_list(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else []
+    except (OSError, ValueError):
+        return []
+
+
+def load_training_samples(claims_files: List[str], conversations_files: List[str]) -> List[Tuple[str, str]]:
+    """(text, label) pairs from stored history plus the rule-table keywords"""
+    samples: List[Tuple[str, str]] = []
+
+    # Claims: the recorded problem_type is itself a short description
+    for path in claims_files:
+        for claim in _load_json_list(path):
+            label = canonical_problem_type(claim.get("problem_type", ""))
+            if label:
+                samples.append((claim["problem_type"], label))
+
+    # Conversations: the first customer message is the step-1 description.
+    # The stored problem_type was settled later in the conversation, so a
+    # first message without any problem wording is treated as general, as are
+    # the later customer turns (names, locations, confirmations).
+    for path in conversations_files:
+        for conv in _load_json_list(path):
+            stored_label = canonical_problem_type(conv.get("problem_type", ""))
+            user_messages = [m["content"] for m in conv.get("messages", []) if m.get("type") == "user" and m.get("content")]
+            for position, text in enumerate(user_messages):
+                text_label = canonical_problem_type(text)
+                if position == 0 and text_label:
+                    # A generic stored label says less than the customer's own words
+                    label = text_label if stored_label in (None, GENERAL_PROBLEM_TYPE) else stored_label
+                elif not text_label:
+                    label = GENERAL_PROBLEM_TYPE
+                else:
+                    continue
+                samples.append((text, label))
+
+    # Seed every class with its keywords so rare classes are represented
+    for category, label, keywords in rules.RULES:
+        if category == rules.PROBLEM_TYPE:
+            samples.extend((keyword, label) for keyword in keywords)
+
+    return samples
+
+
+# ==================== MODEL ====================
+def train(samples: List[Tuple[str, str]], epochs: int = 500, learning_rate: float = 2.0, l2: float = 1e-3, threshold: float = DEFAULT_THRESHOLD) -> Dict[str, Any]:
+    """Fit TF-IDF + softmax regression with batch gradient descent"""
+    labels = sorted({label for _, label in samples})
+    label_index = {label: i for i, label in enumerate(labels)}
+
+    tokenized = [tokenize(text) for text, _ in samples]
+    doc_freq: Dict[str, int] = {}
+    for tokens in tokenized:
+        for token in set(tokens):
+            doc_freq[token] = doc_freq.get(token, 0) + 1
+    n_docs = len(samples)
+    idf = {t: math.log((1 + n_docs) / (1 + df)) + 1 for t, df in doc_freq.items()}
+
+    vectors = [_tfidf(tokens, idf) for tokens in tokenized]
+    targets = [label_index[label] for _, label in samples]
+    weights: Dict[str, List[float]] = {t: [0.0] * len(labels) for t in idf}
+    bias = [0.0] * len(labels)
+
+    for _ in range(epochs):
+        grad_w: Dict[str, List[float]] = {}
+        grad_b = [0.0] * len(labels)
+        for vector, target in zip(vectors, targets):
+            scores = list(bias)
+            for term, value in vector.items():
+                for k, w in enumerate(weights[term]):
+                    scores[k] += w * value
+            probs = _softmax(scores)
+            probs[target] -= 1.0
+            for k, p in enumerate(probs):
+                grad_b[k] += p
+            for term, value in vector.items():
+                g = grad_w.setdefault(term, [0.0] * len(labels))
+                for k, p in enumerate(probs):
+                    g[k] += p * value
+        for k in range(len(labels)):
+            bias[k] -= learning_rate * grad_b[k] / n_docs
+        for term, row in weights.items():
+            g = grad_w.get(term)
+            for k in range(len(labels)):
+                row[k] -= learning_rate * ((g[k] / n_docs if g else 0.0) + l2 * row[k])
+
+    return {
+        "format": MODEL_FORMAT,
+        "version": MODEL_VERSION,
+        "trained_at": datetime.now().isoformat(),
+        "training_samples": n_docs,
+        "threshold": threshold,
+        "labels": labels,
+        "bias": [round(b, 6) for b in bias],
+        # term -> [idf, weight per label]
+        "terms": {t: [round(idf[t], 6)] + [round(w, 6) for w in weights[t]] for t in sorted(idf)}
+    }
+
+
+def predict(model: Dict[str, Any], text: str) -> Tuple[str, float]:
+    """Most likely label and its probability"""
+    terms = model["terms"]
+    tokens = tokenize(text)
+    idf = {t: terms[t][0] for t in tokens if t in terms}
+    scores = list(model["bias"])
+    for term, value in _tfidf(tokens, idf).items():
+        for k, w in enumerate(terms[term][1:]):
+            scores[k] += w * value
+    probs = _softmax(scores)
+    best = max(range(len(probs)), key=probs.__getitem__)
+    return model["labels"][best], probs[best]
+
+
+def save_model(model: Dict[str, Any], path: str = None) -> str:
+    path = path or MODEL_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(model, f, indent=1)
+    return path
+
+
+def load_model(path: str = None) -> Optional[Dict[str, Any]]:
+    """Load the model artifact; the tier stays disabled if it is missing or invalid"""
+    global _model
+    path = path or MODEL_PATH
+    try:
+        with open(path, 'r') as f:
+            model = json.load(f)
+    except (OSError, ValueError):
+        model = None
+    if model and (model.get("format") != MODEL_FORMAT or model.get("version") != MODEL_VERSION):
+        model = None
+    _model = model
+    return _model
+
+
+def classify(description: str, location_context: str = None) -> Optional[Tuple[str, float]]:
+    """(problem_type, confidence) for a confident local answer, or None to escalate to the LLM"""
+    if _model is None or not description:
+        return None
+
+    # Anything that may touch an exclusion needs the LLM's tactful handling
+    if rules.match_rules(description).exclusion:
+        return None
+    if location_context and rules.match_rules(location_context).exclusion:
+        return None
+
+    label, confidence = predict(_model, description)
+    threshold = float(os.getenv("PROBLEM_CLASSIFIER_THRESHOLD", _model.get("threshold", DEFAULT_THRESHOLD)))
+    # Vague descriptions are exactly what the LLM is for
+    if confidence < threshold or label == GENERAL_PROBLEM_TYPE:
+        return None
+    return label, confidence
+
+
+# ==================== EVALUATION ====================
+def evaluation_report(samples: List[Tuple[str, str]], thresholds: List[float], folds: int = 5, seed: int = 0, **train_kwargs) -> List[Dict[str, Any]]:
+    """Escalation rate vs accuracy of answered cases, via k-fold cross-validation"""
+    shuffled = list(samples)
+    random.Random(seed).shuffle(shuffled)
+    folds = max(2, min(folds, len(shuffled)))
+
+    predictions = []  # (confidence, correct, exclusion_ambiguous, predicted)
+    for fold in range(folds):
+        held_out = shuffled[fold::folds]
+        training = [s for i, s in enumerate(shuffled) if i % folds != fold]
+        model = train(training, **train_kwargs)
+        for text, label in held_out:
+            predicted, confidence = predict(model, text)
+            predictions.append((confidence, predicted == label, bool(rules.match_rules(text).exclusion), predicted))
+
+    report = []
+    for threshold in thresholds:
+        answered = [correct for confidence, correct, ambiguous, label in predictions
+                    if confidence >= threshold and not ambiguous and label != GENERAL_PROBLEM_TYPE]
+        report.append({
+            "threshold": threshold,
+            "samples": len(predictions),
+            "escalation_rate": round(1 - len(answered) / len(predictions), 3) if predictions else 0.0,
+            "accuracy": round(sum(answered) / len(answered), 3) if answered else None
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or evaluate the local problem-type classifier")
+    parser.add_argument("command", choices=["train", "report"])
+    parser.add_argument("--claims", nargs="*", default=["claims.json"])
+    parser.add_argument("--conversations", nargs="*", default=["conversations.json"])
+    parser.add_argument("--out", default=MODEL_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--epochs", type=int, default=500)
+    parser.add_argument("--folds", type=int, default=5)
+    args = parser.parse_args()
+
+    samples = load_training_samples(args.claims, args.conversations)
+    print(f"Loaded {len(samples)} training samples")
+
+    if args.command == "train":
+        model = train(samples, epochs=args.epochs, threshold=args.threshold)
+        print(f"Saved model with {len(model['terms'])} terms and labels {model['labels']} to {save_model(model, args.out)}")
+    else:
+        thresholds = [0.5, 0.6, 0.7, 0.8, 0.9, 0.95]
+        print(f"{'threshold':>9}  {'escalation':>10}  {'accuracy':>8}")
+        for row in evaluation_report(samples, thresholds, folds=args.folds, epochs=args.epochs):
+            accuracy = f"{row['accuracy']:.3f}" if row["accuracy"] is not None else "-"
+            print(f"{row['threshold']:>9.2f}  {row['escalation_rate']:>10.3f}  {accuracy:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Per-conversation status channels for the customer view.
+
+``process_claim`` and ``confirm_dispatch`` publish a status event (the
+line the customer sees, such as "Help is on the way") to the conversation
+they were called for. Each event has a sequence number that grows per
+conversation. Publishing:
+
+- keeps the event as the channel's latest (the ``MAX_CHANNELS`` most
+  recently used channels stay in memory);
+- stores it on the conversation record as ``status_update``, when the
+  conversation exists, so it survives a restart and any worker reading the
+  store sees it;
+- wakes long-polls waiting on that conversation (``wait``).
+
+The stored record is the source of truth across workers: ``latest`` uses
+the in-memory event only while it is at least as new as the stored one,
+``publish`` numbers the next event after the higher of the two, and
+long-polls re-read the store every ``STORE_POLL_INTERVAL`` seconds so they
+also see events published by another worker.
+
+``main`` pushes the same event over the conversation's WebSockets. Clients
+without a socket long-poll ``/api/get_status?conversation_id=&since=``.
+It answers as soon as there is an event newer than ``since``, or after the
+wait with ``null``.
+
+Channels are used from the event loop only; their store reads and writes run
+in worker threads (``asyncio.to_thread``), since the store's lock may be held
+by a threadpool writer and a save writes the file.
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app import storage
+from app.log import log_event
+
+logger = logging.getLogger(__name__)
+
+MAX_CHANNELS = 10_000
+MAX_WAIT = 30.0
+# Seconds between a long-poll's reads of the store
+STORE_POLL_INTERVAL = 1.0
+
+
+class StatusChannels:
+    def __init__(self):
+        self._latest: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # conversation_id -> [Event set by the next publish, long-polls waiting on it]
+        self._waiters: Dict[str, List[Any]] = {}
+
+    def _remember(self, conversation_id: str, event: Dict[str, Any]):
+        self._latest[conversation_id] = event
+        self._latest.move_to_end(conversation_id)
+        while len(self._latest) > MAX_CHANNELS:
+            self._latest.popitem(last=False)
+
+    async def latest(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """The conversation's last status event: the newer of the in-memory and stored ones"""
+        stored = await asyncio.to_thread(_load_event, conversation_id)
+        event = self._latest.get(conversation_id)
+        if stored is not None and (event is None or stored["seq"] > event["seq"]):
+            # Published by another worker (or before a restart)
+            event = stored
+        if event is not None:
+            self._remember(conversation_id, event)
+        return event
+
+    async def publish(self, conversation_id: str, message: str, status: str) -> Dict[str, Any]:
+        previous = self._latest.get(conversation_id)
+        event = {
+            "seq": _next_seq(previous),
+            "message": message,
+            "status": status,
+            "timestamp": datetime.now().isoformat()
+        }
+        try:
+            stored = await asyncio.to_thread(_store_event, conversation_id, event)
+        except Exception as e:
+            # The event is still served from memory and pushed; only persistence failed
+            log_event(logger, logging.WARNING, "status_persist_failed", error_type=type(e).__name__, error=str(e))
+            stored = False
+        current = self._latest.get(conversation_id)
+        if not stored and current is not None and current["seq"] >= event["seq"]:
+            # Only in memory, and another publish got there while this one was away
+            event["seq"] = current["seq"] + 1
+        if current is None or event["seq"] > current["seq"]:
+            self._remember(conversation_id, event)
+
+        waiter = self._waiters.pop(conversation_id, None)
+        if waiter is not None:
+            waiter[0].set()
+        return event
+
+    async def wait(self, conversation_id: str, since: int = 0, timeout: float = MAX_WAIT) -> Optional[Dict[str, Any]]:
+        """The latest event if its seq is past since, waiting up to timeout for one; else None"""
+        event = await self.latest(conversation_id)
+        if event is not None and event["seq"] > since:
+            return event
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + min(timeout, MAX_WAIT)
+        while (remaining := deadline - loop.time()) > 0:
+            # Woken by a publish in this worker, or after the interval to read the store
+            await self._wake(conversation_id, min(remaining, STORE_POLL_INTERVAL))
+            event = await self.latest(conversation_id)
+            if event is not None and event["seq"] > since:
+                return event
+        return None
+
+    async def _wake(self, conversation_id: str, timeout: float):
+        """Wait up to timeout for the conversation's next publish in this worker"""
+        waiter = self._waiters.setdefault(conversation_id, [asyncio.Event(), 0])
+        waiter[1] += 1
+        try:
+            await asyncio.wait_for(waiter[0].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            waiter[1] -= 1
+            # The last long-poll left without an event: drop the entry
+            if not waiter[1] and self._waiters.get(conversation_id) is waiter:
+                del self._waiters[conversation_id]
+
+
+def _stored_event(conv: Any) -> Optional[Dict[str, Any]]:
+    """The status event on a conversation record, if it has a valid one"""
+    if conv is None or not conv.extra:
+        return None
+    event = conv.extra.get("status_update")
+    if isinstance(event, dict) and isinstance(event.get("seq"), int):
+        return event
+    return None
+
+
+def _load_event(conversation_id: str) -> Optional[Dict[str, Any]]:
+    return _stored_event(storage.conversations().get(conversation_id))
+
+
+def _store_event(conversation_id: str, event: Dict[str, Any]) -> bool:
+    """Store the event on the conversation, numbered after the stored one; False if there is no conversation"""
+    conversations = storage.conversations()
+    with conversations.lock:
+        conv = conversations.get(conversation_id)
+        if conv is None:
+            return False
+        event["seq"] = max(event["seq"], _next_seq(_stored_event(conv)))
+        conv.set("status_update", event)
+        conversations.save(conversation_id)
+    return True
+
+
+def _next_seq(*events: Optional[Dict[str, Any]]) -> int:
+    return max((event["seq"] for event in events if event is not None), default=0) + 1
+
+
+channels = StatusChannels()
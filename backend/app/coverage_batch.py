@@ -0,0 +1,190 @@
+"""Bulk coverage re-evaluation for /api/check_coverage/batch.
+
+Descriptions are deduplicated, answered from the result cache, the local
+classifier or a decisive rule-engine match where possible, and only the rest
+reach the LLM - grouped into multi-description calls under a concurrency
+limit. Results are yielded as events in completion order so the endpoint can
+stream them as NDJSON with progress reporting.
+
+The classifier and rule tiers run in worker threads, ``LOCAL_CHUNK_SIZE``
+descriptions at a time, so a large batch does not hold up the event loop.
+The LLM tier uses ``llm_concurrency`` workers fed from a queue of chunks; when
+the consumer stops early (the client disconnected) the workers are cancelled
+and no further LLM calls are made.
+"""
+import asyncio
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app import catalog, classifier, rules, tools
+
+MAX_BATCH_SIZE = 10000
+DEFAULT_LLM_BATCH_SIZE = 10
+MAX_LLM_BATCH_SIZE = tools.MAX_ANALYSIS_BATCH
+DEFAULT_LLM_CONCURRENCY = 4
+MAX_LLM_CONCURRENCY = 16
+# Descriptions run through the classifier and rules per worker-thread call
+LOCAL_CHUNK_SIZE = 500
+CACHE_SIZE = 50000
+
+# (policy fingerprint, normalized description) -> analysis, most recently used last
+_cache: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+cache_stats = {"hits": 0, "misses": 0}
+
+
+def normalize_description(description: str) -> str:
+    """Cache/dedup key: lowercase with collapsed whitespace"""
+    return " ".join(description.lower().split())
+
+
+def policy_fingerprint() -> str:
+    """Changes whenever the policy wording the analysis depends on changes"""
+    return catalog.current().prompts.version
+
+
+def cache_get(key: Tuple[str, str]):
+    analysis = _cache.get(key)
+    if analysis is not None:
+        _cache.move_to_end(key)
+        cache_stats["hits"] += 1
+    else:
+        cache_stats["misses"] += 1
+    return analysis
+
+
+def cache_put(key: Tuple[str, str], analysis: Dict[str, Any]):
+    _cache[key] = analysis
+    _cache.move_to_end(key)
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+def clear_cache():
+    _cache.clear()
+
+
+def local_analysis(description: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """(source, analysis) when answerable without the LLM, else (None, None)"""
+    local_result = classifier.classify(description)
+    if local_result:
+        problem_type, _ = local_result
+        return "classifier", {
+            "problem_type": problem_type,
+            "needs_clarification": False,
+            "clarification_questions": None,
+            "potential_exclusions": None,
+            **tools.PROBLEM_TYPE_OUTCOMES[problem_type]
+        }
+
+    # A single unambiguous problem keyword with no exclusion wording is decisive
+    matches = rules.match_rules(description)
+    if len(matches.problem_type) == 1 and not matches.exclusion:
+        return "rules", tools.rule_problem_analysis(description)
+
+    return None, None
+
+
+def local_analyses(descriptions: List[str]) -> List[Tuple[Optional[str], Optional[Dict[str, Any]]]]:
+    return [local_analysis(description) for description in descriptions]
+
+
+async def check_coverage_batch(descriptions: List[str], llm_batch_size: int = DEFAULT_LLM_BATCH_SIZE,
+                               llm_concurrency: int = DEFAULT_LLM_CONCURRENCY, progress_every: int = 100) -> AsyncIterator[Dict[str, Any]]:
+    """Yield result, progress and summary events for a batch of descriptions"""
+    total = len(descriptions)
+
+    # Deduplicate: normalized description -> every input index that uses it
+    positions: "OrderedDict[str, List[int]]" = OrderedDict()
+    for index, description in enumerate(descriptions):
+        positions.setdefault(normalize_description(description), []).append(index)
+
+    sources = {"cache": 0, "classifier": 0, "rules": 0, "llm": 0}
+    completed = 0
+
+    def emit(key: str, source: str, analysis: Dict[str, Any]):
+        nonlocal completed
+        sources[source] += len(positions[key])
+        events = []
+        for index in positions[key]:
+            completed += 1
+            events.append({
+                "type": "result",
+                "index": index,
+                "problem_description": descriptions[index],
+                "source": source,
+                "analysis": analysis
+            })
+            if progress_every and completed % progress_every == 0 and completed < total:
+                events.append({"type": "progress", "completed": completed, "total": total})
+        return events
+
+    # Tier 1: cache
+    fingerprint = policy_fingerprint()
+    uncached: List[str] = []
+    for key in positions:
+        analysis = cache_get((fingerprint, key))
+        if analysis is not None:
+            for event in emit(key, "cache", analysis):
+                yield event
+        else:
+            uncached.append(key)
+
+    # Tier 2-3: local classifier, decisive rule match (off the event loop)
+    pending: List[str] = []
+    for start in range(0, len(uncached), LOCAL_CHUNK_SIZE):
+        keys = uncached[start:start + LOCAL_CHUNK_SIZE]
+        answers = await asyncio.to_thread(local_analyses, [descriptions[positions[key][0]] for key in keys])
+        for key, (source, analysis) in zip(keys, answers):
+            if analysis is not None:
+                cache_put((fingerprint, key), analysis)
+                for event in emit(key, source, analysis):
+                    yield event
+            else:
+                pending.append(key)
+
+    # Tier 4: batched LLM calls from a fixed pool of workers. Without an LLM the
+    # batch call degrades to the keyword fallback, which is reported but not cached.
+    chunk_size = min(max(1, llm_batch_size), MAX_LLM_BATCH_SIZE)
+    chunks = deque(pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size))
+    chunk_count = len(chunks)
+    finished: "asyncio.Queue[Any]" = asyncio.Queue()
+
+    async def worker():
+        while chunks:
+            keys = chunks.popleft()
+            texts = [descriptions[positions[key][0]] for key in keys]
+            try:
+                finished.put_nowait((keys, await asyncio.to_thread(tools.analyze_problem_descriptions_batch, texts)))
+            except Exception as e:
+                finished.put_nowait(e)
+
+    llm_calls = 0
+    workers = [asyncio.create_task(worker()) for _ in range(min(max(1, llm_concurrency), MAX_LLM_CONCURRENCY, chunk_count))]
+    try:
+        for _ in range(chunk_count):
+            item = await finished.get()
+            if isinstance(item, Exception):
+                raise item
+            keys, analyses = item
+            # Only calls that produced at least one model answer count as LLM calls
+            if any(from_llm for _, from_llm in analyses):
+                llm_calls += 1
+            for key, (analysis, from_llm) in zip(keys, analyses):
+                # Fallback answers for a failed or skipped item are reported as such and not cached
+                if from_llm:
+                    cache_put((fingerprint, key), analysis)
+                for event in emit(key, "llm" if from_llm else "rules", analysis):
+                    yield event
+    finally:
+        # Stopped early (client gone or an error): queued chunks are never started
+        for task in workers:
+            task.cancel()
+
+    yield {"type": "progress", "completed": completed, "total": total}
+    yield {
+        "type": "summary",
+        "total": total,
+        "unique": len(positions),
+        "llm_calls": llm_calls,
+        "sources": sources
+    }
@@ -0,0 +1,129 @@
+"""Streaming export of claims and conversations for ``/api/admin/export/{kind}``.
+
+Records are read from the storage layer one at a time, filtered, and encoded
+into chunks of about ``CHUNK_SIZE`` bytes. The response holds one chunk at a
+time, whatever the size of the store. NDJSON rows are whole records, as
+stored. CSV rows are a flat summary of each record (``COLUMNS``).
+
+Filters: statuses and problem types (any of), and creation time. ``since``
+is inclusive and ``until`` exclusive; a bare date for ``until`` covers that
+whole day.
+"""
+import csv
+import io
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from app import serialization, storage
+from app.records import MISSING, Claim, datetime_micros, timestamp_micros, unpack_timestamp
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+CHUNK_SIZE = 64 * 1024
+
+
+def _field(value: Any) -> Any:
+    return "" if value is MISSING or value is None else value
+
+
+def _last_history_timestamp(claim: Claim) -> Any:
+    history = claim.history
+    if type(history) is list and history and hasattr(history[-1], "timestamp"):
+        return unpack_timestamp(_field(history[-1].timestamp))
+    return ""
+
+
+def _count(items: Any) -> Any:
+    return len(items) if type(items) is list else ""
+
+
+# CSV column -> value for one record
+COLUMNS: Dict[str, Dict[str, Callable[[Any], Any]]] = {
+    "claims": {
+        "claim_id": lambda c: _field(c.claim_id),
+        "policy_holder": lambda c: _field(c.policy_holder),
+        "policy_number": lambda c: _field(c.policy_number),
+        "problem_type": lambda c: _field(c.problem_type),
+        "status": lambda c: _field(c.status),
+        "created_at": lambda c: unpack_timestamp(_field(c.created_at)),
+        "updated_at": _last_history_timestamp,
+        "history_events": lambda c: _count(c.history)
+    },
+    "conversations": {
+        "conversation_id": lambda c: _field(c.conversation_id),
+        "customer_name": lambda c: _field(c.customer_name),
+        "problem_type": lambda c: _field(c.problem_type),
+        "status": lambda c: _field(c.status),
+        "created_at": lambda c: unpack_timestamp(_field(c.created_at)),
+        "last_updated": lambda c: unpack_timestamp(_field(c.last_updated)),
+        "messages": lambda c: _count(c.messages),
+        "requires_human": lambda c: _field(c.requires_human),
+        "admin_user": lambda c: _field(c.admin_user),
+        "is_active": lambda c: _field(c.is_active)
+    }
+}
+KINDS = {"claims": storage.claims, "conversations": storage.conversations}
+
+
+def parse_time(value: Optional[str], end_of_day: bool = False) -> Optional[int]:
+    """Epoch microseconds of an ISO date or datetime filter value (ValueError if malformed)"""
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+    if end_of_day and len(value) == 10:
+        moment += timedelta(days=1)
+    return datetime_micros(moment)
+
+
+def iter_records(kind: str, statuses: Optional[Iterable[str]] = None, problem_types: Optional[Iterable[str]] = None,
+                 since: Optional[int] = None, until: Optional[int] = None) -> Iterator[Any]:
+    """Records of kind that pass the filters, in storage order"""
+    statuses = set(statuses) if statuses else None
+    problem_types = set(problem_types) if problem_types else None
+    records = KINDS[kind]().records()
+    # Records appended after the export started are left out
+    for position in range(len(records)):
+        record = records[position]
+        if statuses is not None and record.status not in statuses:
+            continue
+        if problem_types is not None and record.problem_type not in problem_types:
+            continue
+        if since is not None or until is not None:
+            created = timestamp_micros(record.created_at)
+            if created is None or (since is not None and created < since) or (until is not None and created >= until):
+                continue
+        yield record
+
+
+def ndjson_chunks(records: Iterable[Any]) -> Iterator[bytes]:
+    buffer = bytearray()
+    for record in records:
+        buffer += serialization.dumps(record.to_dict())
+        buffer += b"\n"
+        if len(buffer) >= CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def csv_chunks(records: Iterable[Any], columns: Dict[str, Callable[[Any], Any]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    getters = list(columns.values())
+    for record in records:
+        writer.writerow([getter(record) for getter in getters])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def export_chunks(kind: str, export_format: str, **filters: Any) -> Iterator[bytes]:
+    """Encoded export of kind ("claims" or "conversations") as "ndjson" or "csv"; filters as for iter_records"""
+    records = iter_records(kind, **filters)
+    if export_format == "csv":
+        return csv_chunks(records, COLUMNS[kind])
+    return ndjson_chunks(records)
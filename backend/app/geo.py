@@ -0,0 +1,134 @@
+"""Distances and nearest-point search over latitude/longitude points.
+
+``SpatialIndex`` buckets points into square lat/lon cells sized so each
+holds a handful of points. ``nearest`` first searches rings of cells around
+the query until it finds any point, then scans every cell that could hold a
+closer one (a box derived from the haversine formula), so its answer is
+exactly what a linear scan would return, ties going to the earlier point.
+"""
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371
+
+# Cells are sized for about this many points each, within these bounds
+TARGET_PER_CELL = 8
+MIN_CELL_DEGREES = 0.001
+MAX_CELL_DEGREES = 1.0
+
+
+def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Calculate distance between two coordinates using Haversine formula"""
+    R = EARTH_RADIUS_KM
+
+    lat1_rad = math.radians(lat1)
+    lon1_rad = math.radians(lon1)
+    lat2_rad = math.radians(lat2)
+    lon2_rad = math.radians(lon2)
+
+    dlat = lat2_rad - lat1_rad
+    dlon = lon2_rad - lon1_rad
+
+    a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon/2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+
+    return R * c
+
+
+def cell_size(points: List[Dict[str, Any]]) -> float:
+    """Cell edge in degrees putting about TARGET_PER_CELL points in each cell"""
+    if not points:
+        return MAX_CELL_DEGREES
+    lats = [p["lat"] for p in points]
+    lons = [p["lon"] for p in points]
+    area = max(max(lats) - min(lats), MIN_CELL_DEGREES) * max(max(lons) - min(lons), MIN_CELL_DEGREES)
+    return min(MAX_CELL_DEGREES, max(MIN_CELL_DEGREES, math.sqrt(area * TARGET_PER_CELL / len(points))))
+
+
+def search_box(lat: float, distance: float) -> Tuple[float, float]:
+    """(lat, lon) half-widths in degrees of a box around lat holding every point within distance km"""
+    angle = distance / EARTH_RADIUS_KM
+    dlat = math.degrees(angle)
+    # A closer point is within dlat, so its latitude is at most this far from the equator
+    far_lat = min(90.0, abs(lat) + dlat)
+    cos_product = math.cos(math.radians(lat)) * math.cos(math.radians(far_lat))
+    sin_half = math.sin(min(angle, math.pi) / 2)
+    if cos_product <= 0 or sin_half >= math.sqrt(cos_product):
+        dlon = 360.0
+    else:
+        dlon = math.degrees(2 * math.asin(sin_half / math.sqrt(cos_product)))
+    # Slack for floating point error, so exact ties are scanned too
+    return dlat * (1 + 1e-9) + 1e-9, dlon * (1 + 1e-9) + 1e-9
+
+
+class SpatialIndex:
+    """Points (dicts with lat and lon) bucketed into lat/lon cells for nearest-point queries"""
+
+    def __init__(self, points: List[Dict[str, Any]], cell_degrees: float = None):
+        self.points = points
+        self.cell_degrees = cell_degrees or cell_size(points)
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        for position, point in enumerate(points):
+            self.cells.setdefault(self._cell(point["lat"], point["lon"]), []).append(position)
+        rows = [row for row, _ in self.cells]
+        cols = [col for _, col in self.cells]
+        self.bounds = (min(rows), max(rows), min(cols), max(cols)) if self.cells else None
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+    def _ring(self, row: int, col: int, radius: int) -> Iterable[Tuple[int, int]]:
+        """Occupied-area cells exactly radius cells (Chebyshev) from (row, col)"""
+        min_row, max_row, min_col, max_col = self.bounds
+        for r in range(max(row - radius, min_row), min(row + radius, max_row) + 1):
+            if abs(r - row) == radius:
+                yield from ((r, c) for c in range(max(col - radius, min_col), min(col + radius, max_col) + 1))
+            else:
+                yield from ((r, c) for c in (col - radius, col + radius) if min_col <= c <= max_col)
+
+    def _scan(self, best: Optional[Tuple[float, int]], lat: float, lon: float,
+              cells: Iterable[Tuple[int, int]]) -> Optional[Tuple[float, int]]:
+        for cell in cells:
+            for position in self.cells.get(cell, ()):
+                point = self.points[position]
+                candidate = (calculate_distance(lat, lon, point["lat"], point["lon"]), position)
+                if best is None or candidate < best:
+                    best = candidate
+        return best
+
+    def nearest(self, lat: float, lon: float) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """(distance km, point) of the closest point, None if there are no points"""
+        if not self.cells:
+            return None
+        row, col = self._cell(lat, lon)
+        min_row, max_row, min_col, max_col = self.bounds
+
+        # Rings of cells outwards, starting at the first that reaches a point
+        radius = max(0, min_row - row, row - max_row, min_col - col, col - max_col)
+        best = None
+        while best is None:
+            best = self._scan(None, lat, lon, self._ring(row, col, radius))
+            radius += 1
+
+        # Every cell that could hold a point at least as close
+        dlat, dlon = search_box(lat, best[0])
+        rows = range(max(self._cell(lat - dlat, lon)[0], min_row), min(self._cell(lat + dlat, lon)[0], max_row) + 1)
+        if dlon >= 180:
+            col_ranges = [range(min_col, max_col + 1)]
+        else:
+            # Longitudes wrap at the antimeridian, as they do in the haversine formula
+            col_ranges = []
+            for shift in (-360, 0, 360):
+                first_col, last_col = self._cell(lat, lon + shift - dlon)[1], self._cell(lat, lon + shift + dlon)[1]
+                cols = range(max(first_col, min_col), min(last_col, max_col) + 1)
+                if cols:
+                    col_ranges.append(cols)
+        if len(rows) * sum(len(cols) for cols in col_ranges) > len(self.cells):
+            cells = [cell for cell in self.cells if cell[0] in rows and any(cell[1] in cols for cols in col_ranges)]
+        else:
+            cells = [(r, c) for r in rows for cols in col_ranges for c in cols]
+        distance, position = self._scan(best, lat, lon, cells)
+        return distance, self.points[position]
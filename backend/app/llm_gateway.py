@@ -0,0 +1,358 @@
+"""Shared gateway for every OpenAI call made by the agents.
+
+All LLM traffic goes through one ``LLMGateway``:
+
+- one ``OpenAI`` client over a pooled ``httpx.Client`` (connection reuse),
+- a global concurrency semaphore and a token-bucket rate limiter,
+- jittered exponential retries for connection errors, timeouts, 429 and 5xx,
+- a circuit breaker: after repeated upstream failures the gateway reports
+  itself unavailable, so callers go straight to their rule-based fallbacks
+  instead of waiting out timeouts, and a single probe is let through once the
+  reset timeout passes.
+
+``tools.get_openai_client()`` returns ``GatewayClient`` (same
+``responses.create`` / ``chat.completions.create`` surface as the SDK) or
+``None`` when no key is configured or the breaker is open. The upstream base
+URL follows ``OPENAI_BASE_URL``, so the gateway can run against a local fake.
+
+Waiting for a slot, a token or a retry backoff blocks the calling thread, so
+the API handlers run agent code in worker threads (``asyncio.to_thread``);
+called on the event loop it would stall every request and WebSocket, and no
+more than one call could ever hold a slot.
+
+The SDK (and httpx under it) is imported on first use, or by ``preload()``
+from the startup warm-up, so importing the app does not pay for it.
+
+Configuration (environment): ``LLM_MAX_CONCURRENCY``, ``LLM_RATE_PER_SEC``,
+``LLM_BURST``, ``LLM_TIMEOUT``, ``LLM_QUEUE_TIMEOUT``, ``LLM_MAX_RETRIES``,
+``LLM_BREAKER_FAILURES``, ``LLM_BREAKER_RESET_SECONDS``.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+
+from app import metrics
+from app.log import log_event
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def retryable_errors() -> Tuple[type, ...]:
+    """Errors worth retrying, and that count towards opening the breaker"""
+    import openai
+    return (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+
+class GatewayUnavailableError(Exception):
+    """The gateway refused the call without reaching upstream"""
+
+
+class CircuitOpenError(GatewayUnavailableError):
+    pass
+
+
+class GatewayBusyError(GatewayUnavailableError):
+    """Rate limit or concurrency slot not available within the queue timeout"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens/sec, bursts up to ``capacity``"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """closed -> open after N consecutive failures -> half_open probe after reset_timeout"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """Whether a call could be let through right now (does not claim the probe)"""
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self._opened_at >= self.reset_timeout
+            if self.state == self.HALF_OPEN:
+                return not self._probe_in_flight
+            return True
+
+    def allow(self) -> bool:
+        """Claim permission for one call"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def release(self):
+        """Give back a claimed probe when the call never reached upstream"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+
+class LLMGateway:
+    """Concurrency limits, rate limiting, retries and a circuit breaker around one OpenAI client"""
+
+    def __init__(self, max_concurrency: int = 8, rate_per_sec: float = 10.0, burst: int = 20,
+                 timeout: float = 20.0, queue_timeout: float = 2.0, max_retries: int = 2,
+                 breaker_failures: int = 5, breaker_reset_seconds: float = 30.0):
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._bucket = TokenBucket(rate_per_sec, burst)
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset_seconds)
+        self._client: Optional["OpenAI"] = None
+        self._client_key: Optional[str] = None
+        self._client_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._in_flight = 0
+        self._metrics = {
+            "calls": 0, "successes": 0, "failures": 0, "retries": 0,
+            "short_circuited": 0, "rate_limited": 0, "latency_seconds_total": 0.0
+        }
+
+    @classmethod
+    def from_env(cls) -> "LLMGateway":
+        return cls(
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", 8)),
+            rate_per_sec=float(os.getenv("LLM_RATE_PER_SEC", 10)),
+            burst=int(os.getenv("LLM_BURST", 20)),
+            timeout=float(os.getenv("LLM_TIMEOUT", 20)),
+            queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT", 2)),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", 2)),
+            breaker_failures=int(os.getenv("LLM_BREAKER_FAILURES", 5)),
+            breaker_reset_seconds=float(os.getenv("LLM_BREAKER_RESET_SECONDS", 30))
+        )
+
+    def openai_client(self) -> Optional["OpenAI"]:
+        """Shared SDK client over a pooled connection; None without an API key"""
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key or api_key == "your_openai_api_key_here":
+            return None
+        if self._client is None or self._client_key != api_key:
+            with self._client_lock:
+                if self._client is None or self._client_key != api_key:
+                    import httpx
+                    from openai import OpenAI
+                    http_client = httpx.Client(
+                        limits=httpx.Limits(max_connections=self.max_concurrency * 2, max_keepalive_connections=self.max_concurrency),
+                        timeout=httpx.Timeout(self.timeout, connect=min(5.0, self.timeout))
+                    )
+                    # Retries are the gateway's job, so the SDK's own are disabled
+                    self._client = OpenAI(api_key=api_key, max_retries=0, timeout=self.timeout, http_client=http_client)
+                    self._client_key = api_key
+        return self._client
+
+    def available(self) -> bool:
+        return self.openai_client() is not None and self.breaker.available()
+
+    def _count(self, name: str, amount=1):
+        with self._metrics_lock:
+            self._metrics[name] += amount
+
+    def call(self, operation: Callable[["OpenAI"], Any], name: str = "llm") -> Any:
+        """Run operation(client) under the gateway's limits, retries and breaker"""
+        client = self.openai_client()
+        if client is None:
+            raise GatewayUnavailableError("OpenAI API key not configured")
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise CircuitOpenError("LLM circuit breaker is open")
+        self._count("calls")
+        retryable = retryable_errors()
+
+        # Local back-pressure is not an upstream failure, so the breaker is left as is
+        if not self._bucket.acquire(self.queue_timeout):
+            self._count("rate_limited")
+            self.breaker.release()
+            raise GatewayBusyError("LLM rate limit exceeded")
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self._count("rate_limited")
+            self.breaker.release()
+            raise GatewayBusyError("LLM concurrency limit reached")
+
+        started = time.perf_counter()
+        outcome = "error"
+        with self._metrics_lock:
+            self._in_flight += 1
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    result = operation(client)
+                    outcome = "success"
+                    self.breaker.record_success()
+                    self._count("successes")
+                    return result
+                except retryable:
+                    if attempt == self.max_retries:
+                        raise
+                    self._count("retries")
+                    # Full jitter on an exponential base
+                    time.sleep(random.uniform(0, 0.25 * 2 ** attempt))
+        except retryable as e:
+            was_open = self.breaker.state == CircuitBreaker.OPEN
+            self.breaker.record_failure()
+            self._count("failures")
+            if not was_open and self.breaker.state == CircuitBreaker.OPEN:
+                log_event(logger, logging.WARNING, "llm_circuit_opened", error_type=type(e).__name__, error=str(e))
+            raise
+        except Exception:
+            # Client-side errors (bad request, auth) say nothing about upstream health, but a
+            # half-open probe that ends in one must still be given back or the breaker stays stuck
+            self.breaker.release()
+            self._count("failures")
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._metrics_lock:
+                self._in_flight -= 1
+                self._metrics["latency_seconds_total"] += elapsed
+            self._slots.release()
+            metrics.LLM_REQUEST_DURATION.labels(name, outcome).observe(elapsed)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of gateway counters and state"""
+        with self._metrics_lock:
+            snapshot = dict(self._metrics)
+            snapshot["in_flight"] = self._in_flight
+        snapshot["circuit_state"] = self.breaker.state
+        snapshot["max_concurrency"] = self.max_concurrency
+        return snapshot
+
+
+class _Endpoint:
+    def __init__(self, gateway: LLMGateway, name: str, resolve: Callable[["OpenAI"], Any]):
+        self._gateway = gateway
+        self._name = name
+        self._resolve = resolve
+
+    def create(self, **kwargs):
+        return self._gateway.call(lambda client: self._resolve(client).create(**kwargs), self._name)
+
+
+class _Chat:
+    def __init__(self, gateway: LLMGateway):
+        self.completions = _Endpoint(gateway, "chat.completions", lambda client: client.chat.completions)
+
+
+class GatewayClient:
+    """SDK-shaped facade whose calls go through the gateway"""
+
+    def __init__(self, gateway: LLMGateway):
+        self.responses = _Endpoint(gateway, "responses", lambda client: client.responses)
+        self.chat = _Chat(gateway)
+
+
+_gateway: Optional[LLMGateway] = None
+_gateway_client: Optional[GatewayClient] = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    global _gateway, _gateway_client
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway.from_env()
+                _gateway_client = GatewayClient(_gateway)
+    return _gateway
+
+
+def get_client() -> Optional[GatewayClient]:
+    """Gateway client, or None when callers should use their fallbacks.
+
+    Callers also use this as an availability check, so short-circuits are
+    counted only by calls the breaker refuses (fallbacks have their own metric).
+    """
+    gateway = get_gateway()
+    if gateway.openai_client() is None or not gateway.breaker.available():
+        return None
+    return _gateway_client
+
+
+def preload():
+    """Import the SDK and open the pooled client ahead of the first LLM call"""
+    retryable_errors()
+    get_gateway().openai_client()
+
+
+# ==================== METRICS EXPORT ====================
+
+_COUNTER_EVENTS = ("calls", "successes", "failures", "retries", "short_circuited", "rate_limited")
+
+
+def _gateway_events():
+    snapshot = get_gateway().metrics()
+    return {(event,): snapshot[event] for event in _COUNTER_EVENTS}
+
+
+def _gateway_state():
+    snapshot = get_gateway().metrics()
+    return {
+        ("in_flight",): snapshot["in_flight"],
+        ("circuit_open",): int(snapshot["circuit_state"] != CircuitBreaker.CLOSED)
+    }
+
+
+metrics.register_callback("llm_gateway_events_total", "LLM gateway call outcomes", "counter", ("event",), _gateway_events)
+metrics.register_callback("llm_gateway_state", "LLM gateway in-flight calls and circuit state (1 = open or half-open)", "gauge", ("value",), _gateway_state)
@@ -0,0 +1,117 @@
+"""Structured logging for the backend.
+
+Modules log through ``logging.getLogger(__name__)`` and ``log_event``:
+
+- level gating happens before anything is formatted, so disabled debug
+  events cost one ``isEnabledFor`` check;
+- records go onto an in-memory queue and are formatted and written by a
+  ``QueueListener`` thread, keeping stdout I/O off the request path;
+- high-frequency events can be sampled (``sampled=True``), and the rate is
+  written into the record so counts can be scaled back up;
+- output is one JSON object per line, carrying the ``conversation_id`` bound
+  for the current request or WebSocket.
+
+Configuration (environment): ``LOG_LEVEL`` (default INFO), ``LOG_FORMAT``
+(``json`` or ``text``), ``LOG_SAMPLE_RATE`` (default 0.1).
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from typing import Any, Optional
+
+conversation_id_var: ContextVar[Optional[str]] = ContextVar("conversation_id", default=None)
+
+_sample_rate = float(os.getenv("LOG_SAMPLE_RATE", 0.1))
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def bind_conversation(conversation_id: Optional[str]):
+    """Correlate everything logged from the current context with this conversation"""
+    return conversation_id_var.set(conversation_id)
+
+
+def log_event(logger: logging.Logger, level: int, event: str, sampled: bool = False, **fields: Any):
+    """Log a named event with structured fields; nothing is built when the level is disabled"""
+    if not logger.isEnabledFor(level):
+        return
+    if sampled and _sample_rate < 1.0:
+        if random.random() >= _sample_rate:
+            return
+        fields["sample_rate"] = _sample_rate
+    logger.log(level, event, extra={"fields": fields})
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage()
+        }
+        conversation_id = getattr(record, "conversation_id", None)
+        if conversation_id:
+            entry["conversation_id"] = conversation_id
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines with key=value fields, for local development"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = dict(getattr(record, "fields", None) or {})
+        conversation_id = getattr(record, "conversation_id", None)
+        if conversation_id:
+            fields = {"conversation_id": conversation_id, **fields}
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class _ContextQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Capture the correlation id on the calling thread; formatting is left to the listener
+        record.conversation_id = conversation_id_var.get()
+        return record
+
+
+def configure_logging():
+    """Route the ``app`` loggers through a queue to stdout (idempotent)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(TextFormatter() if os.getenv("LOG_FORMAT", "json").lower() == "text" else JsonFormatter())
+    records = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(records, handler)
+    _listener.start()
+
+    app_logger = logging.getLogger("app")
+    app_logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    app_logger.handlers[:] = [_ContextQueueHandler(records)]
+    app_logger.propagate = False
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
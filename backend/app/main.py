@@ -1,18 +1,70 @@
 import os
+import logging
+import re
+import time
+from contextlib import asynccontextmanager
 from typing import Optional, Dict, Any
 from datetime import datetime
 from fastapi import FastAPI, Body, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from app import tools
-import httpx
-import json
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.datastructures import Headers, QueryParams
+from app import catalog, classifier, client_status, coverage_batch, export, llm_gateway, metrics, profiler, prompts, realtime, rules, search, serialization, stats, tools
+from app.board import board
+from app.log import bind_conversation, configure_logging, log_event, shutdown_logging
 import asyncio
 
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv()
+configure_logging()
 
-app = FastAPI(title="Insurance Co-Pilot API")
+logger = logging.getLogger(__name__)
+
+# Startup warm-up progress, reported by /ready
+readiness: Dict[str, Any] = {"ready": False, "warmup_seconds": None, "error": None}
+
+def _warm_up_blocking():
+    """Load what would otherwise be built on the first request that needs it"""
+    # OpenAI SDK import (the largest single import) and the pooled client
+    llm_gateway.preload()
+
+async def warm_up():
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(_warm_up_blocking)
+        # Pooled HTTP client (and pre-minted secrets) for Realtime sessions
+        await realtime.start_client()
+        readiness["ready"] = True
+    except Exception as e:
+        readiness["error"] = str(e)
+        log_event(logger, logging.ERROR, "warmup_failed", error_type=type(e).__name__, error=str(e))
+    readiness["warmup_seconds"] = round(time.perf_counter() - started, 3)
+    log_event(logger, logging.INFO, "warmup_finished", ready=readiness["ready"], seconds=readiness["warmup_seconds"])
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the local problem-type classifier before serving traffic (a small JSON file)
+    classifier.load_model()
+    # Every tenant's policies and providers, with their indexes and compiled prompts
+    await asyncio.to_thread(catalog.catalogs.refresh)
+    # Everything else warms in the background; /health answers at once, /ready once warm
+    warm_up_task = asyncio.create_task(warm_up())
+    # Dashboard aggregates, built from the stores and then kept up to date
+    stats_task = asyncio.create_task(stats.run())
+    # Full-text index over conversations, synced with the store and then kept up to date
+    search_task = asyncio.create_task(search.run())
+    # Tenant catalogs, reloaded when their files change
+    catalog_task = asyncio.create_task(catalog.run())
+    yield
+    warm_up_task.cancel()
+    stats_task.cancel()
+    search_task.cancel()
+    catalog_task.cancel()
+    await realtime.close_client()
+    shutdown_logging()
+
+app = FastAPI(title="Insurance Co-Pilot API", lifespan=lifespan, default_response_class=serialization.JSONResponse)
 
 origins = [
     "http://localhost:5173",
@@ -23,6 +75,45 @@ origins = [
     "http://127.0.0.1:5175",
 ]
 
+# Conversation id in the path of conversation routes and WebSockets (not the bulk /messages route)
+CONVERSATION_PATH_RE = re.compile(r"^/(?:ws/(?:client|admin)/|api/admin/conversations/(?!messages(?:/|$)))([^/]+)")
+
+class ConversationLogContextMiddleware:
+    """Bind the path's conversation_id to the logging context for the whole request"""
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            match = CONVERSATION_PATH_RE.match(scope["path"])
+            if match:
+                bind_conversation(match.group(1))
+        await self.app(scope, receive, send)
+
+class TenantCatalogMiddleware:
+    """Serve each request from its tenant's catalog (X-Tenant-ID header or tenant query parameter)"""
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            tenant = Headers(scope=scope).get("x-tenant-id") or QueryParams(scope["query_string"]).get("tenant")
+            # HTTP requests keep the snapshot they started with; WebSockets follow reloads
+            if catalog.bind(tenant, pin=scope["type"] == "http") is None:
+                if scope["type"] == "websocket":
+                    await send({"type": "websocket.close", "code": 1008})
+                    return
+                response = serialization.JSONResponse({"detail": f"Unknown tenant: {tenant}"}, status_code=404)
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+app.add_middleware(ConversationLogContextMiddleware)
+app.add_middleware(TenantCatalogMiddleware)
+app.add_middleware(metrics.RouteMetricsMiddleware)
+app.add_middleware(profiler.ProfilingMiddleware)
+# Added last so it is outermost: responses from the middlewares above (such as an
+# unknown-tenant 404) carry CORS headers too
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -43,33 +134,70 @@ class ConnectionManager:
         if conversation_id not in self.active_connections:
             self.active_connections[conversation_id] = {}
         self.active_connections[conversation_id][connection_type] = websocket
-        print(f"Connected {connection_type} to conversation {conversation_id}")
+        log_event(logger, logging.INFO, "ws_connected", connection_type=connection_type)
     
     def disconnect(self, conversation_id: str, connection_type: str):
         if conversation_id in self.active_connections:
             self.active_connections[conversation_id].pop(connection_type, None)
             if not self.active_connections[conversation_id]:
                 del self.active_connections[conversation_id]
-        print(f"Disconnected {connection_type} from conversation {conversation_id}")
+        log_event(logger, logging.INFO, "ws_disconnected", connection_type=connection_type)
     
     async def send_to_conversation(self, conversation_id: str, message: dict, exclude_type: str = None):
         """Send message to all connections in a conversation except the sender"""
         if conversation_id in self.active_connections:
-            for conn_type, websocket in self.active_connections[conversation_id].items():
+            # Serialized once for every recipient
+            frame = serialization.dumps_text(message)
+            for conn_type, websocket in list(self.active_connections[conversation_id].items()):
                 if conn_type != exclude_type:
                     try:
-                        await websocket.send_text(json.dumps(message))
+                        await websocket.send_text(frame)
                     except Exception as e:
-                        print(f"Error sending message to {conn_type}: {e}")
+                        log_event(logger, logging.WARNING, "ws_send_failed", connection_type=conn_type, error=str(e))
                         # Remove broken connection
                         self.disconnect(conversation_id, conn_type)
 
 manager = ConnectionManager()
 
+def _websocket_connections():
+    counts = {("client",): 0, ("admin",): 0}
+    for connections in list(manager.active_connections.values()):
+        for connection_type in list(connections):
+            counts[(connection_type,)] = counts.get((connection_type,), 0) + 1
+    counts[("kanban",)] = len(board.subscribers)
+    return counts
+
+def _cache_requests():
+    rule_cache = rules._group.cache_info()
+    stores = {id(snapshot.policies): snapshot.policies for snapshot in catalog.catalogs.snapshots.values()}
+    policy_hits = sum(store.cache_info()[0] for store in stores.values())
+    policy_misses = sum(store.cache_info()[1] for store in stores.values())
+    return {
+        ("rules", "hit"): rule_cache.hits, ("rules", "miss"): rule_cache.misses,
+        ("policy_holders", "hit"): policy_hits, ("policy_holders", "miss"): policy_misses,
+        ("coverage_batch", "hit"): coverage_batch.cache_stats["hits"],
+        ("coverage_batch", "miss"): coverage_batch.cache_stats["misses"]
+    }
+
+metrics.register_callback("websocket_connections", "Open WebSocket connections", "gauge", ("type",), _websocket_connections)
+metrics.register_callback("cache_requests_total", "Lookups in application caches", "counter", ("cache", "result"), _cache_requests)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition of latency histograms, counters and gauges"""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/health")
 async def health():
     return {"status": "ok"}
 
+@app.get("/ready")
+async def ready():
+    """Readiness: 503 until the startup warm-up has finished"""
+    if not readiness["ready"]:
+        raise HTTPException(status_code=503, detail={"status": "warming_up", **readiness})
+    return {"status": "ready", **readiness}
+
 # WebSocket endpoints
 @app.websocket("/ws/client/{conversation_id}")
 async def websocket_client_endpoint(websocket: WebSocket, conversation_id: str):
@@ -78,7 +206,7 @@ async def websocket_client_endpoint(websocket: WebSocket, conversation_id: str):
         while True:
             # Keep connection alive and handle any client messages
             data = await websocket.receive_text()
-            message_data = json.loads(data)
+            message_data = serialization.loads(data)
             
             # If client sends a message, broadcast to admin
             if message_data.get("type") == "message":
@@ -111,7 +239,7 @@ async def websocket_admin_endpoint(websocket: WebSocket, conversation_id: str):
         while True:
             # Handle admin messages
             data = await websocket.receive_text()
-            message_data = json.loads(data)
+            message_data = serialization.loads(data)
             
             if message_data.get("type") == "admin_message":
                 # Send to client
@@ -138,6 +266,31 @@ async def websocket_admin_endpoint(websocket: WebSocket, conversation_id: str):
     except WebSocketDisconnect:
         manager.disconnect(conversation_id, "admin")
 
+@app.websocket("/ws/kanban")
+async def websocket_kanban_endpoint(websocket: WebSocket):
+    """Card changes for the admin board: conversation_updated events, or resync when it fell behind"""
+    await websocket.accept()
+    queue = board.subscribe()
+    
+    async def forward():
+        try:
+            while True:
+                await websocket.send_text(await queue.get())
+        except Exception:
+            # Closed underneath us; the receive loop below sees the disconnect
+            pass
+    
+    sender = asyncio.create_task(forward())
+    try:
+        while True:
+            # Nothing is expected from the board; this only notices the disconnect
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        board.unsubscribe(queue)
+
 # Phase 2/4 placeholders to unblock frontend wiring
 @app.options("/api/conversation")
 async def conversation_options():
@@ -150,46 +303,57 @@ async def conversation(payload: Dict[str, Any] = Body(default={})):
     message = (payload or {}).get("message", "").strip()
     state = (payload or {}).get("state") or {}
     conversation_id = (payload or {}).get("conversation_id")
+    bind_conversation(conversation_id)
+    previous_step = state.get("step", 0)
     
-    # Use the new conversational AI agent
-    result = tools.conversational_ai_agent(message, state)
+    # Use the new conversational AI agent (LLM calls and rate-limit waits block, so off the loop)
+    result = await asyncio.to_thread(tools.conversational_ai_agent, message, state)
+    stats.record_conversation_turn(previous_step, result.get("state"))
     
     # Save conversation messages if conversation_id is provided
     if conversation_id and message:
-        # Ensure conversation exists
-        collected = state.get("collected", {})
-        customer_name = collected.get("customer_name", "Unknown Customer")
-        problem_type = collected.get("problem_type", "Unknown")
-        
-        # Create or update conversation entry
-        conversation_data = tools.create_conversation_entry(
-            conversation_id, 
-            customer_name, 
-            problem_type
-        )
-        tools.save_conversation(conversation_id, conversation_data)
-        
-        # Add user message
-        tools.add_message_to_conversation(
-            conversation_id,
-            "user",
-            message,
-            "Customer"
-        )
-        
-        # Add agent response
-        if result.get("reply"):
-            tools.add_message_to_conversation(
-                conversation_id,
-                "agent",
-                result["reply"],
-                "AI Agent"
-            )
+        await asyncio.to_thread(_save_conversation_turn, conversation_id, state, message, result.get("reply"))
     
     return result
 
-_fake_status_message: Optional[str] = None
+def _save_conversation_turn(conversation_id: str, state: Dict[str, Any], message: str, reply: Optional[str]):
+    """Store one /api/conversation turn (blocking storage writes; run in a worker thread)"""
+    # Ensure conversation exists
+    collected = state.get("collected", {})
+    customer_name = collected.get("customer_name", "Unknown Customer")
+    problem_type = collected.get("problem_type", "Unknown")
+    
+    # Create or update conversation entry
+    conversation_data = tools.create_conversation_entry(
+        conversation_id, 
+        customer_name, 
+        problem_type
+    )
+    tools.save_conversation(conversation_id, conversation_data)
+    
+    # Add user message
+    tools.add_message_to_conversation(
+        conversation_id,
+        "user",
+        message,
+        "Customer"
+    )
+    
+    # Add agent response
+    if reply:
+        tools.add_message_to_conversation(
+            conversation_id,
+            "agent",
+            reply,
+            "AI Agent"
+        )
 
+async def publish_status(conversation_id: Optional[str], message: Optional[str], status: str):
+    """Store a status line for the conversation's customer and push it to its WebSockets"""
+    if not conversation_id or not message:
+        return
+    event = await client_status.channels.publish(conversation_id, message, status)
+    await manager.send_to_conversation(conversation_id, {"type": "status_update", "conversation_id": conversation_id, **event})
 
 @app.options("/api/process_claim")
 async def process_claim_options():
@@ -199,8 +363,6 @@ async def process_claim_options():
 @app.post("/api/process_claim")
 async def process_claim(payload: Dict[str, Any] = Body(...)):
     """Multi-agent roadside assistance orchestrator"""
-    global _fake_status_message
-    
     # Handle both old format and new conversation state format
     if "conversation_state" in payload:
         conversation_state = payload["conversation_state"]
@@ -217,23 +379,29 @@ async def process_claim(payload: Dict[str, Any] = Body(...)):
         }
     
     # Use the new multi-agent orchestrator
-    result = tools.process_roadside_assistance_request(conversation_state)
+    result = await asyncio.to_thread(tools.process_roadside_assistance_request, conversation_state)
     
     # Generate status message from communications
     if result.get("status") == "success":
         communications = result.get("communications", [])
-        if communications:
-            _fake_status_message = communications[0]  # First communication message
+        message = communications[0] if communications else None  # First communication message
     elif result.get("status") == "denied":
-        _fake_status_message = f"Your request could not be processed: {result.get('reason', 'Unknown error')}"
+        message = f"Your request could not be processed: {result.get('reason', 'Unknown error')}"
     else:
-        _fake_status_message = f"Service request failed: {result.get('reason', 'Unknown error')}"
+        message = f"Service request failed: {result.get('reason', 'Unknown error')}"
+    await publish_status(payload.get("conversation_id"), message, result.get("status", "error"))
     
     return result
 
 @app.get("/api/get_status")
-async def get_status():
-    return {"message": _fake_status_message}
+async def get_status(conversation_id: Optional[str] = None, since: int = 0, wait: float = 0):
+    """The conversation's latest status line; with wait, hold until one newer than since arrives (long-poll)"""
+    if not conversation_id:
+        return {"message": None, "seq": 0}
+    event = await client_status.channels.wait(conversation_id, since, wait)
+    if event is None:
+        return {"message": None, "seq": since}
+    return event
 
 @app.options("/api/confirm_dispatch")
 async def confirm_dispatch_options():
@@ -242,24 +410,22 @@ async def confirm_dispatch_options():
 @app.post("/api/confirm_dispatch")
 async def confirm_dispatch(payload: Dict[str, Any] = Body(...)):
     """Handle user confirmations for dispatch and cab request"""
-    global _fake_status_message
-    
     conversation_state = payload.get("conversation_state", {})
     help_confirmed = payload.get("help_confirmed", False)
     cab_requested = payload.get("cab_requested", False)
     
     # Use the confirmation handler
-    result = tools.confirm_dispatch_and_cab(conversation_state, help_confirmed, cab_requested)
+    result = await asyncio.to_thread(tools.confirm_dispatch_and_cab, conversation_state, help_confirmed, cab_requested)
     
     # Generate status message from communications
     if result.get("status") == "success":
         communications = result.get("communications", [])
-        if communications:
-            _fake_status_message = communications[0]  # First communication message
+        message = communications[0] if communications else None  # First communication message
     elif result.get("status") == "cancelled":
-        _fake_status_message = result.get("message", "Service request cancelled")
+        message = result.get("message", "Service request cancelled")
     else:
-        _fake_status_message = f"Service request failed: {result.get('reason', 'Unknown error')}"
+        message = f"Service request failed: {result.get('reason', 'Unknown error')}"
+    await publish_status(payload.get("conversation_id"), message, result.get("status", "error"))
     
     return result
 
@@ -273,11 +439,45 @@ async def check_coverage(payload: Dict[str, Any] = Body(...)):
     
     try:
         # Use the same analysis function as the conversation agent
-        coverage_analysis = tools.analyze_problem_description(problem_description)
+        coverage_analysis = await asyncio.to_thread(tools.analyze_problem_description, problem_description)
         return coverage_analysis
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Coverage analysis failed: {str(e)}")
 
+def _int_option(payload: Dict[str, Any], name: str, default: int, minimum: int, maximum: int) -> int:
+    """An integer request option within [minimum, maximum], else a 400"""
+    value = payload.get(name, default)
+    if type(value) is not int or not minimum <= value <= maximum:
+        raise HTTPException(status_code=400, detail=f"{name} must be an integer from {minimum} to {maximum}")
+    return value
+
+@app.post("/api/check_coverage/batch")
+async def check_coverage_batch(payload: Dict[str, Any] = Body(...)):
+    """Re-evaluate coverage for many problem descriptions, streamed as NDJSON"""
+    descriptions = payload.get("problem_descriptions")
+    
+    if not isinstance(descriptions, list) or not descriptions:
+        raise HTTPException(status_code=400, detail="problem_descriptions must be a non-empty list")
+    if len(descriptions) > coverage_batch.MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {coverage_batch.MAX_BATCH_SIZE} problem_descriptions per request")
+    if not all(isinstance(d, str) and d.strip() for d in descriptions):
+        raise HTTPException(status_code=400, detail="problem_descriptions must be non-empty strings")
+    
+    events = coverage_batch.check_coverage_batch(
+        descriptions,
+        llm_batch_size=_int_option(payload, "llm_batch_size", coverage_batch.DEFAULT_LLM_BATCH_SIZE,
+                                   1, coverage_batch.MAX_LLM_BATCH_SIZE),
+        llm_concurrency=_int_option(payload, "llm_concurrency", coverage_batch.DEFAULT_LLM_CONCURRENCY,
+                                    1, coverage_batch.MAX_LLM_CONCURRENCY),
+        progress_every=_int_option(payload, "progress_every", 100, 0, coverage_batch.MAX_BATCH_SIZE)
+    )
+    
+    async def ndjson():
+        async for event in events:
+            yield serialization.dumps(event) + b"\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
 @app.post("/api/realtime/client_secret")
 async def create_realtime_client_secret():
     """Generate ephemeral API key for Realtime API client connections"""
@@ -285,38 +485,11 @@ async def create_realtime_client_secret():
     if not openai_api_key:
         raise HTTPException(status_code=500, detail="OpenAI API key not configured")
     
-    session_config = {
-        "session": {
-            "type": "realtime",
-            "model": "gpt-realtime",
-            "audio": {
-                "output": { "voice": "alloy" }
-            }
-        }
-    }
-    
+    client = realtime.get_client() or await realtime.start_client()
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.openai.com/v1/realtime/client_secrets",
-                headers={
-                    "Authorization": f"Bearer {openai_api_key}",
-                    "Content-Type": "application/json",
-                },
-                json=session_config
-            )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code, 
-                    detail=f"Failed to create client secret: {response.text}"
-                )
-            
-            data = response.json()
-            return {"client_secret": data.get("value")}
-            
-    except httpx.RequestError as e:
-        raise HTTPException(status_code=500, detail=f"Request failed: {str(e)}")
+        return {"client_secret": await client.get_secret()}
+    except realtime.RealtimeSecretError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
@@ -326,10 +499,89 @@ async def get_admin_cases():
     """Get all cases for admin dashboard"""
     try:
         cases_data = tools.get_all_cases_for_admin()
-        return {"cases": cases_data}
+        # Plain JSON data from storage: rendered directly, without jsonable_encoder
+        return serialization.JSONResponse({"cases": cases_data})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch cases: {str(e)}")
 
+@app.get("/api/admin/export/{kind}")
+async def export_records(kind: str, format: str = "ndjson", status: Optional[str] = None, problem_type: Optional[str] = None,
+                         since: Optional[str] = None, until: Optional[str] = None):
+    """Stream claims or conversations as NDJSON or CSV; status and problem_type take comma-separated values"""
+    if kind not in export.KINDS:
+        raise HTTPException(status_code=404, detail=f"Unknown export {kind}, expected one of {sorted(export.KINDS)}")
+    if format not in export.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {sorted(export.FORMATS)}")
+    try:
+        since_micros = export.parse_time(since)
+        until_micros = export.parse_time(until, end_of_day=True)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since and until must be ISO dates or datetimes")
+    
+    chunks = export.export_chunks(
+        kind, format,
+        statuses=[s.strip() for s in status.split(",") if s.strip()] if status else None,
+        problem_types=[p.strip() for p in problem_type.split(",") if p.strip()] if problem_type else None,
+        since=since_micros,
+        until=until_micros
+    )
+    return StreamingResponse(chunks, media_type=export.FORMATS[format],
+                             headers={"Content-Disposition": f'attachment; filename="{kind}.{format}"'})
+
+@app.get("/api/admin/stats")
+async def get_admin_stats():
+    """Precomputed dashboard aggregates over claims, conversations and coverage decisions"""
+    if not stats.aggregates.ready():
+        raise HTTPException(status_code=503, detail="Stats are still being built")
+    return serialization.JSONResponse(stats.aggregates.snapshot())
+
+@app.get("/api/admin/search")
+async def search_conversations(q: str, limit: int = 20, offset: int = 0):
+    """Ranked full-text search over message content, customer names and problem types"""
+    if not search.fts_query(q):
+        raise HTTPException(status_code=400, detail="q must contain at least one word")
+    index = search.get_index()
+    if not index.ready():
+        raise HTTPException(status_code=503, detail="Search index is still being built")
+    return await asyncio.to_thread(index.search, q, limit, offset)
+
+@app.get("/api/admin/policies/search")
+async def search_policy_holders(name: str, limit: int = 5):
+    """Fuzzy search over policy holder names, ranked with scores"""
+    matches = catalog.current().policies.search_holders(name, limit=min(max(limit, 1), 50))
+    return {"matches": [{"holder_name": holder, "score": score} for holder, score in matches]}
+
+@app.get("/api/admin/catalogs")
+async def get_catalogs():
+    """Loaded tenant catalogs with their versions, and tenants whose last reload failed"""
+    return catalog.catalogs.status()
+
+@app.post("/api/admin/catalogs/reload")
+async def reload_catalogs(tenant: Optional[str] = None):
+    """Rebuild every tenant catalog (or one) now and swap the new snapshots in"""
+    result = await asyncio.to_thread(catalog.catalogs.refresh, True, tenant)
+    if tenant is not None and tenant not in result["loaded"] + result["failed"]:
+        raise HTTPException(status_code=404, detail="Unknown tenant")
+    return {**result, **catalog.catalogs.status()}
+
+@app.get("/api/admin/llm_gateway")
+async def get_llm_gateway_metrics():
+    """LLM gateway counters, circuit breaker state and per-prompt token usage"""
+    return {**llm_gateway.get_gateway().metrics(), "prompt_usage": prompts.usage_stats()}
+
+@app.get("/api/admin/profiles")
+async def list_profiles():
+    """Finished request profiles, newest first"""
+    return {"profiles": profiler.profiler.list_profiles()}
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    """One request profile as collapsed stacks, ready for flamegraph tools"""
+    profile = profiler.profiler.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(profile.collapsed())
+
 # Conversation endpoints
 @app.get("/api/admin/conversations")
 async def get_conversations():
@@ -344,34 +596,43 @@ async def get_conversations():
             "closed": [c for c in conversations if c["status"] == "CLOSED"]
         }
         
-        return {"conversations": organized}
+        return serialization.JSONResponse({"conversations": organized})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch conversations: {str(e)}")
 
 @app.post("/api/admin/conversations")
 async def create_conversation(payload: Dict[str, Any] = Body(...)):
-    """Create a new conversation"""
+    """Create a new conversation; an existing one is left untouched"""
+    conversation_id = payload.get("conversation_id")
+    customer_name = payload.get("customer_name", "Unknown")
+    problem_type = payload.get("problem_type", "Unknown")
+    
+    if not conversation_id or not isinstance(conversation_id, str):
+        raise HTTPException(status_code=400, detail="conversation_id is required")
+    
     try:
-        conversation_id = payload.get("conversation_id")
-        customer_name = payload.get("customer_name", "Unknown")
-        problem_type = payload.get("problem_type", "Unknown")
-        
-        if not conversation_id:
-            raise HTTPException(status_code=400, detail="conversation_id is required")
-        
-        conversation_data = tools.create_conversation_entry(
-            conversation_id, customer_name, problem_type
-        )
-        
-        success = tools.save_conversation(conversation_id, conversation_data)
-        
-        if success:
-            return {"message": "Conversation created successfully", "conversation_id": conversation_id}
-        else:
-            raise HTTPException(status_code=500, detail="Failed to save conversation")
-            
+        created = tools.ensure_conversation(conversation_id, customer_name, problem_type)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create conversation: {str(e)}")
+    
+    message = "Conversation created successfully" if created else "Conversation already exists"
+    return {"message": message, "conversation_id": conversation_id, "created": created}
+
+@app.post("/api/admin/conversations/messages")
+async def add_conversation_messages(payload: Dict[str, Any] = Body(...)):
+    """Add many messages, across conversations, in one storage write; one result per message"""
+    messages = payload.get("messages")
+    
+    if not isinstance(messages, list) or not messages:
+        raise HTTPException(status_code=400, detail="messages must be a non-empty list")
+    if len(messages) > tools.MAX_BULK_MESSAGES:
+        raise HTTPException(status_code=400, detail=f"At most {tools.MAX_BULK_MESSAGES} messages per request")
+    if not all(isinstance(m, dict) for m in messages):
+        raise HTTPException(status_code=400, detail="messages must be objects")
+    
+    results = await asyncio.to_thread(tools.add_messages_to_conversations, messages)
+    added = sum(result["success"] for result in results)
+    return {"added": added, "failed": len(results) - added, "results": results}
 
 @app.post("/api/admin/conversations/{conversation_id}/message")
 async def add_conversation_message(conversation_id: str, payload: Dict[str, Any] = Body(...)):
@@ -401,42 +662,26 @@ async def add_conversation_message(conversation_id: str, payload: Dict[str, Any]
 
 @app.post("/api/admin/conversations/{conversation_id}/sync_history")
 async def sync_conversation_history(conversation_id: str, payload: Dict[str, Any] = Body(...)):
-    """Sync complete conversation history from frontend"""
+    """Append the messages of the frontend history the conversation has not seen yet (by "seq")"""
+    messages = payload.get("messages", [])
+    if not isinstance(messages, list) or not all(isinstance(msg, dict) for msg in messages):
+        raise HTTPException(status_code=400, detail="messages must be a list of objects")
+    if any(type(msg.get("seq", 0)) is not int or msg.get("seq", 0) < 0 for msg in messages):
+        raise HTTPException(status_code=400, detail="seq must be a non-negative integer")
+    base_seq = payload.get("base_seq", 0)
+    if type(base_seq) is not int or base_seq < 0:
+        raise HTTPException(status_code=400, detail="base_seq must be a non-negative integer")
     try:
-        messages = payload.get("messages", [])
-        customer_name = payload.get("customer_name", "Customer")
-        problem_type = payload.get("problem_type", "Roadside Assistance")
-        
-        # Create or update conversation entry
-        conversation_data = tools.create_conversation_entry(
-            conversation_id, 
-            customer_name, 
-            problem_type
+        result = tools.sync_conversation_history(
+            conversation_id,
+            messages,
+            payload.get("customer_name"),
+            payload.get("problem_type"),
+            base_seq
         )
-        
-        # Clear existing messages and add new ones
-        conversation_data["messages"] = []
-        for msg in messages:
-            conversation_data["messages"].append({
-                "timestamp": msg.get("timestamp"),
-                "type": msg.get("type"),
-                "content": msg.get("content"),
-                "sender": msg.get("sender")
-            })
-        
-        # Update last_updated timestamp
-        conversation_data["last_updated"] = datetime.now().isoformat()
-        
-        # Save the complete conversation
-        success = tools.save_conversation(conversation_id, conversation_data)
-        
-        if success:
-            return {"message": "Conversation history synced successfully"}
-        else:
-            raise HTTPException(status_code=500, detail="Failed to save conversation")
-            
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to sync conversation history: {str(e)}")
+    return {"message": "Conversation history synced successfully", **result}
 
 @app.post("/api/admin/conversations/{conversation_id}/admin_message")
 async def send_admin_message(conversation_id: str, payload: Dict[str, Any] = Body(...)):
@@ -476,43 +721,45 @@ async def send_admin_message(conversation_id: str, payload: Dict[str, Any] = Bod
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to send message: {str(e)}")
 
+def _transition_conversation(conversation_id: str, action: str, payload: Dict[str, Any], admin_user: Optional[str] = None) -> Dict[str, Any]:
+    """Run a conversation action; 404 if unknown, 409 with the current card on a conflict.
+
+    payload may carry expected_status / expected_admin_user: the values the
+    caller last saw, for compare-and-set.
+    """
+    expected = {key: payload[f"expected_{key}"] for key in ("status", "admin_user") if f"expected_{key}" in payload}
+    result = tools.transition_conversation(conversation_id, action, admin_user, expected)
+    if not result["success"]:
+        if result["conflict"]:
+            raise HTTPException(status_code=409, detail={"error": result["error"], "conversation": result["conversation"]})
+        raise HTTPException(status_code=404, detail=result["error"])
+    return result
+
 @app.post("/api/admin/conversations/{conversation_id}/takeover")
 async def takeover_conversation(conversation_id: str, payload: Dict[str, Any] = Body(...)):
-    """Take over a conversation"""
-    try:
-        admin_user = payload.get("admin_user", "Admin")
-        
-        conversations = tools.get_all_conversations()
-        for conv in conversations:
-            if conv["conversation_id"] == conversation_id:
-                conv["admin_user"] = admin_user
-                conv["status"] = "REQUIRES_HUMAN"
-                conv["last_updated"] = datetime.now().isoformat()
-                tools.save_conversation(conversation_id, conv)
-                return {"message": "Conversation taken over successfully"}
-        
-        raise HTTPException(status_code=404, detail="Conversation not found")
-            
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to take over conversation: {str(e)}")
+    """Take over a conversation (409 if another admin holds it)"""
+    result = _transition_conversation(conversation_id, "takeover", payload, payload.get("admin_user", "Admin"))
+    return {"message": "Conversation taken over successfully", **result}
 
 @app.post("/api/admin/conversations/{conversation_id}/close")
-async def close_conversation(conversation_id: str, payload: Dict[str, Any] = Body(...)):
+async def close_conversation(conversation_id: str, payload: Dict[str, Any] = Body(default={})):
     """Close a conversation"""
-    try:
-        conversations = tools.get_all_conversations()
-        for conv in conversations:
-            if conv["conversation_id"] == conversation_id:
-                conv["status"] = "CLOSED"
-                conv["is_active"] = False
-                conv["last_updated"] = datetime.now().isoformat()
-                tools.save_conversation(conversation_id, conv)
-                return {"message": "Conversation closed successfully"}
-        
-        raise HTTPException(status_code=404, detail="Conversation not found")
-            
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to close conversation: {str(e)}")
+    result = _transition_conversation(conversation_id, "close", payload or {})
+    return {"message": "Conversation closed successfully", **result}
+
+@app.post("/api/admin/conversations/{conversation_id}/reopen")
+async def reopen_conversation(conversation_id: str, payload: Dict[str, Any] = Body(default={})):
+    """Reopen a closed conversation"""
+    result = _transition_conversation(conversation_id, "reopen", payload or {})
+    return {"message": "Conversation reopened successfully", **result}
+
+@app.post("/api/admin/conversations/{conversation_id}/assign")
+async def assign_conversation(conversation_id: str, payload: Dict[str, Any] = Body(...)):
+    """Assign a conversation to an admin (admin_user null unassigns it)"""
+    if "admin_user" not in payload:
+        raise HTTPException(status_code=400, detail="admin_user is required")
+    result = _transition_conversation(conversation_id, "assign", payload, payload["admin_user"])
+    return {"message": "Conversation assigned successfully", **result}
 
 @app.post("/api/admin/cases/{case_id}/takeover")
 async def takeover_case(case_id: str, payload: Dict[str, Any] = Body(...)):
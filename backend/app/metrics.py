@@ -0,0 +1,273 @@
+"""In-process metrics with Prometheus text exposition for ``GET /metrics``.
+
+Histograms keep a preallocated list of per-bucket counts, so an observation
+is a bisect plus two additions under an uncontended lock. Labelled children
+are created once and reused; hot paths bind them at import or startup time
+(``timed``, the route middleware) so recording allocates nothing.
+
+Values that other modules already count (gateway counters, cache hit/miss
+totals, open WebSockets) are exported through ``register_callback`` and read
+only when ``/metrics`` is scraped.
+"""
+import abc
+import functools
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Seconds; covers in-process agents (sub-ms) through slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # One slot per bucket plus +Inf; cumulated only when exported
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class _Family(abc.ABC):
+    """A named metric with fixed label names and lazily created, cached children"""
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """A new child for one combination of label values"""
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._new_child()
+                    self._children[values] = child
+        return child
+
+    def _render_children(self, lines: List[str]):
+        for values, child in list(self._children.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}")
+
+    def render(self, lines: List[str]):
+        lines.append(f"# HELP {self.name} {self.documentation}")
+        lines.append(f"# TYPE {self.name} {self.kind}")
+        self._render_children(lines)
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def _render_children(self, lines: List[str]):
+        for values, child in list(self._children.items()):
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+
+
+class _Callback:
+    """Metric whose samples are produced at scrape time: fn() -> {label values: value}"""
+
+    def __init__(self, name: str, documentation: str, kind: str, labelnames: Sequence[str], fn: Callable[[], Dict[Tuple[str, ...], float]]):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+
+    def render(self, lines: List[str]):
+        lines.append(f"# HELP {self.name} {self.documentation}")
+        lines.append(f"# TYPE {self.name} {self.kind}")
+        for values, value in self.fn().items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}")
+
+
+_registry: List[object] = []
+
+
+def _register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return _register(Counter(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+
+def register_callback(name: str, documentation: str, kind: str, labelnames: Sequence[str],
+                      fn: Callable[[], Dict[Tuple[str, ...], float]]):
+    """Export values owned elsewhere, read at scrape time"""
+    _register(_Callback(name, documentation, kind, labelnames, fn))
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text format"""
+    lines: List[str] = []
+    for metric in _registry:
+        try:
+            metric.render(lines)
+        except Exception:
+            # A failing callback must not take the whole scrape down
+            continue
+    return "\n".join(lines) + "\n"
+
+
+# ==================== SHARED METRICS ====================
+
+HTTP_REQUEST_DURATION = histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route"))
+HTTP_SERVER_ERRORS = counter(
+    "http_server_errors_total", "HTTP responses with a 5xx status by route", ("method", "route"))
+AGENT_DURATION = histogram(
+    "agent_duration_seconds", "Agent function latency", ("agent",))
+LLM_REQUEST_DURATION = histogram(
+    "llm_request_duration_seconds", "Upstream LLM call latency, retries included", ("operation", "outcome"))
+STORAGE_DURATION = histogram(
+    "storage_duration_seconds", "JSON storage file read/write latency", ("file", "operation"))
+FALLBACK_ACTIVATIONS = counter(
+    "fallback_activations_total", "Rule-based fallbacks used instead of the LLM", ("agent",))
+
+
+def timed(histogram_child) -> Callable:
+    """Decorator recording a function's wall time into a bound histogram child"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram_child.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def time_agent(name: str) -> Callable:
+    """Shorthand for timing an agent function under agent_duration_seconds"""
+    return timed(AGENT_DURATION.labels(name))
+
+
+class RouteMetricsMiddleware:
+    """ASGI middleware timing HTTP requests per matched route template"""
+
+    def __init__(self, app):
+        self.app = app
+        self._by_endpoint: Dict[Callable, Tuple[object, object]] = {}
+        self._unmatched = (HTTP_REQUEST_DURATION.labels("", "unmatched"), HTTP_SERVER_ERRORS.labels("", "unmatched"))
+
+    def bind_routes(self, routes):
+        """Preallocate children for every HTTP route"""
+        for route in routes:
+            endpoint = getattr(route, "endpoint", None)
+            methods = getattr(route, "methods", None)
+            if endpoint is None or not methods:
+                continue
+            method = min(methods - {"HEAD"} or methods)
+            self._by_endpoint[endpoint] = (
+                HTTP_REQUEST_DURATION.labels(method, route.path),
+                HTTP_SERVER_ERRORS.labels(method, route.path)
+            )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if not self._by_endpoint:
+            self.bind_routes(scope["app"].routes)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router records the matched endpoint in the (shared) scope
+            duration_child, errors_child = self._by_endpoint.get(scope.get("endpoint"), self._unmatched)
+            duration_child.observe(time.perf_counter() - started)
+            if status >= 500:
+                errors_child.inc()
@@ -0,0 +1,439 @@
+"""Compact binary log of conversation message history.
+
+``conversations.json`` repeats every key in every message and stores
+timestamps as ISO strings. A message log stores the same data as:
+
+- length-prefixed records: a ``u32`` length, then a kind byte and a fixed
+  ``struct`` header;
+- timestamps as integer epoch microseconds. A flag marks the ``...Z`` form
+  (JavaScript ``toISOString``), so both formats the app writes round-trip
+  exactly; any other string is kept verbatim;
+- message types as a one-byte enum and senders interned in a per-file string
+  table;
+- records grouped into blocks of about ``BLOCK_SIZE`` bytes, compressed with
+  zstd (when ``zstandard`` is installed) or zlib, or stored raw.
+
+A trailing index maps each conversation id to its block and byte range.
+``MessageLogReader`` mmaps the file and decodes a single block to return
+one conversation. A message without exactly the usual four fields, or with
+non-string values, is stored as a JSON record. Conversion is lossless:
+``read_all()`` returns the original list of conversations.
+
+Files are written in one pass by ``MessageLogWriter``; there is no in-place
+append. Convert from ``backend/`` with:
+
+    python -m app.msglog convert conversations.json conversations.msglog --codec zlib
+    python -m app.msglog export conversations.msglog conversations.json
+    python -m app.msglog show conversations.msglog <conversation_id>
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.records import format_timestamp
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b"MSGLOG01"
+FORMAT_VERSION = 1
+# Uncompressed bytes per block; one lookup decodes at most one block (or one large conversation)
+BLOCK_SIZE = 64 * 1024
+
+CODECS = {"none": 0, "zlib": 1, "zstd": 2}
+CODEC_NAMES = {code: name for name, code in CODECS.items()}
+
+# Record kinds
+_META = 0          # position of "messages" among the keys (u16), then the other fields as compact JSON
+_MESSAGE = 1       # encoded message
+_JSON_MESSAGE = 2  # message kept as JSON (unusual keys or value types)
+_JSON_CONVERSATION = 3  # conversation without a "messages" list, kept whole
+
+# Message flags
+_TS_UTC_Z = 0x01   # timestamp was written as YYYY-MM-DDTHH:MM:SS.mmmZ
+_TS_RAW = 0x02     # timestamp kept verbatim; the ts field holds its byte length
+
+MESSAGE_TYPES = [None, "user", "agent", "admin", "system"]
+_TYPE_CODES = {name: code for code, name in enumerate(MESSAGE_TYPES)}
+_TYPE_INTERNED = 255
+_NO_SENDER = 0xFFFFFFFF
+_STANDARD_KEYS = {"timestamp", "type", "content", "sender"}
+
+_HEADER = struct.Struct("<8sHB")
+_BLOCK = struct.Struct("<II")          # stored length, raw length
+_FOOTER = struct.Struct("<QQ8s")       # strings block offset, index block offset, magic
+_LENGTH = struct.Struct("<I")
+_MESSAGE_HEADER = struct.Struct("<BBqI")  # flags, type code, timestamp, sender ref
+_INDEX_ENTRY = struct.Struct("<QIII")  # block offset, start, end, message count
+_ID_LENGTH = struct.Struct("<H")
+_KEY_POSITION = struct.Struct("<H")
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class MessageLogError(Exception):
+    """The file is not a readable message log"""
+
+
+# ==================== ENCODING ====================
+
+def default_codec() -> str:
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def _compress(codec: int, data: bytes) -> bytes:
+    if codec == CODECS["zlib"]:
+        return zlib.compress(data, 6)
+    if codec == CODECS["zstd"]:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return data
+
+
+def _decompress(codec: int, data: bytes) -> bytes:
+    if codec == CODECS["zlib"]:
+        return zlib.decompress(data)
+    if codec == CODECS["zstd"]:
+        if zstandard is None:
+            raise MessageLogError("file is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+def encode_timestamp(value: str) -> Optional[Tuple[int, int]]:
+    """(epoch microseconds, flags) if value is reproduced exactly, else None"""
+    utc_z = value.endswith("Z")
+    try:
+        moment = datetime.fromisoformat(value[:-1] if utc_z else value)
+    except ValueError:
+        return None
+    if moment.tzinfo is not None:
+        return None
+    micros = (moment - _EPOCH) // _MICROSECOND
+    if format_timestamp(micros, utc_z) != value:
+        return None
+    return micros, _TS_UTC_Z if utc_z else 0
+
+
+class MessageLogWriter:
+    """Writes conversations into a new message log file"""
+
+    def __init__(self, path: str, codec: str = None, block_size: int = BLOCK_SIZE):
+        codec = codec or default_codec()
+        if codec not in CODECS:
+            raise ValueError(f"unknown codec {codec!r}, expected one of {sorted(CODECS)}")
+        if codec == "zstd" and zstandard is None:
+            raise ValueError("zstd needs the zstandard package")
+        self.codec = CODECS[codec]
+        self.block_size = block_size
+        self._file = open(path, 'wb')
+        self._file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, self.codec))
+        self._strings: Dict[str, int] = {}
+        self._block = bytearray()
+        # (conversation id, start, end, message count) for conversations in the open block
+        self._pending: List[Tuple[str, int, int, int]] = []
+        self._index = bytearray()
+        self.conversations = 0
+        self.messages = 0
+
+    def _intern(self, value: str) -> int:
+        ref = self._strings.get(value)
+        if ref is None:
+            ref = self._strings[value] = len(self._strings)
+        return ref
+
+    def _record(self, kind: int, body: bytes):
+        self._block += _LENGTH.pack(len(body) + 1)
+        self._block.append(kind)
+        self._block += body
+
+    def _add_message(self, message: Any):
+        if (type(message) is dict and message.keys() == _STANDARD_KEYS and isinstance(message["timestamp"], str)
+                and isinstance(message["content"], str) and isinstance(message["sender"], (str, type(None)))
+                and isinstance(message["type"], (str, type(None)))):
+            timestamp = message["timestamp"]
+            encoded = encode_timestamp(timestamp)
+            if encoded is None:
+                raw_timestamp = timestamp.encode()
+                flags, ts = _TS_RAW, len(raw_timestamp)
+            else:
+                raw_timestamp = b""
+                ts, flags = encoded
+            type_code = _TYPE_CODES.get(message["type"], _TYPE_INTERNED)
+            sender = _NO_SENDER if message["sender"] is None else self._intern(message["sender"])
+            body = _MESSAGE_HEADER.pack(flags, type_code, ts, sender) + raw_timestamp
+            if type_code == _TYPE_INTERNED:
+                body += _LENGTH.pack(self._intern(message["type"]))
+            self._record(_MESSAGE, body + message["content"].encode())
+        else:
+            self._record(_JSON_MESSAGE, json.dumps(message, separators=(",", ":")).encode())
+
+    def add(self, conversation: Dict[str, Any]):
+        """Append one conversation (its fields and all its messages)"""
+        start = len(self._block)
+        messages = conversation.get("messages")
+        if isinstance(messages, list):
+            meta = {key: value for key, value in conversation.items() if key != "messages"}
+            # Key order is kept so that read-back conversations dump identically
+            position = _KEY_POSITION.pack(list(conversation).index("messages"))
+            self._record(_META, position + json.dumps(meta, separators=(",", ":")).encode())
+            for message in messages:
+                self._add_message(message)
+            count = len(messages)
+        else:
+            self._record(_JSON_CONVERSATION, json.dumps(conversation, separators=(",", ":")).encode())
+            count = 0
+        self._pending.append((str(conversation.get("conversation_id", "")), start, len(self._block), count))
+        self.conversations += 1
+        self.messages += count
+        if len(self._block) >= self.block_size:
+            self._flush_block()
+
+    def _write_block(self, raw: bytes) -> int:
+        offset = self._file.tell()
+        payload = _compress(self.codec, raw)
+        self._file.write(_BLOCK.pack(len(payload), len(raw)))
+        self._file.write(payload)
+        return offset
+
+    def _flush_block(self):
+        if not self._pending:
+            return
+        offset = self._write_block(bytes(self._block))
+        for conversation_id, start, end, count in self._pending:
+            encoded_id = conversation_id.encode()
+            self._index += _ID_LENGTH.pack(len(encoded_id)) + encoded_id + _INDEX_ENTRY.pack(offset, start, end, count)
+        self._block = bytearray()
+        self._pending = []
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._flush_block()
+        strings_offset = self._write_block(json.dumps(list(self._strings), separators=(",", ":")).encode())
+        index_offset = self._write_block(bytes(self._index))
+        self._file.write(_FOOTER.pack(strings_offset, index_offset, MAGIC))
+        self._file.close()
+
+    def __enter__(self) -> "MessageLogWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_message_log(path: str, conversations: Iterable[Dict[str, Any]], codec: str = None) -> Dict[str, int]:
+    """Write all conversations to path; returns conversation and message counts"""
+    with MessageLogWriter(path, codec) as writer:
+        for conversation in conversations:
+            writer.add(conversation)
+    return {"conversations": writer.conversations, "messages": writer.messages}
+
+
+# ==================== READING ====================
+
+class MessageLogReader:
+    """Memory-mapped reader with per-conversation lookup through the index"""
+
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise MessageLogError(f"{path} is empty")
+        if len(self._map) < _HEADER.size + _FOOTER.size:
+            self.close()
+            raise MessageLogError(f"{path} is too short to be a message log")
+        magic, version, self.codec = _HEADER.unpack_from(self._map, 0)
+        strings_offset, index_offset, end_magic = _FOOTER.unpack_from(self._map, len(self._map) - _FOOTER.size)
+        if magic != MAGIC or end_magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise MessageLogError(f"{path} is not a version {FORMAT_VERSION} message log")
+        self._strings: List[str] = json.loads(self._read_block(strings_offset))
+        self._index = self._parse_index(self._read_block(index_offset))
+        self._strings_offset = strings_offset
+        # Last decoded block, for lookups that land in the same block
+        self._cached_offset = -1
+        self._cached_block = b""
+
+    def _read_block(self, offset: int) -> bytes:
+        stored, _ = _BLOCK.unpack_from(self._map, offset)
+        start = offset + _BLOCK.size
+        return _decompress(self.codec, self._map[start:start + stored])
+
+    def _block(self, offset: int) -> bytes:
+        if offset != self._cached_offset:
+            self._cached_block = self._read_block(offset)
+            self._cached_offset = offset
+        return self._cached_block
+
+    @staticmethod
+    def _parse_index(data: bytes) -> Dict[str, Tuple[int, int, int, int]]:
+        index = {}
+        position, size = 0, len(data)
+        while position < size:
+            (length,) = _ID_LENGTH.unpack_from(data, position)
+            position += _ID_LENGTH.size
+            conversation_id = data[position:position + length].decode()
+            position += length
+            index[conversation_id] = _INDEX_ENTRY.unpack_from(data, position)
+            position += _INDEX_ENTRY.size
+        return index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, conversation_id: str) -> bool:
+        return conversation_id in self._index
+
+    def conversation_ids(self) -> List[str]:
+        return list(self._index)
+
+    def message_count(self, conversation_id: str) -> Optional[int]:
+        entry = self._index.get(conversation_id)
+        return entry[3] if entry else None
+
+    def _decode_message(self, block: bytes, position: int, end: int) -> Dict[str, Any]:
+        flags, type_code, ts, sender_ref = _MESSAGE_HEADER.unpack_from(block, position)
+        position += _MESSAGE_HEADER.size
+        if flags & _TS_RAW:
+            timestamp = block[position:position + ts].decode()
+            position += ts
+        else:
+            timestamp = format_timestamp(ts, flags & _TS_UTC_Z)
+        if type_code == _TYPE_INTERNED:
+            message_type = self._strings[_LENGTH.unpack_from(block, position)[0]]
+            position += _LENGTH.size
+        else:
+            message_type = MESSAGE_TYPES[type_code]
+        return {
+            "timestamp": timestamp,
+            "type": message_type,
+            "content": block[position:end].decode(),
+            "sender": None if sender_ref == _NO_SENDER else self._strings[sender_ref]
+        }
+
+    @staticmethod
+    def _records(block: bytes, start: int, end: int) -> Iterator[Tuple[int, int, int]]:
+        """(kind, body start, body end) for each record in block[start:end]"""
+        position = start
+        while position < end:
+            (length,) = _LENGTH.unpack_from(block, position)
+            body = position + _LENGTH.size
+            position = body + length
+            yield block[body], body + 1, position
+
+    def _decode_conversations(self, block: bytes, start: int, end: int) -> Iterator[Dict[str, Any]]:
+        conversation: Optional[Dict[str, Any]] = None
+        for kind, body, record_end in self._records(block, start, end):
+            if kind == _MESSAGE:
+                conversation["messages"].append(self._decode_message(block, body, record_end))
+            elif kind == _JSON_MESSAGE:
+                conversation["messages"].append(json.loads(block[body:record_end]))
+            else:
+                if conversation is not None:
+                    yield conversation
+                if kind == _META:
+                    (messages_at,) = _KEY_POSITION.unpack_from(block, body)
+                    items = list(json.loads(block[body + _KEY_POSITION.size:record_end]).items())
+                    items.insert(messages_at, ("messages", []))
+                    conversation = dict(items)
+                else:
+                    conversation = json.loads(block[body:record_end])
+        if conversation is not None:
+            yield conversation
+
+    def messages(self, conversation_id: str) -> Optional[List[Dict[str, Any]]]:
+        """One conversation's messages, decoding only the block that holds them"""
+        entry = self._index.get(conversation_id)
+        if entry is None:
+            return None
+        offset, start, end, _ = entry
+        block = self._block(offset)
+        messages = []
+        for kind, body, record_end in self._records(block, start, end):
+            if kind == _MESSAGE:
+                messages.append(self._decode_message(block, body, record_end))
+            elif kind == _JSON_MESSAGE:
+                messages.append(json.loads(block[body:record_end]))
+        return messages
+
+    def conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """One conversation as it appeared in conversations.json"""
+        entry = self._index.get(conversation_id)
+        if entry is None:
+            return None
+        offset, start, end, _ = entry
+        return next(self._decode_conversations(self._block(offset), start, end))
+
+    def iter_conversations(self) -> Iterator[Dict[str, Any]]:
+        """Every conversation in file order, decoding each block once"""
+        offset = _HEADER.size
+        while offset < self._strings_offset:
+            stored, _ = _BLOCK.unpack_from(self._map, offset)
+            block = self._read_block(offset)
+            yield from self._decode_conversations(block, 0, len(block))
+            offset += _BLOCK.size + stored
+
+    def read_all(self) -> List[Dict[str, Any]]:
+        return list(self.iter_conversations())
+
+    def close(self):
+        if not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "MessageLogReader":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# ==================== CLI ====================
+
+def main():
+    parser = argparse.ArgumentParser(description="Conversation message log utilities")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    convert_parser = subcommands.add_parser("convert", help="Convert a conversations JSON file into a message log")
+    convert_parser.add_argument("source")
+    convert_parser.add_argument("destination")
+    convert_parser.add_argument("--codec", choices=sorted(CODECS), default=None, help=f"default {default_codec()}")
+    export_parser = subcommands.add_parser("export", help="Write a message log back out as conversations JSON")
+    export_parser.add_argument("source")
+    export_parser.add_argument("destination")
+    show_parser = subcommands.add_parser("show", help="Print one conversation")
+    show_parser.add_argument("source")
+    show_parser.add_argument("conversation_id")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        with open(args.source, 'r') as f:
+            conversations = json.load(f)
+        counts = write_message_log(args.destination, conversations, args.codec)
+        print(f"Wrote {counts['conversations']} conversations ({counts['messages']} messages) to {args.destination}: "
+              f"{os.path.getsize(args.source):,} -> {os.path.getsize(args.destination):,} bytes")
+    elif args.command == "export":
+        with MessageLogReader(args.source) as reader:
+            conversations = reader.read_all()
+        with open(args.destination, 'w') as f:
+            json.dump(conversations, f, indent=2)
+        print(f"Exported {len(conversations)} conversations to {args.destination}")
+    elif args.command == "show":
+        with MessageLogReader(args.source) as reader:
+            conversation = reader.conversation(args.conversation_id)
+        if conversation is None:
+            parser.exit(1, f"{args.conversation_id} not found\n")
+        print(json.dumps(conversation, indent=2))
+
+
+if __name__ == "__main__":
+    main()
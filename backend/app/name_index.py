@@ -0,0 +1,129 @@
+"""Fuzzy candidate retrieval over policy holder names.
+
+Voice transcripts produce names like "jon doe" or "John A. Doe". Instead of
+scanning every holder, names are indexed two ways:
+
+- a phonetic key (Soundex of each name token) mapping to holders that sound
+  the same, and
+- a character-trigram inverted index.
+
+A query reads the rarest trigram postings up to a fixed budget, keeps the
+names sharing the most trigrams plus every phonetic match, and scores only
+those candidates exactly by trigram Dice similarity and phonetic token
+overlap - so query cost does not grow with the number of holders.
+"""
+import re
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Set, Tuple
+
+DEFAULT_MIN_SCORE = 0.6
+TRIGRAM_WEIGHT = 0.7
+PHONETIC_WEIGHT = 0.3
+
+# Query budget: posting entries read from the trigram index, and candidates scored exactly
+MAX_POSTINGS_READ = 20000
+MAX_CANDIDATES = 200
+
+_WORD_RE = re.compile(r"[a-z]+")
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"), **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"), "l": "4", **dict.fromkeys("mn", "5"), "r": "6"
+}
+
+
+def name_tokens(name: str) -> List[str]:
+    """Lowercase alphabetic tokens, dropping initials like the "A." in "John A. Doe\""""
+    return [t for t in _WORD_RE.findall((name or "").lower()) if len(t) > 1]
+
+
+def soundex(token: str) -> str:
+    """Classic 4-character Soundex code"""
+    code = token[0].upper()
+    previous = _SOUNDEX_CODES.get(token[0], "")
+    for char in token[1:]:
+        digit = _SOUNDEX_CODES.get(char, "")
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if char not in "hw":
+            previous = digit
+    return code.ljust(4, "0")
+
+
+def phonetic_key(tokens: List[str]) -> str:
+    return " ".join(soundex(t) for t in tokens)
+
+
+def trigrams(tokens: List[str]) -> Set[str]:
+    """Per-word padded trigrams, as in PostgreSQL's pg_trgm"""
+    grams = set()
+    for token in tokens:
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class NameIndex:
+    """Phonetic + trigram index over holder names"""
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._postings: Dict[str, array] = {}
+        self._phonetic: Dict[str, array] = {}
+        for name in names:
+            self.add(name)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, name: str):
+        """Index a holder name (idempotent); search results return it verbatim"""
+        tokens = name_tokens(name)
+        if not tokens or name in self._ids:
+            return
+        name_id = len(self.names)
+        self.names.append(name)
+        self._ids[name] = name_id
+        for gram in trigrams(tokens):
+            self._postings.setdefault(gram, array("I")).append(name_id)
+        self._phonetic.setdefault(phonetic_key(tokens), array("I")).append(name_id)
+
+    def search(self, name: str, limit: int = 5, min_score: float = DEFAULT_MIN_SCORE) -> List[Tuple[str, float]]:
+        """Ranked (indexed name, score) matches, best first"""
+        tokens = name_tokens(name)
+        if not tokens:
+            return []
+        query_grams = trigrams(tokens)
+        query_codes = [soundex(t) for t in tokens]
+
+        # Rare trigrams are the discriminating ones; very common ones such as
+        # a leading "  j" are skipped once the read budget is spent.
+        postings = sorted((self._postings[g] for g in query_grams if g in self._postings), key=len)
+        shared = Counter()
+        read = 0
+        for posting in postings:
+            if read and read + len(posting) > MAX_POSTINGS_READ:
+                break
+            shared.update(posting)
+            read += len(posting)
+        candidates = {name_id for name_id, _ in shared.most_common(MAX_CANDIDATES)}
+        candidates.update(self._phonetic.get(" ".join(query_codes), array("I"))[:MAX_CANDIDATES])
+
+        scored = []
+        for name_id in candidates:
+            candidate = self.names[name_id]
+            candidate_tokens = name_tokens(candidate)
+            candidate_grams = trigrams(candidate_tokens)
+            dice = 2 * len(query_grams & candidate_grams) / (len(query_grams) + len(candidate_grams))
+            candidate_codes = [soundex(t) for t in candidate_tokens]
+            shared_codes = sum(1 for code in query_codes if code in candidate_codes)
+            phonetic = shared_codes / max(len(query_codes), len(candidate_codes))
+            score = TRIGRAM_WEIGHT * dice + PHONETIC_WEIGHT * phonetic
+            if score >= min_score:
+                scored.append((candidate, round(score, 3)))
+
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:limit]
@@ -0,0 +1,339 @@
+"""Policy repository with indexed lookups for the verification agent.
+
+Policies are looked up by normalized holder name, policy number or date of
+birth. Validity dates are parsed once when a policy is loaded, and recently
+used holders are kept in an LRU so hot lookups skip the backing store.
+
+Holder names are also searchable fuzzily through a ``NameIndex`` (phonetic
+keys plus trigrams), built on first use, for voice transcripts that do not
+match exactly.
+
+Backends:
+- ``InMemoryPolicyStore``: a list of policy dicts, or a JSON file of them.
+- ``SqlitePolicyStore``: an indexed SQLite table, for policy books too large
+  to hold in memory.
+
+``POLICY_STORE_PATH`` selects the store (``.json`` or ``.db``/``.sqlite``);
+without it the built-in demo policy is used. Convert a JSON policy file into
+SQLite from ``backend/`` with:
+
+    python -m app.policy_store import policies.json policies.db
+"""
+import abc
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.name_index import DEFAULT_MIN_SCORE, NameIndex
+
+HOT_POLICY_CACHE_SIZE = 10000
+
+# A fuzzy match verifies a customer only if it is this good and clearly
+# better than the runner-up holder
+FUZZY_MATCH_THRESHOLD = 0.75
+FUZZY_MATCH_MARGIN = 0.05
+
+
+class PolicyEntry(NamedTuple):
+    """A policy with its validity window parsed up front"""
+    policy: Dict[str, Any]
+    start_date: datetime
+    end_date: datetime
+
+    def is_active(self, at: datetime = None) -> bool:
+        at = at or datetime.now()
+        return self.start_date <= at <= self.end_date
+
+
+def normalize_name(name: str) -> str:
+    """Index key for holder names: lowercase, single-spaced"""
+    return " ".join((name or "").lower().split())
+
+
+def make_entry(policy: Dict[str, Any]) -> PolicyEntry:
+    return PolicyEntry(
+        policy,
+        datetime.strptime(policy["start_date"], "%Y-%m-%d"),
+        datetime.strptime(policy["end_date"], "%Y-%m-%d")
+    )
+
+
+class LRUCache:
+    """Small thread-safe LRU mapping"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: "OrderedDict[Any, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class PolicyStore(abc.ABC):
+    """Indexed policy lookups with an LRU of hot holders; backends implement the _load_* methods"""
+
+    def __init__(self, cache_size: int = HOT_POLICY_CACHE_SIZE):
+        self._hot = LRUCache(cache_size)
+        self._name_index: Optional[NameIndex] = None
+        self._name_index_lock = threading.Lock()
+
+    # ---- backend hooks ----
+    @abc.abstractmethod
+    def _holder_names(self) -> Iterable[str]:
+        """Every normalized holder name in the store"""
+
+    @abc.abstractmethod
+    def _load_by_holder(self, holder_key: str) -> List[PolicyEntry]:
+        ...
+
+    @abc.abstractmethod
+    def _load_by_number(self, policy_number: str) -> Optional[PolicyEntry]:
+        ...
+
+    @abc.abstractmethod
+    def _load_by_dob(self, dob: str) -> List[PolicyEntry]:
+        ...
+
+    @abc.abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    # ---- lookups ----
+    def find_by_holder(self, name: str) -> List[PolicyEntry]:
+        """Every policy held under this name (case and spacing insensitive)"""
+        holder_key = normalize_name(name)
+        if not holder_key:
+            return []
+        entries = self._hot.get(holder_key)
+        if entries is None:
+            entries = self._load_by_holder(holder_key)
+            self._hot.put(holder_key, entries)
+        return entries
+
+    def find_by_number(self, policy_number: str) -> Optional[PolicyEntry]:
+        return self._load_by_number((policy_number or "").strip().upper())
+
+    def find_by_dob(self, dob: str) -> List[PolicyEntry]:
+        return self._load_by_dob((dob or "").strip())
+
+    def lookup_holder(self, name: str, dob: str = None, at: datetime = None) -> Optional[PolicyEntry]:
+        """The holder's policy to verify against - an active one if there is one"""
+        entries = self.find_by_holder(name)
+        if dob:
+            entries = [e for e in entries if e.policy.get("policy_holder_dob") == dob]
+        if not entries:
+            return None
+        return next((e for e in entries if e.is_active(at)), entries[0])
+
+    def cache_info(self) -> Tuple[int, int]:
+        """(hits, misses) of the hot-holder LRU"""
+        return self._hot.hits, self._hot.misses
+
+    # ---- fuzzy lookups ----
+    def name_index(self) -> NameIndex:
+        """The holder-name index, built on first use"""
+        if self._name_index is None:
+            with self._name_index_lock:
+                if self._name_index is None:
+                    self._name_index = NameIndex(self._holder_names())
+        return self._name_index
+
+    def search_holders(self, name: str, limit: int = 5, min_score: float = DEFAULT_MIN_SCORE) -> List[Tuple[str, float]]:
+        """Ranked (holder name, score) fuzzy matches"""
+        return self.name_index().search(name, limit=limit, min_score=min_score)
+
+    def fuzzy_lookup_holder(self, name: str, min_score: float = FUZZY_MATCH_THRESHOLD,
+                            margin: float = FUZZY_MATCH_MARGIN) -> Optional[Tuple[PolicyEntry, str, float]]:
+        """(entry, matched holder name, score) for an unambiguous fuzzy match"""
+        matches = self.search_holders(name, limit=2, min_score=min_score)
+        if not matches:
+            return None
+        matched_name, score = matches[0]
+        if len(matches) > 1 and score - matches[1][1] < margin:
+            return None
+        entry = self.lookup_holder(matched_name)
+        return (entry, matched_name, score) if entry else None
+
+
+class InMemoryPolicyStore(PolicyStore):
+    """Policies held in memory with dict indexes"""
+
+    def __init__(self, policies: Iterable[Dict[str, Any]], cache_size: int = HOT_POLICY_CACHE_SIZE):
+        super().__init__(cache_size)
+        self._by_holder: Dict[str, List[PolicyEntry]] = {}
+        self._by_number: Dict[str, PolicyEntry] = {}
+        self._by_dob: Dict[str, List[PolicyEntry]] = {}
+        for policy in policies:
+            entry = make_entry(policy)
+            self._by_holder.setdefault(normalize_name(policy["policy_holder"]), []).append(entry)
+            self._by_number[policy["policy_number"].strip().upper()] = entry
+            if policy.get("policy_holder_dob"):
+                self._by_dob.setdefault(policy["policy_holder_dob"], []).append(entry)
+
+    @classmethod
+    def from_json_file(cls, path: str, **kwargs) -> "InMemoryPolicyStore":
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return cls(data.get("policies", []) if isinstance(data, dict) else data, **kwargs)
+
+    def _holder_names(self) -> Iterable[str]:
+        return self._by_holder.keys()
+
+    def _load_by_holder(self, holder_key: str) -> List[PolicyEntry]:
+        return self._by_holder.get(holder_key, [])
+
+    def _load_by_number(self, policy_number: str) -> Optional[PolicyEntry]:
+        return self._by_number.get(policy_number)
+
+    def _load_by_dob(self, dob: str) -> List[PolicyEntry]:
+        return self._by_dob.get(dob, [])
+
+    def __len__(self) -> int:
+        return len(self._by_number)
+
+
+class SqlitePolicyStore(PolicyStore):
+    """Policies in an indexed SQLite table; only hot holders are held in memory"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS policies (
+            policy_number TEXT PRIMARY KEY,
+            holder_key TEXT NOT NULL,
+            policy_holder_dob TEXT,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_policies_holder ON policies (holder_key);
+        CREATE INDEX IF NOT EXISTS idx_policies_dob ON policies (policy_holder_dob);
+    """
+
+    def __init__(self, path: str, cache_size: int = HOT_POLICY_CACHE_SIZE):
+        super().__init__(cache_size)
+        self.path = path
+        self._local = threading.local()
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections are per-thread; FastAPI runs sync work in a pool
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path)
+            self._local.connection = connection
+        return connection
+
+    def _entries(self, rows) -> List[PolicyEntry]:
+        return [make_entry(json.loads(data)) for (data,) in rows]
+
+    def _holder_names(self) -> Iterable[str]:
+        for (holder_key,) in self._connection().execute("SELECT DISTINCT holder_key FROM policies"):
+            yield holder_key
+
+    def _load_by_holder(self, holder_key: str) -> List[PolicyEntry]:
+        rows = self._connection().execute("SELECT data FROM policies WHERE holder_key = ?", (holder_key,))
+        return self._entries(rows)
+
+    def _load_by_number(self, policy_number: str) -> Optional[PolicyEntry]:
+        rows = self._connection().execute("SELECT data FROM policies WHERE policy_number = ?", (policy_number,))
+        entries = self._entries(rows)
+        return entries[0] if entries else None
+
+    def _load_by_dob(self, dob: str) -> List[PolicyEntry]:
+        rows = self._connection().execute("SELECT data FROM policies WHERE policy_holder_dob = ?", (dob,))
+        return self._entries(rows)
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM policies").fetchone()[0]
+
+    def upsert_many(self, policies: Iterable[Dict[str, Any]]) -> int:
+        """Insert or replace policies in one transaction"""
+        rows = (
+            (p["policy_number"].strip().upper(), normalize_name(p["policy_holder"]), p.get("policy_holder_dob"),
+             p["start_date"], p["end_date"], json.dumps(p))
+            for p in policies
+        )
+        connection = self._connection()
+        with connection:
+            cursor = connection.executemany("INSERT OR REPLACE INTO policies VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self._hot.clear()
+        self._name_index = None
+        return cursor.rowcount
+
+
+def open_policy_store(path: str, **kwargs) -> PolicyStore:
+    """Open a JSON or SQLite policy store based on the file extension"""
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        return SqlitePolicyStore(path, **kwargs)
+    return InMemoryPolicyStore.from_json_file(path, **kwargs)
+
+
+# Process-wide store - created on first use
+_store: Optional[PolicyStore] = None
+_store_lock = threading.Lock()
+
+
+def get_policy_store() -> PolicyStore:
+    """The configured policy store, opened lazily"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                path = os.getenv("POLICY_STORE_PATH")
+                if path:
+                    _store = open_policy_store(path)
+                else:
+                    from app.tools import JOHN_DOE_POLICY
+                    _store = InMemoryPolicyStore([JOHN_DOE_POLICY])
+    return _store
+
+
+def set_policy_store(store: Optional[PolicyStore]):
+    """Swap the process-wide store (None re-reads the configuration on next use)"""
+    global _store
+    _store = store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Policy store utilities")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    import_parser = subcommands.add_parser("import", help="Load a JSON policy file into a SQLite store")
+    import_parser.add_argument("source")
+    import_parser.add_argument("database")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        with open(args.source, 'r') as f:
+            data = json.load(f)
+        policies = data.get("policies", []) if isinstance(data, dict) else data
+        store = SqlitePolicyStore(args.database)
+        store.upsert_many(policies)
+        print(f"Imported {len(policies)} policies into {args.database} ({len(store)} total)")
+
+
+if __name__ == "__main__":
+    main()
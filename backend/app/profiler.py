@@ -0,0 +1,200 @@
+"""Opt-in sampling profiler for individual HTTP requests.
+
+A request is profiled when it carries ``X-Profile: 1`` or is picked by
+``PROFILE_SAMPLE_RATE``. While at least one profiled request is in flight, a
+background thread samples every thread's stack through
+``sys._current_frames()`` every ``PROFILE_INTERVAL_MS``. That covers the event
+loop as well as thread-pool workers running blocking work (file I/O, LLM
+calls via ``asyncio.to_thread``). Idle threads are skipped. Stacks are prefixed
+with the thread name; other requests running at the same time can show up in
+a profile, as with any whole-process sampler.
+
+Finished profiles are kept in a bounded buffer (``PROFILE_BUFFER_SIZE``). They
+are served as collapsed stacks (``frame;frame;frame count``), which
+flamegraph.pl, speedscope and inferno accept directly. The response carries
+``X-Profile-Id`` to look the profile up.
+"""
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+# Innermost frames in these modules mean the thread is waiting, not working
+IDLE_MODULES = ("threading.py", "queue.py", "selectors.py")
+# ...as do these functions blocking in C code (file suffix, function)
+IDLE_FUNCTIONS = {("handlers.py", "dequeue")}
+# Bounds the sampler's cost when many requests opt in at once
+MAX_ACTIVE_PROFILES = 8
+
+
+class Profile:
+    """Collapsed-stack samples for one request"""
+
+    def __init__(self, profile_id: str, method: str, path: str, interval: float):
+        self.profile_id = profile_id
+        self.method = method
+        self.path = path
+        self.interval = interval
+        self.started_at = datetime.now().isoformat()
+        self.status: Optional[int] = None
+        self.duration_ms: Optional[float] = None
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self._started = time.perf_counter()
+
+    def finish(self, status: int):
+        self.status = status
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 2)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "profile_id": self.profile_id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000
+        }
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    parts = code.co_filename.replace("\\", "/").rsplit("/", 2)
+    return f"{code.co_name} ({'/'.join(parts[-2:])}:{code.co_firstlineno})"
+
+
+def _collapse(frame) -> Optional[str]:
+    """Root-first ``;``-joined stack, or None for an idle thread"""
+    code = frame.f_code
+    if code.co_filename.endswith(IDLE_MODULES) or (code.co_filename.rsplit("/", 1)[-1], code.co_name) in IDLE_FUNCTIONS:
+        return None
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+class Profiler:
+    """Shared sampler thread plus a bounded buffer of finished profiles"""
+
+    def __init__(self, interval: float = 0.005, sample_rate: float = 0.0, buffer_size: int = 50):
+        self.interval = interval
+        self.sample_rate = sample_rate
+        self._active: List[Profile] = []
+        self._finished: Deque[Profile] = deque(maxlen=buffer_size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls) -> "Profiler":
+        return cls(
+            interval=float(os.getenv("PROFILE_INTERVAL_MS", 5)) / 1000,
+            sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", 0)),
+            buffer_size=int(os.getenv("PROFILE_BUFFER_SIZE", 50))
+        )
+
+    def should_profile(self, header_value: Optional[bytes]) -> bool:
+        if header_value is not None:
+            return header_value.strip().lower() in (b"1", b"true", b"yes")
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self, method: str, path: str) -> Optional[Profile]:
+        with self._lock:
+            if len(self._active) >= MAX_ACTIVE_PROFILES:
+                return None
+            profile = Profile(f"{int(time.time())}-{next(self._ids)}", method, path, self.interval)
+            self._active.append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+            self._lock.notify()
+        return profile
+
+    def stop(self, profile: Profile, status: int):
+        with self._lock:
+            profile.finish(status)
+            self._active.remove(profile)
+            self._finished.append(profile)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while True:
+            with self._lock:
+                while not self._active:
+                    self._lock.wait()
+
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = _collapse(frame)
+                if stack:
+                    stacks.append(f"{names.get(thread_id, thread_id)};{stack}")
+            with self._lock:
+                # Only profiles still running; finished ones are read by the admin endpoints
+                for profile in self._active:
+                    profile.samples += 1
+                    profile.stacks.update(stacks)
+            time.sleep(self.interval)
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """Summaries of finished profiles, newest first"""
+        return [profile.summary() for profile in reversed(self._finished)]
+
+    def get_profile(self, profile_id: str) -> Optional[Profile]:
+        return next((p for p in self._finished if p.profile_id == profile_id), None)
+
+
+profiler = Profiler.from_env()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests selected by header or sample rate"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        header_value = next((value for name, value in scope["headers"] if name == PROFILE_HEADER), None)
+        if not profiler.should_profile(header_value):
+            await self.app(scope, receive, send)
+            return
+
+        profile = profiler.start(scope["method"], scope["path"])
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_profile_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(PROFILE_ID_HEADER, profile.profile_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop(profile, status)
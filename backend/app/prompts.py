@@ -0,0 +1,173 @@
+"""System prompts for the LLM agents, compiled once per policy version.
+
+Provider-side prompt caching matches on the longest identical prefix, so every
+prompt here is laid out static-first: the instructions and policy wording are
+rendered once per policy version (``compile_prompts``), and anything that
+changes per call - the conversation step, collected data, the customer's
+words - is appended at the end or sent in the user message.
+
+``record_usage`` keeps per-prompt token counts (prompt tokens and the part
+served from the provider's cache), estimated from the prompt length when a
+response carries no usage data.
+"""
+import hashlib
+import json
+import threading
+from typing import Any, Dict, NamedTuple
+
+# Rough chars-per-token ratio for estimates when usage is not reported
+CHARS_PER_TOKEN = 4
+
+CONVERSATION_PROMPT = """You are a helpful insurance roadside assistance agent. Your job is to guide customers through our assistance process with empathy and professionalism.
+
+YOUR ROLE BY STEP:
+- Step 1: Customer described their problem. Ask for their full name for policy verification.
+- Step 1.5: If clarification needed about potential exclusions, ask tactful questions about circumstances.
+- Step 2: Customer provided name. Thank them, verify their policy coverage, and ask for their exact location (street name, landmarks, etc.) all in one response.
+- Step 3: (Deprecated - skip to step 4)
+- Step 4: Location received. Thank them and confirm you have all the information needed. DO NOT mention dispatch - just say you'll process their request.
+- Step 5: Process complete.
+
+GUIDELINES:
+- Be empathetic and professional
+- Keep responses concise (2-3 sentences max)
+- When asking clarification questions, be tactful and natural
+- Never directly ask about exclusions - gather context naturally
+- In step 2, combine policy verification with location request
+- Sound natural and human-like
+- Show understanding of their situation"""
+
+CONVERSATION_STATE_TEMPLATE = """
+
+CURRENT SITUATION:
+- Conversation step: {step}
+- Information collected: {collected}"""
+
+PROBLEM_ANALYSIS_TEMPLATE = """You are an insurance policy analyzer. Analyze the customer's problem description and determine:
+1. The specific problem type
+2. Whether there are potential exclusions that need clarification
+3. Whether it's covered under the policy (only if no clarification needed)
+4. If clarification is needed, what tactful questions to ask
+
+POLICY COVERAGE:
+{coverage}
+
+POLICY EXCLUSIONS:
+{exclusions}
+
+IMPORTANT: If the description might involve exclusions (commercial use, racing events, off-road use), set "needs_clarification": true and provide tactful questions instead of immediately denying coverage.
+
+Return your analysis in this exact JSON format:
+{{
+    "problem_type": "specific problem category",
+    "needs_clarification": true/false,
+    "clarification_questions": ["tactful question 1", "tactful question 2"] or null,
+    "potential_exclusions": ["exclusion1", "exclusion2"] or null,
+    "is_covered": true/false/null,
+    "coverage_reason": "explanation of coverage decision or why clarification needed",
+    "suggested_service": "recommended service type if covered"
+}}
+
+Examples of tactful questions:
+- "To help me find the best assistance for you, could you tell me a bit more about where this happened? Were you on a main road or perhaps somewhere more remote?"
+- "I'd like to make sure I get you the right help - were you driving for personal use when this occurred?"
+- "To ensure I dispatch the most appropriate service, could you describe the area where you're located? Is it easily accessible by our service vehicles?"
+
+Be tactful and professional - never directly ask "were you off-roading?" but gather context naturally."""
+
+CLARIFICATION_ANALYSIS_PROMPT = """You are an insurance policy analyzer. Based on the customer's clarification response, determine if their situation falls under policy exclusions.
+
+The potential exclusions to check are listed with the customer's response.
+
+EXCLUSION DEFINITIONS:
+- off_road_use: Driving on unpaved roads, trails, beaches, or any non-public roadways
+- commercial_use: Using vehicle for business purposes, deliveries, or work-related activities
+- racing_events: Participating in races, competitions, or high-speed events
+
+Analyze the customer's response and determine if any exclusions apply.
+
+Return your analysis in this exact JSON format:
+{
+    "exclusions_apply": true/false,
+    "applicable_exclusions": ["exclusion1", "exclusion2"] or [],
+    "is_covered": true/false,
+    "coverage_reason": "explanation of coverage decision",
+    "confidence": 0.0-1.0
+}
+
+Be conservative - if there's clear evidence of exclusion activity, deny coverage. If unclear or likely covered, approve."""
+
+
+class PromptSet(NamedTuple):
+    """The static system prompts for one policy version"""
+    version: str
+    conversation: str
+    problem_analysis: str
+    clarification_analysis: str
+
+    def conversation_prompt(self, step: Any, collected: Dict[str, Any]) -> str:
+        """Conversation instructions with the per-turn state appended last"""
+        return self.conversation + CONVERSATION_STATE_TEMPLATE.format(step=step, collected=collected)
+
+
+def policy_version(policy: Dict[str, Any]) -> str:
+    """Changes whenever the policy wording the prompts depend on changes"""
+    wording = json.dumps([policy["coverage"], policy["exclusions"]], sort_keys=True)
+    return hashlib.sha1(wording.encode()).hexdigest()[:12]
+
+
+def compile_prompts(policy: Dict[str, Any]) -> PromptSet:
+    return PromptSet(
+        version=policy_version(policy),
+        conversation=CONVERSATION_PROMPT,
+        problem_analysis=PROBLEM_ANALYSIS_TEMPLATE.format(
+            coverage=json.dumps(policy["coverage"]["roadside_assistance"]["services"], indent=2),
+            exclusions=policy["exclusions"]
+        ),
+        clarification_analysis=CLARIFICATION_ANALYSIS_PROMPT
+    )
+
+
+# ==================== TOKEN USAGE ====================
+
+_usage: Dict[str, Dict[str, int]] = {}
+_usage_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _usage_counts(usage) -> tuple:
+    """(prompt tokens, cached tokens) from a chat completion or responses usage object"""
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    if prompt_tokens is None:
+        prompt_tokens = getattr(usage, "input_tokens", None)
+    details = getattr(usage, "prompt_tokens_details", None) or getattr(usage, "input_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", None) or 0
+    return prompt_tokens, cached_tokens
+
+
+def record_usage(kind: str, response: Any, prompt_text: str) -> Dict[str, int]:
+    """Add one call's prompt token counts to the per-kind totals and return them"""
+    prompt_tokens, cached_tokens = _usage_counts(getattr(response, "usage", None))
+    estimated = prompt_tokens is None
+    if estimated:
+        prompt_tokens, cached_tokens = estimate_tokens(prompt_text), 0
+
+    with _usage_lock:
+        totals = _usage.setdefault(kind, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "estimated_calls": 0})
+        totals["calls"] += 1
+        totals["prompt_tokens"] += prompt_tokens
+        totals["cached_tokens"] += cached_tokens
+        totals["estimated_calls"] += int(estimated)
+    return {"prompt_tokens": prompt_tokens, "cached_tokens": cached_tokens, "estimated": estimated}
+
+
+def usage_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-kind totals plus the share of prompt tokens served from the provider cache"""
+    with _usage_lock:
+        stats = {kind: dict(totals) for kind, totals in _usage.items()}
+    for totals in stats.values():
+        totals["cache_hit_ratio"] = round(totals["cached_tokens"] / totals["prompt_tokens"], 3) if totals["prompt_tokens"] else 0.0
+    return stats
@@ -0,0 +1,265 @@
+"""Ephemeral client secrets for the OpenAI Realtime API.
+
+One pooled ``httpx.AsyncClient`` is opened for the application's lifetime
+(keep-alive, HTTP/2 when ``h2`` is installed, bounded timeouts, retries), so
+starting a voice session no longer pays for TCP/TLS setup. A small pool of
+secrets is minted ahead of demand and handed out while they still have enough
+lifetime left, taking the upstream round trip off the session-start path.
+
+Configuration (environment):
+- ``OPENAI_BASE_URL``: API base, e.g. a local stub server (default OpenAI)
+- ``REALTIME_HTTP_MAX_CONNECTIONS`` / ``REALTIME_HTTP_MAX_KEEPALIVE``
+- ``REALTIME_HTTP_TIMEOUT`` / ``REALTIME_HTTP_CONNECT_TIMEOUT`` (seconds)
+- ``REALTIME_HTTP_RETRIES``: retries for connection errors, 429 and 5xx
+- ``REALTIME_SECRET_POOL_SIZE``: secrets kept pre-minted (0 disables)
+- ``REALTIME_SECRET_MIN_TTL``: seconds of lifetime a pooled secret must have left
+
+Only secrets whose response carries ``expires_at`` can be pooled; if
+upstream mints one without it, pre-minting is turned off.
+
+httpx is imported when the client is created, not when this module is.
+"""
+import asyncio
+import importlib.util
+import logging
+import math
+import os
+import random
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Optional, Tuple
+
+from app.log import log_event
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+SESSION_CONFIG = {
+    "session": {
+        "type": "realtime",
+        "model": "gpt-realtime",
+        "audio": {
+            "output": {"voice": "alloy"}
+        }
+    }
+}
+
+# Retried upstream statuses
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RealtimeSecretError(Exception):
+    """Upstream refused or failed to mint a client secret"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _parse_secret(response: "httpx.Response") -> Tuple[str, Optional[float]]:
+    """(value, expires_at or None) from a mint response; RealtimeSecretError(502) if it is malformed"""
+    try:
+        data = response.json()
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        raise RealtimeSecretError(502, "Invalid client secret response: body is not a JSON object")
+    value = data.get("value")
+    if not isinstance(value, str) or not value:
+        raise RealtimeSecretError(502, "Invalid client secret response: missing value")
+    expires_at = data.get("expires_at")
+    if expires_at is None:
+        return value, None
+    if isinstance(expires_at, bool) or not isinstance(expires_at, (int, float)) or not math.isfinite(expires_at):
+        raise RealtimeSecretError(502, f"Invalid client secret response: expires_at {expires_at!r}")
+    return value, float(expires_at) if expires_at else None
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+class RealtimeSecretClient:
+    """Pooled HTTP client plus a pre-minted secret cache"""
+
+    def __init__(self, base_url: str = None, max_connections: int = 20, max_keepalive: int = 10,
+                 timeout: float = 10.0, connect_timeout: float = 3.0, retries: int = 2,
+                 pool_size: int = 2, min_ttl: float = 30.0):
+        import httpx
+        self.base_url = (base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.retries = retries
+        self.pool_size = pool_size
+        self.min_ttl = min_ttl
+        self.http2 = importlib.util.find_spec("h2") is not None
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._pool: Deque[Tuple[str, float]] = deque()
+        self._refill_needed = asyncio.Event()
+        self._refill_task: Optional[asyncio.Task] = None
+        self._refill_timer: Optional[asyncio.TimerHandle] = None
+        self.stats = {"minted": 0, "served_from_pool": 0, "served_direct": 0, "expired_discarded": 0, "mint_failures": 0}
+
+    @classmethod
+    def from_env(cls) -> "RealtimeSecretClient":
+        return cls(
+            max_connections=_env_int("REALTIME_HTTP_MAX_CONNECTIONS", 20),
+            max_keepalive=_env_int("REALTIME_HTTP_MAX_KEEPALIVE", 10),
+            timeout=_env_float("REALTIME_HTTP_TIMEOUT", 10.0),
+            connect_timeout=_env_float("REALTIME_HTTP_CONNECT_TIMEOUT", 3.0),
+            retries=_env_int("REALTIME_HTTP_RETRIES", 2),
+            pool_size=_env_int("REALTIME_SECRET_POOL_SIZE", 2),
+            min_ttl=_env_float("REALTIME_SECRET_MIN_TTL", 30.0)
+        )
+
+    # ---- lifecycle ----
+    async def start(self):
+        import httpx
+        transport = httpx.AsyncHTTPTransport(retries=self.retries, http2=self.http2, limits=self.limits)
+        self._client = httpx.AsyncClient(base_url=self.base_url, transport=transport, timeout=self.timeout)
+        # Only pre-mint when there is a key to mint with
+        if self.pool_size > 0 and os.getenv("OPENAI_API_KEY"):
+            self._refill_task = asyncio.create_task(self._refill_loop())
+            self._refill_needed.set()
+
+    async def close(self):
+        if self._refill_timer:
+            self._refill_timer.cancel()
+            self._refill_timer = None
+        if self._refill_task:
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+            self._refill_task = None
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+        self._pool.clear()
+
+    # ---- minting ----
+    async def mint(self) -> Tuple[str, Optional[float]]:
+        """Mint one secret upstream: (value, expires_at epoch seconds, None if upstream gave none)
+
+        Raises RealtimeSecretError for upstream refusals, transport failures and malformed responses alike.
+        """
+        import httpx
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise RealtimeSecretError(500, "OpenAI API key not configured")
+        if self._client is None:
+            raise RealtimeSecretError(503, "Realtime client not started")
+
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self._client.post(
+                    "/realtime/client_secrets",
+                    headers={"Authorization": f"Bearer {api_key}"},
+                    json=SESSION_CONFIG
+                )
+            except httpx.HTTPError as e:
+                self.stats["mint_failures"] += 1
+                raise RealtimeSecretError(502, f"Request failed: {e}") from e
+            if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                break
+            # Jittered exponential backoff before retrying 429/5xx
+            await asyncio.sleep((0.1 * 2 ** attempt) * (0.5 + random.random()))
+
+        if response.status_code != 200:
+            self.stats["mint_failures"] += 1
+            raise RealtimeSecretError(response.status_code, f"Failed to create client secret: {response.text}")
+
+        try:
+            value, expires_at = _parse_secret(response)
+        except RealtimeSecretError:
+            self.stats["mint_failures"] += 1
+            raise
+        self.stats["minted"] += 1
+        return value, expires_at
+
+    async def get_secret(self) -> str:
+        """A secret with at least min_ttl left - pre-minted if one is ready"""
+        secret = self._take_pooled()
+        if secret:
+            self.stats["served_from_pool"] += 1
+        else:
+            secret, _ = await self.mint()
+            self.stats["served_direct"] += 1
+        self._refill_needed.set()
+        return secret
+
+    def _take_pooled(self) -> Optional[str]:
+        deadline = time.time() + self.min_ttl
+        while self._pool:
+            value, expires_at = self._pool.popleft()
+            if expires_at >= deadline:
+                return value
+            self.stats["expired_discarded"] += 1
+        return None
+
+    async def _refill_loop(self):
+        failures = 0
+        while True:
+            await self._refill_needed.wait()
+            self._refill_needed.clear()
+            # Drop secrets that would be too old to hand out
+            deadline = time.time() + self.min_ttl
+            while self._pool and self._pool[0][1] < deadline:
+                self._pool.popleft()
+                self.stats["expired_discarded"] += 1
+            try:
+                while len(self._pool) < self.pool_size:
+                    value, expires_at = await self.mint()
+                    if expires_at is None:
+                        # Its lifetime is unknown, so it cannot be checked before handing it out
+                        log_event(logger, logging.WARNING, "realtime_secret_pool_disabled", reason="no expires_at")
+                        self.pool_size = 0
+                        return
+                    self._pool.append((value, expires_at))
+                failures = 0
+            except RealtimeSecretError:
+                failures += 1
+                await asyncio.sleep(min(30.0, 0.5 * 2 ** failures))
+                self._refill_needed.set()
+                continue
+            # Wake up again before the oldest pooled secret goes stale (one timer at a time)
+            if self._refill_timer:
+                self._refill_timer.cancel()
+                self._refill_timer = None
+            if self._pool:
+                self._refill_timer = asyncio.get_running_loop().call_later(
+                    max(1.0, self._pool[0][1] - self.min_ttl - time.time()), self._refill_needed.set
+                )
+
+
+# Application-wide client - started and closed by the FastAPI lifespan
+_client: Optional[RealtimeSecretClient] = None
+
+
+async def start_client() -> RealtimeSecretClient:
+    global _client
+    if _client is None:
+        _client = RealtimeSecretClient.from_env()
+        await _client.start()
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def get_client() -> Optional[RealtimeSecretClient]:
+    return _client
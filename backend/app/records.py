@@ -0,0 +1,357 @@
+"""Typed in-memory records for claims, history entries, conversations and messages.
+
+Storage files hold these as JSON objects. Parsed into dicts, every record
+carries its own copy of each key and a fresh string for every repeated value.
+These classes are slotted dataclasses instead:
+
+- timestamps the app writes (``datetime.isoformat()``, or the browser's
+  ``...Z`` form) are packed into one ``PackedTimestamp`` int: epoch
+  microseconds shifted left a bit, with the low bit set for the ``Z`` form.
+  Any other value, plain ints included, is kept as it was. ``format_timestamp``
+  is shared with the message log (``msglog``);
+- short repeated strings (statuses, message types, senders, names) are
+  interned, so records share one copy;
+- a field missing from the source dict is ``MISSING``, and keys a record
+  does not model are kept in ``extra``.
+
+``from_dict(d).to_dict() == d`` for any dict, so conversion at the API and
+storage boundary is lossless. Known keys come out in the order the app
+writes them, then ``extra``.
+"""
+import sys
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+
+class _Missing:
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "MISSING"
+
+    def __bool__(self) -> bool:
+        return False
+
+
+MISSING: Any = _Missing()
+
+# Longer strings are unlikely to repeat (message content, free-text details)
+_INTERN_MAX_LENGTH = 64
+
+
+def _intern(value: Any) -> Any:
+    if type(value) is str and len(value) <= _INTERN_MAX_LENGTH:
+        return sys.intern(value)
+    return value
+
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+@lru_cache(maxsize=4096)
+def _date_prefix(days: int) -> str:
+    return date.fromordinal(_EPOCH_ORDINAL + days).isoformat() + "T"
+
+
+def format_timestamp(micros: int, utc_z: int) -> str:
+    """ISO text for epoch microseconds, as datetime.isoformat() writes it (milliseconds plus Z when utc_z)
+
+    The one formatter behind packed timestamps and the message log; both only
+    keep a value in compact form when this reproduces it exactly.
+    """
+    seconds, fraction = divmod(micros, 1_000_000)
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if utc_z:
+        return f"{_date_prefix(days)}{hours:02d}:{minutes:02d}:{seconds:02d}.{fraction // 1000:03d}Z"
+    if fraction:
+        return f"{_date_prefix(days)}{hours:02d}:{minutes:02d}:{seconds:02d}.{fraction:06d}"
+    return f"{_date_prefix(days)}{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+class PackedTimestamp(int):
+    """An ISO timestamp packed by ``pack_timestamp``; a distinct type so plain ints are never unpacked"""
+    __slots__ = ()
+
+
+def pack_timestamp(value: Any) -> Any:
+    """Packed int for an ISO timestamp that round-trips exactly, else value unchanged"""
+    if type(value) is not str:
+        return value
+    utc_z = value.endswith("Z")
+    try:
+        moment = datetime.fromisoformat(value[:-1] if utc_z else value)
+    except ValueError:
+        return value
+    if moment.tzinfo is not None:
+        return value
+    micros = datetime_micros(moment)
+    if format_timestamp(micros, utc_z) != value:
+        return value
+    return PackedTimestamp(micros << 1 | utc_z)
+
+
+def unpack_timestamp(value: Any) -> Any:
+    if type(value) is PackedTimestamp:
+        return format_timestamp(value >> 1, value & 1)
+    return value
+
+
+def datetime_micros(moment: datetime) -> int:
+    """Epoch microseconds of a datetime, as packed timestamps count them (aware values in UTC)"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    seconds = (moment.toordinal() - _EPOCH_ORDINAL) * 86400 + moment.hour * 3600 + moment.minute * 60 + moment.second
+    return seconds * 1_000_000 + moment.microsecond
+
+
+def timestamp_micros(value: Any) -> Optional[int]:
+    """Epoch microseconds of a packed or ISO timestamp, for ordering; None if it is neither"""
+    if type(value) is PackedTimestamp:
+        return value >> 1
+    if type(value) is str:
+        try:
+            return datetime_micros(datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value))
+        except ValueError:
+            return None
+    return None
+
+
+def _intern_details(details: Any) -> Any:
+    """History details are a message or a small dict whose values repeat across claims (providers, service types)"""
+    if type(details) is dict:
+        return {key: _intern(value) for key, value in details.items()}
+    return _intern(details)
+
+
+def _extra(data: Dict[str, Any], keys: frozenset) -> Optional[Dict[str, Any]]:
+    if data.keys() <= keys:
+        return None
+    return {key: value for key, value in data.items() if key not in keys}
+
+
+# ==================== CLAIMS ====================
+
+_HISTORY_KEYS = frozenset(("timestamp", "status", "details"))
+_CLAIM_KEYS = frozenset(("claim_id", "policy_holder", "policy_number", "problem_type", "status", "created_at", "history"))
+
+
+@dataclass(slots=True)
+class HistoryEntry:
+    timestamp: Any = MISSING
+    status: Any = MISSING
+    details: Any = MISSING
+    extra: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HistoryEntry":
+        return cls(
+            pack_timestamp(data.get("timestamp", MISSING)),
+            _intern(data.get("status", MISSING)),
+            _intern_details(data.get("details", MISSING)),
+            _extra(data, _HISTORY_KEYS)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {}
+        if self.timestamp is not MISSING:
+            data["timestamp"] = unpack_timestamp(self.timestamp)
+        if self.status is not MISSING:
+            data["status"] = self.status
+        if self.details is not MISSING:
+            data["details"] = self.details
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+
+@dataclass(slots=True)
+class Claim:
+    claim_id: Any = MISSING
+    policy_holder: Any = MISSING
+    policy_number: Any = MISSING
+    problem_type: Any = MISSING
+    status: Any = MISSING
+    created_at: Any = MISSING
+    # HistoryEntry items; anything that was not a dict is kept as it was
+    history: Any = MISSING
+    extra: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Claim":
+        history = data.get("history", MISSING)
+        if type(history) is list:
+            history = [HistoryEntry.from_dict(entry) if type(entry) is dict else entry for entry in history]
+        return cls(
+            data.get("claim_id", MISSING),
+            _intern(data.get("policy_holder", MISSING)),
+            _intern(data.get("policy_number", MISSING)),
+            _intern(data.get("problem_type", MISSING)),
+            _intern(data.get("status", MISSING)),
+            pack_timestamp(data.get("created_at", MISSING)),
+            history,
+            _extra(data, _CLAIM_KEYS)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {}
+        if self.claim_id is not MISSING:
+            data["claim_id"] = self.claim_id
+        if self.policy_holder is not MISSING:
+            data["policy_holder"] = self.policy_holder
+        if self.policy_number is not MISSING:
+            data["policy_number"] = self.policy_number
+        if self.problem_type is not MISSING:
+            data["problem_type"] = self.problem_type
+        if self.status is not MISSING:
+            data["status"] = self.status
+        if self.created_at is not MISSING:
+            data["created_at"] = unpack_timestamp(self.created_at)
+        history = self.history
+        if type(history) is list:
+            history = [entry.to_dict() if type(entry) is HistoryEntry else entry for entry in history]
+        if history is not MISSING:
+            data["history"] = history
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    @property
+    def key(self) -> Any:
+        return self.claim_id
+
+    def set(self, key: str, value: Any):
+        """Set a top-level field by its dict key"""
+        if key in _CLAIM_KEYS and key != "history":
+            setattr(self, key, pack_timestamp(value) if key == "created_at" else _intern(value))
+        elif key == "history":
+            self.history = value
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+
+# ==================== CONVERSATIONS ====================
+
+_MESSAGE_KEYS = frozenset(("timestamp", "type", "content", "sender"))
+_CONVERSATION_KEYS = frozenset(("conversation_id", "customer_name", "problem_type", "status", "created_at",
+                                "last_updated", "messages", "requires_human", "admin_user", "is_active"))
+_CONVERSATION_TIMESTAMPS = frozenset(("created_at", "last_updated"))
+
+
+@dataclass(slots=True)
+class Message:
+    timestamp: Any = MISSING
+    type: Any = MISSING
+    content: Any = MISSING
+    sender: Any = MISSING
+    extra: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Message":
+        return cls(
+            pack_timestamp(data.get("timestamp", MISSING)),
+            _intern(data.get("type", MISSING)),
+            data.get("content", MISSING),
+            _intern(data.get("sender", MISSING)),
+            _extra(data, _MESSAGE_KEYS)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {}
+        if self.timestamp is not MISSING:
+            data["timestamp"] = unpack_timestamp(self.timestamp)
+        if self.type is not MISSING:
+            data["type"] = self.type
+        if self.content is not MISSING:
+            data["content"] = self.content
+        if self.sender is not MISSING:
+            data["sender"] = self.sender
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+
+@dataclass(slots=True)
+class Conversation:
+    conversation_id: Any = MISSING
+    customer_name: Any = MISSING
+    problem_type: Any = MISSING
+    status: Any = MISSING
+    created_at: Any = MISSING
+    last_updated: Any = MISSING
+    # Message items; anything that was not a dict is kept as it was
+    messages: Any = MISSING
+    requires_human: Any = MISSING
+    admin_user: Any = MISSING
+    is_active: Any = MISSING
+    extra: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Conversation":
+        messages = data.get("messages", MISSING)
+        if type(messages) is list:
+            messages = [Message.from_dict(message) if type(message) is dict else message for message in messages]
+        return cls(
+            data.get("conversation_id", MISSING),
+            _intern(data.get("customer_name", MISSING)),
+            _intern(data.get("problem_type", MISSING)),
+            _intern(data.get("status", MISSING)),
+            pack_timestamp(data.get("created_at", MISSING)),
+            pack_timestamp(data.get("last_updated", MISSING)),
+            messages,
+            data.get("requires_human", MISSING),
+            _intern(data.get("admin_user", MISSING)),
+            data.get("is_active", MISSING),
+            _extra(data, _CONVERSATION_KEYS)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {}
+        if self.conversation_id is not MISSING:
+            data["conversation_id"] = self.conversation_id
+        if self.customer_name is not MISSING:
+            data["customer_name"] = self.customer_name
+        if self.problem_type is not MISSING:
+            data["problem_type"] = self.problem_type
+        if self.status is not MISSING:
+            data["status"] = self.status
+        if self.created_at is not MISSING:
+            data["created_at"] = unpack_timestamp(self.created_at)
+        if self.last_updated is not MISSING:
+            data["last_updated"] = unpack_timestamp(self.last_updated)
+        messages = self.messages
+        if type(messages) is list:
+            messages = [message.to_dict() if type(message) is Message else message for message in messages]
+        if messages is not MISSING:
+            data["messages"] = messages
+        if self.requires_human is not MISSING:
+            data["requires_human"] = self.requires_human
+        if self.admin_user is not MISSING:
+            data["admin_user"] = self.admin_user
+        if self.is_active is not MISSING:
+            data["is_active"] = self.is_active
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    @property
+    def key(self) -> Any:
+        return self.conversation_id
+
+    def set(self, key: str, value: Any):
+        """Set a top-level field by its dict key"""
+        if key == "messages":
+            self.messages = value
+        elif key in _CONVERSATION_TIMESTAMPS:
+            setattr(self, key, pack_timestamp(value))
+        elif key in _CONVERSATION_KEYS:
+            setattr(self, key, _intern(value))
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
@@ -0,0 +1,121 @@
+"""Declarative keyword rules compiled into a single matcher at import time.
+
+The rule-based fallbacks in ``tools`` used to run ``any(word in text ...)``
+over several literal lists per call. All of those lists live in ``RULES``
+below and are compiled once into one regular expression, so a single pass
+over a message yields every matched category (problem type, exclusion,
+clarification exclusion, handoff).
+"""
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, NamedTuple, Tuple
+
+# Rule categories
+PROBLEM_TYPE = "problem_type"
+EXCLUSION = "exclusion"
+CLARIFICATION_EXCLUSION = "clarification_exclusion"
+HANDOFF = "handoff"
+
+# (category, label, keywords) - order matters: within a category, labels are
+# reported in table order, which is also the problem-type priority order.
+RULES: List[Tuple[str, str, List[str]]] = [
+    # Problem types (checked in this priority order)
+    (PROBLEM_TYPE, "flat tire", ["flat", "tire", "puncture", "wheel"]),
+    (PROBLEM_TYPE, "battery issue", ["battery", "dead", "won't start", "wont start", "no start"]),
+    (PROBLEM_TYPE, "lockout", ["locked", "keys", "lock"]),
+    (PROBLEM_TYPE, "fuel delivery", ["fuel", "gas", "petrol", "empty"]),
+    (PROBLEM_TYPE, "breakdown requiring tow", ["engine", "breakdown", "broken", "tow"]),
+
+    # Potential exclusions in the initial problem description
+    (EXCLUSION, "off_road_use", ["trail", "dirt", "mud", "forest", "mountain", "desert", "beach", "sand", "creek", "river"]),
+    (EXCLUSION, "commercial_use", ["delivery", "work", "business", "commercial", "company", "job"]),
+    (EXCLUSION, "racing_events", ["race", "track", "event", "competition", "racing", "speed"]),
+
+    # Exclusions confirmed by the customer's clarification response
+    (CLARIFICATION_EXCLUSION, "off_road_use", ["trail", "dirt", "mud", "off-road", "offroad", "forest", "mountain", "beach", "sand", "creek", "river", "remote", "unpaved"]),
+    (CLARIFICATION_EXCLUSION, "commercial_use", ["work", "business", "delivery", "commercial", "company", "job", "employer"]),
+    (CLARIFICATION_EXCLUSION, "racing_events", ["race", "racing", "track", "competition", "event", "speed"]),
+
+    # Requests for a human agent
+    (HANDOFF, "human_handoff", [
+        "human", "person", "speak to someone", "talk to someone",
+        "representative", "agent", "operator", "help me",
+        "customer service", "supervisor", "manager", "real person",
+        "not working", "frustrated", "unhappy", "complaint"
+    ]),
+]
+
+
+class RuleMatches(NamedTuple):
+    """Labels matched per category, in rule-table order"""
+    problem_type: Tuple[str, ...]
+    exclusion: Tuple[str, ...]
+    clarification_exclusion: Tuple[str, ...]
+    handoff: Tuple[str, ...]
+
+
+CATEGORIES = RuleMatches._fields
+
+
+def _trie_pattern(keywords: List[str]) -> str:
+    """Regex alternation with common prefixes factored out (greedy = longest)"""
+    trie: Dict[str, dict] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        return group + "?" if "" in node else group
+
+    return build(trie)
+
+
+def _compile(rules: List[Tuple[str, str, List[str]]]):
+    """Build the combined pattern and the keyword -> rule-index lookup."""
+    keyword_rules: Dict[str, set] = {}
+    for rule_index, (_, _, keywords) in enumerate(rules):
+        for keyword in keywords:
+            keyword_rules.setdefault(keyword.lower(), set()).add(rule_index)
+
+    # Matching is substring-based (like ``word in text``). The lookahead
+    # reports the longest keyword starting at every position, so any shorter
+    # keyword that is a substring of it must be credited as well.
+    hits: Dict[str, FrozenSet[int]] = {}
+    for keyword in keyword_rules:
+        rule_indexes = set()
+        for other in keyword_rules:
+            if other in keyword:
+                rule_indexes |= keyword_rules[other]
+        hits[keyword] = frozenset(rule_indexes)
+
+    pattern = re.compile("(?=(" + _trie_pattern(list(keyword_rules)) + "))")
+    return pattern, hits
+
+
+_PATTERN, _KEYWORD_HITS = _compile(RULES)
+
+
+@lru_cache(maxsize=1024)
+def _group(found: FrozenSet[str]) -> RuleMatches:
+    matched = set()
+    for keyword in found:
+        matched |= _KEYWORD_HITS[keyword]
+
+    labels: Dict[str, List[str]] = {category: [] for category in CATEGORIES}
+    for rule_index in sorted(matched):
+        category, label, _ = RULES[rule_index]
+        labels[category].append(label)
+    return RuleMatches(**{category: tuple(matched_labels) for category, matched_labels in labels.items()})
+
+
+def match_rules(text: str) -> RuleMatches:
+    """Scan text once and return every matched label, grouped by category"""
+    return _group(frozenset(_PATTERN.findall(text.lower()) if text else ()))
@@ -0,0 +1,354 @@
+"""Full-text search over conversations for ``/api/admin/search``.
+
+An SQLite FTS5 index (``SEARCH_INDEX_PATH``, default ``search_index.db``
+next to the storage files) holds one row per message (its ``content``) and
+one header row per conversation (``customer_name`` and ``problem_type``).
+Rowids encode the conversation and the message position, so a
+conversation's rows are one rowid range and a hit points straight at its
+message.
+
+The index follows the conversations store the way ``stats`` does: the
+store reports every saved conversation (``storage.add_listener``), and only
+messages past the ones already indexed are added, so
+``add_message_to_conversation`` indexes one message. A running CRC of the
+indexed messages detects a history that was rewritten rather than appended
+to; that conversation is indexed again. ``run()`` brings the whole index in
+step with the store at startup and whenever the file changed outside the
+store. The index persists across restarts, and that pass only writes what
+changed.
+
+Queries are words and ``"quoted phrases"``, all of which must match. Results
+are ranked by BM25, with name and problem type matches weighted above
+message text, and paged with ``limit``/``offset``. A query that matches
+more than ``MAX_TOTAL`` rows ranks only the newest ``MAX_TOTAL`` of them.
+"""
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app import storage
+from app.log import log_event
+from app.records import Conversation, Message, unpack_timestamp
+
+logger = logging.getLogger(__name__)
+
+INDEX_PATH = os.getenv("SEARCH_INDEX_PATH", "search_index.db")
+# How often run() checks the store for outside changes
+CHECK_INTERVAL = 5.0
+MAX_LIMIT = 100
+# Only the newest this many matches are ranked and counted, so broad queries cost the same
+# however large the index grows; past it, "total" is a lower bound
+MAX_TOTAL = 10_000
+# BM25 weights of content, customer_name, problem_type
+WEIGHTS = (1.0, 4.0, 2.0)
+SNIPPET_TOKENS = 12
+HIGHLIGHT = ("**", "**")
+# Conversations written per transaction while syncing the whole store
+SYNC_BATCH = 2_000
+
+# rowid = conversation doc id << POSITION_BITS | (message position + 1); 0 is the header row
+POSITION_BITS = 20
+MAX_MESSAGES = (1 << POSITION_BITS) - 1
+
+_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS documents USING fts5(
+    content, customer_name, problem_type, tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS conversations (
+    doc_id INTEGER PRIMARY KEY,
+    conversation_id TEXT NOT NULL UNIQUE,
+    customer_name TEXT NOT NULL,
+    problem_type TEXT NOT NULL,
+    messages INTEGER NOT NULL,
+    digest INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+_TERM = re.compile(r"\w+")
+_QUERY_PART = re.compile(r'"([^"]*)"?|(\S+)')
+
+
+def _text(value: Any) -> str:
+    return value if type(value) is str else ""
+
+
+def _messages(conversation: Conversation) -> List[Any]:
+    messages = conversation.messages
+    return messages[:MAX_MESSAGES] if type(messages) is list else []
+
+
+def _digest(messages: List[Any], start: int, end: int, digest: int = 0) -> int:
+    """CRC of messages[start:end], continuing from digest"""
+    for position in range(start, end):
+        message = messages[position]
+        if type(message) is Message:
+            digest = zlib.crc32(f"{message.timestamp}\x00{_text(message.content)}\x00".encode("utf-8", "surrogatepass"), digest)
+        else:
+            digest = zlib.crc32(b"\x01", digest)
+    return digest
+
+
+def fts_query(text: str) -> str:
+    """FTS5 MATCH expression for words and "quoted phrases", all required; "" if there are no terms"""
+    parts = []
+    for phrase, word in _QUERY_PART.findall(text):
+        terms = _TERM.findall(phrase or word)
+        if phrase and terms:
+            parts.append('"' + " ".join(terms) + '"')
+        else:
+            parts.extend(f'"{term}"' for term in terms)
+    return " AND ".join(parts)
+
+
+class SearchIndex:
+    """The FTS5 index of one conversations store"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        # The index can always be rebuilt from the store, so commits are not fsynced
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+        # (path, generation) of the store the index was last synced with
+        self._source: Optional[Tuple[str, int]] = None
+
+    # ---------- writing ----------
+
+    def _sync(self, conversation: Conversation) -> bool:
+        """Bring one conversation's rows in step with the record; True if anything was written"""
+        conversation_id = conversation.conversation_id
+        if type(conversation_id) is not str:
+            return False
+        customer_name, problem_type = _text(conversation.customer_name), _text(conversation.problem_type)
+        messages = _messages(conversation)
+        row = self.db.execute(
+            "SELECT doc_id, customer_name, problem_type, messages, digest FROM conversations WHERE conversation_id = ?",
+            (conversation_id,)
+        ).fetchone()
+        if row is None:
+            doc_id = self.db.execute(
+                "INSERT INTO conversations (conversation_id, customer_name, problem_type, messages, digest) VALUES (?, ?, ?, 0, 0)",
+                (conversation_id, customer_name, problem_type)
+            ).lastrowid
+            self.db.execute("INSERT INTO documents (rowid, content, customer_name, problem_type) VALUES (?, '', ?, ?)",
+                            (doc_id << POSITION_BITS, customer_name, problem_type))
+            indexed, digest = 0, 0
+        else:
+            doc_id, indexed_name, indexed_type, indexed, digest = row
+            prefix = _digest(messages, 0, indexed) if indexed <= len(messages) else None
+            header_changed = (indexed_name, indexed_type) != (customer_name, problem_type)
+            if not header_changed and prefix == digest and indexed == len(messages):
+                return False
+            if header_changed:
+                self.db.execute("UPDATE documents SET customer_name = ?, problem_type = ? WHERE rowid = ?",
+                                (customer_name, problem_type, doc_id << POSITION_BITS))
+            if prefix != digest:
+                # History rewritten: drop the message rows and index them all again
+                base = doc_id << POSITION_BITS
+                self.db.execute("DELETE FROM documents WHERE rowid > ? AND rowid <= ?", (base, base + MAX_MESSAGES))
+                indexed, digest = 0, 0
+        base = doc_id << POSITION_BITS
+        self.db.executemany(
+            "INSERT INTO documents (rowid, content) VALUES (?, ?)",
+            ((base + position + 1, _text(getattr(messages[position], "content", None)))
+             for position in range(indexed, len(messages)))
+        )
+        digest = _digest(messages, indexed, len(messages), digest)
+        self.db.execute("UPDATE conversations SET customer_name = ?, problem_type = ?, messages = ?, digest = ? WHERE doc_id = ?",
+                        (customer_name, problem_type, len(messages), digest, doc_id))
+        return True
+
+    def _delete(self, conversation_id: str):
+        row = self.db.execute("SELECT doc_id FROM conversations WHERE conversation_id = ?", (conversation_id,)).fetchone()
+        if row is not None:
+            base = row[0] << POSITION_BITS
+            self.db.execute("DELETE FROM documents WHERE rowid >= ? AND rowid <= ?", (base, base + MAX_MESSAGES))
+            self.db.execute("DELETE FROM conversations WHERE doc_id = ?", (row[0],))
+
+    def is_current(self, store: storage.RecordStore) -> bool:
+        return self._source == (store.path, store.generation)
+
+    def on_save(self, store: storage.RecordStore, changed: Optional[List[Any]]):
+        """Storage listener: index the saved conversations, unless a full sync is due anyway"""
+        if store.name != storage.CONVERSATIONS_FILE:
+            return
+        with self.lock:
+            if changed is None or not self.is_current(store):
+                # Out of step: run() syncs the whole store on its next pass
+                self._source = None
+                return
+            self.db.execute("BEGIN")
+            try:
+                for conversation in changed:
+                    self._sync(conversation)
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                self._source = None
+                raise
+
+    def sync(self, store: storage.RecordStore) -> Dict[str, int]:
+        """Bring the whole index in step with the store, in batches so saves are indexed in between"""
+        with store.lock:
+            records = list(store.records())
+            with self.lock:
+                # Saves from here on are indexed by on_save; syncing a record they already indexed is a no-op
+                self._source = (store.path, store.generation)
+        written = 0
+        for start in range(0, len(records), SYNC_BATCH):
+            with self.lock:
+                self.db.execute("BEGIN")
+                try:
+                    for conversation in records[start:start + SYNC_BATCH]:
+                        written += self._sync(conversation)
+                    self.db.execute("COMMIT")
+                except BaseException:
+                    self.db.execute("ROLLBACK")
+                    self._source = None
+                    raise
+        # Conversations the store no longer has (checked against the live store, not the copy)
+        with self.lock:
+            indexed_ids = [row[0] for row in self.db.execute("SELECT conversation_id FROM conversations")]
+        removed = 0
+        with store.lock, self.lock:
+            self.db.execute("BEGIN")
+            for conversation_id in indexed_ids:
+                if store.get(conversation_id) is None:
+                    self._delete(conversation_id)
+                    removed += 1
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('built_at', ?)",
+                            (datetime.now().isoformat(timespec="seconds"),))
+            self.db.execute("COMMIT")
+        return {"conversations": len(records), "written": written, "removed": removed}
+
+    # ---------- reading ----------
+
+    def ready(self) -> bool:
+        """True once the index has been fully built (possibly by an earlier process)"""
+        with self.lock:
+            return self.db.execute("SELECT 1 FROM meta WHERE key = 'built_at'").fetchone() is not None
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """Ranked matches for query, limit at a time from offset"""
+        expression = fts_query(query)
+        limit = min(max(limit, 1), MAX_LIMIT)
+        offset = max(offset, 0)
+        if not expression:
+            return {"query": query, "total": 0, "total_is_exact": True, "limit": limit, "offset": offset, "results": []}
+        with self.lock:
+            # Rowid of the newest match past MAX_TOTAL: older matches are neither ranked nor counted
+            floor = self.db.execute(
+                "SELECT rowid FROM documents WHERE documents MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?", (expression, MAX_TOTAL)
+            ).fetchone()
+            if floor is None:
+                total, floor = self.db.execute("SELECT count(*) FROM documents WHERE documents MATCH ?", (expression,)).fetchone()[0], -1
+            else:
+                total, floor = MAX_TOTAL + 1, floor[0]
+            rows = self.db.execute(
+                f"""SELECT rowid, snippet(documents, -1, ?, ?, '...', {SNIPPET_TOKENS}),
+                           bm25(documents, {', '.join(map(str, WEIGHTS))}) AS score
+                    FROM documents WHERE documents MATCH ? AND rowid > ? ORDER BY score LIMIT ? OFFSET ?""",
+                (*HIGHLIGHT, expression, floor, limit, offset)
+            ).fetchall()
+            doc_ids = sorted({rowid >> POSITION_BITS for rowid, _, _ in rows})
+            headers = {
+                doc_id: header for doc_id, *header in self.db.execute(
+                    f"SELECT doc_id, conversation_id, customer_name, problem_type FROM conversations "
+                    f"WHERE doc_id IN ({', '.join('?' * len(doc_ids))})", doc_ids
+                )
+            }
+        conversations = storage.conversations()
+        results = []
+        for rowid, snippet, score in rows:
+            if rowid >> POSITION_BITS not in headers:
+                continue
+            conversation_id, customer_name, problem_type = headers[rowid >> POSITION_BITS]
+            position = (rowid & MAX_MESSAGES) - 1
+            conversation = conversations.get(conversation_id)
+            result = {
+                "conversation_id": conversation_id,
+                "customer_name": customer_name,
+                "problem_type": problem_type,
+                "status": getattr(conversation, "status", None),
+                "match": "conversation" if position < 0 else "message",
+                "snippet": snippet,
+                "score": round(-score, 4)
+            }
+            if position >= 0:
+                messages = _messages(conversation) if conversation is not None else []
+                message = messages[position] if position < len(messages) else None
+                result["message_index"] = position
+                if type(message) is Message:
+                    result["timestamp"] = unpack_timestamp(message.timestamp)
+                    result["sender"] = message.sender
+                    result["type"] = message.type
+            results.append(result)
+        return {
+            "query": query,
+            "total": min(total, MAX_TOTAL),
+            "total_is_exact": total <= MAX_TOTAL,
+            "limit": limit,
+            "offset": offset,
+            "results": results
+        }
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+_index: Optional[SearchIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> SearchIndex:
+    """The index at INDEX_PATH, reopened if that resolves to another file (the working directory changed)"""
+    global _index
+    path = os.path.abspath(INDEX_PATH)
+    with _index_lock:
+        if _index is None or _index.path != path:
+            _index = SearchIndex(path)
+        return _index
+
+
+def _on_save(store: storage.RecordStore, changed: Optional[List[Any]]):
+    index = _index
+    if index is not None and index.path == os.path.abspath(INDEX_PATH):
+        index.on_save(store, changed)
+
+
+storage.add_listener(_on_save)
+
+
+# ==================== BACKGROUND JOB ====================
+
+def refresh():
+    """Sync the whole index if it is not in step with the conversations store"""
+    index = get_index()
+    store = storage.conversations()
+    # records() re-reads the file if it changed, which bumps the generation
+    store.records()
+    if not index.is_current(store):
+        started = time.perf_counter()
+        counts = index.sync(store)
+        log_event(logger, logging.INFO, "search_index_synced", seconds=round(time.perf_counter() - started, 3), **counts)
+
+
+async def run(check_interval: float = CHECK_INTERVAL):
+    """Keep the search index in step with the conversations store until cancelled"""
+    while True:
+        try:
+            await asyncio.to_thread(refresh)
+        except Exception as e:
+            log_event(logger, logging.ERROR, "search_index_sync_failed", error_type=type(e).__name__, error=str(e))
+        await asyncio.sleep(check_interval)
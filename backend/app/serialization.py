@@ -0,0 +1,77 @@
+"""JSON encoding for API responses, WebSocket frames and storage files.
+
+orjson is used when it is installed; otherwise the standard library.
+``JSON_BACKEND=json`` forces the standard library, and ``set_backend()``
+switches at runtime (benchmarks). Output is always compact UTF-8: the
+storage files are read by the app, not by people. Non-string dict keys are
+stringified, as ``json.dumps`` does.
+
+``JSONResponse`` is the app's default response class. Endpoints that return
+data read straight from storage can return it directly. That skips
+FastAPI's ``jsonable_encoder`` walk, which is only needed for
+non-JSON types.
+"""
+import json
+import os
+from typing import Any, Callable
+
+from fastapi.responses import JSONResponse as _FastAPIJSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKENDS = ("orjson", "json")
+
+backend = ""
+dumps: Callable[[Any], bytes]
+loads: Callable[[Any], Any]
+
+
+def _orjson_dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def set_backend(name: str = None):
+    """Select "orjson" or "json"; by default orjson when installed, unless JSON_BACKEND says otherwise"""
+    global backend, dumps, loads
+    name = (name or os.getenv("JSON_BACKEND") or "auto").lower()
+    if name == "auto":
+        name = "orjson" if orjson is not None else "json"
+    if name not in BACKENDS:
+        raise ValueError(f"unknown JSON backend {name!r}, expected one of {BACKENDS}")
+    if name == "orjson" and orjson is None:
+        raise ValueError("orjson is not installed")
+    backend = name
+    dumps = _orjson_dumps if name == "orjson" else _json_dumps
+    loads = orjson.loads if name == "orjson" else json.loads
+
+
+set_backend()
+
+
+def dumps_text(obj: Any) -> str:
+    """Compact JSON as str, for WebSocket text frames"""
+    return dumps(obj).decode("utf-8")
+
+
+def load_file(path: str) -> Any:
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def dump_file(path: str, data: Any):
+    with open(path, 'wb') as f:
+        f.write(dumps(data))
+
+
+class JSONResponse(_FastAPIJSONResponse):
+    """JSON response rendered by the selected backend"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,320 @@
+"""Dashboard aggregates for ``/api/admin/stats``.
+
+- claims by status, by problem type and by creation hour (the last
+  ``HOURS`` hours that have claims);
+- mean ETA per provider, from ``DISPATCHED`` history entries;
+- handoff rate: the share of conversations that required a human;
+- coverage decisions and the denial rate per exclusion. These are recorded
+  from ``/api/conversation`` turns (they are not stored anywhere else), so
+  they count since the process started.
+
+``run()`` builds the store aggregates once, in the background, from the
+claims and conversations stores. After that, stores report every saved
+record (``storage.add_listener``). The record's previous contribution is
+subtracted and its new one added, so each claim event costs O(1). A store
+that re-read its file because something else changed it is aggregated
+again from scratch on the next pass of ``run()``. ``snapshot()`` returns a
+dict that is only recomputed after a change, from the counters alone, so
+serving it does not depend on the number of records.
+
+With ``STATS_SNAPSHOT_PATH`` set and pyarrow installed, ``run()`` also
+writes the aggregates as a table with columns (metric, key, count, value)
+every ``STATS_SNAPSHOT_INTERVAL`` seconds. The table is Parquet, or Arrow
+IPC for a ``.arrow``/``.feather`` path.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app import storage
+from app.log import log_event
+from app.records import Claim, Conversation, HistoryEntry, timestamp_micros
+
+logger = logging.getLogger(__name__)
+
+HOURS = 168
+SNAPSHOT_PATH = os.getenv("STATS_SNAPSHOT_PATH")
+SNAPSHOT_INTERVAL = float(os.getenv("STATS_SNAPSHOT_INTERVAL", "60"))
+# How often run() checks the stores for outside changes
+CHECK_INTERVAL = 5.0
+
+_HOUR_MICROS = 3600 * 1_000_000
+_EPOCH = datetime(1970, 1, 1)
+# Exclusion key for denials where the service itself is not covered
+NOT_COVERED = "service_not_covered"
+
+ClaimContribution = Tuple[Any, Any, Optional[int], Tuple[Tuple[str, float], ...]]
+ConversationContribution = bool
+
+
+def _claim_contribution(claim: Claim) -> ClaimContribution:
+    """(status, problem type, creation hour, ((provider, eta minutes), ...))"""
+    created = timestamp_micros(claim.created_at)
+    etas = []
+    if type(claim.history) is list:
+        for entry in claim.history:
+            if type(entry) is HistoryEntry and entry.status == "DISPATCHED" and type(entry.details) is dict:
+                provider, eta = entry.details.get("provider"), entry.details.get("eta_minutes")
+                if isinstance(provider, str) and isinstance(eta, (int, float)) and not isinstance(eta, bool):
+                    etas.append((provider, eta))
+    return claim.status, claim.problem_type, None if created is None else created // _HOUR_MICROS, tuple(etas)
+
+
+def _rate(part: float, whole: float) -> Optional[float]:
+    return round(part / whole, 4) if whole else None
+
+
+def _hour_label(hour: int) -> str:
+    return (_EPOCH + timedelta(hours=hour)).strftime("%Y-%m-%dT%H:00")
+
+
+class Aggregates:
+    """Counters over the stores, kept in step with them through storage listeners"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.claims_by_status: Counter = Counter()
+        self.claims_by_problem_type: Counter = Counter()
+        self.claims_by_hour: Counter = Counter()
+        # provider -> [dispatches, sum of ETA minutes]
+        self.provider_etas: Dict[str, List[float]] = {}
+        self.conversations = 0
+        self.handoffs = 0
+        self.coverage_decisions = 0
+        self.coverage_denied = 0
+        # exclusion -> [flagged, denied]
+        self.exclusions: Dict[str, List[int]] = {}
+        self._claims: Dict[Any, ClaimContribution] = {}
+        self._conversations: Dict[Any, ConversationContribution] = {}
+        # (path, generation) of the store each side was built from
+        self._sources: Dict[str, Tuple[str, int]] = {}
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self.built_at: Optional[str] = None
+
+    # ---------- claims ----------
+
+    def _apply_claim(self, contribution: ClaimContribution, sign: int):
+        status, problem_type, hour, etas = contribution
+        self.claims_by_status[status] += sign
+        self.claims_by_problem_type[problem_type] += sign
+        if hour is not None:
+            self.claims_by_hour[hour] += sign
+        for provider, eta in etas:
+            totals = self.provider_etas.setdefault(provider, [0, 0.0])
+            totals[0] += sign
+            totals[1] += sign * eta
+
+    def _update_claim(self, claim: Claim):
+        previous = self._claims.get(claim.claim_id)
+        current = _claim_contribution(claim)
+        if previous == current:
+            return
+        if previous is not None:
+            self._apply_claim(previous, -1)
+        self._apply_claim(current, 1)
+        self._claims[claim.claim_id] = current
+
+    # ---------- conversations ----------
+
+    def _update_conversation(self, conversation: Conversation):
+        previous = self._conversations.get(conversation.conversation_id)
+        current = conversation.requires_human is True
+        if previous is None:
+            self.conversations += 1
+        elif previous == current:
+            return
+        else:
+            self.handoffs -= previous
+        self.handoffs += current
+        self._conversations[conversation.conversation_id] = current
+
+    # ---------- building ----------
+
+    def rebuild(self, store: storage.RecordStore):
+        """Aggregate one store from scratch (holds its lock, so no save is missed)"""
+        with store.lock:
+            records = store.records()
+            with self.lock:
+                if store.name == storage.CLAIMS_FILE:
+                    self.claims_by_status.clear()
+                    self.claims_by_problem_type.clear()
+                    self.claims_by_hour.clear()
+                    self.provider_etas.clear()
+                    self._claims.clear()
+                    for claim in records:
+                        self._update_claim(claim)
+                else:
+                    self.conversations = self.handoffs = 0
+                    self._conversations.clear()
+                    for conversation in records:
+                        self._update_conversation(conversation)
+                self._sources[store.name] = (store.path, store.generation)
+                self._snapshot = None
+                self.built_at = datetime.now().isoformat(timespec="seconds")
+
+    def is_current(self, store: storage.RecordStore) -> bool:
+        return self._sources.get(store.name) == (store.path, store.generation)
+
+    def on_save(self, store: storage.RecordStore, changed: Optional[List[Any]]):
+        """Storage listener: fold in the saved records, unless a rebuild is due anyway"""
+        with self.lock:
+            if changed is None or not self.is_current(store):
+                # Out of step: run() rebuilds from the store on its next pass, the last snapshot is served until then
+                if store.name in self._sources:
+                    self._sources[store.name] = (store.path, -1)
+                return
+            update = self._update_claim if store.name == storage.CLAIMS_FILE else self._update_conversation
+            for record in changed:
+                update(record)
+            self._snapshot = None
+
+    # ---------- coverage ----------
+
+    def record_coverage_decision(self, collected: Dict[str, Any]):
+        denied = not collected.get("is_covered", True)
+        exclusions = [e for e in collected.get("potential_exclusions") or [] if isinstance(e, str)]
+        exclusions_apply = bool(collected.get("exclusions_apply") and exclusions)
+        with self.lock:
+            self.coverage_decisions += 1
+            self.coverage_denied += denied
+            for exclusion in exclusions:
+                counts = self.exclusions.setdefault(exclusion, [0, 0])
+                counts[0] += 1
+                counts[1] += denied and exclusions_apply
+            if denied and not exclusions_apply:
+                counts = self.exclusions.setdefault(NOT_COVERED, [0, 0])
+                counts[0] += 1
+                counts[1] += 1
+            self._snapshot = None
+
+    # ---------- reading ----------
+
+    def ready(self) -> bool:
+        return storage.CLAIMS_FILE in self._sources and storage.CONVERSATIONS_FILE in self._sources
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            if self._snapshot is None:
+                self._snapshot = self._build_snapshot()
+            return self._snapshot
+
+    def _build_snapshot(self) -> Dict[str, Any]:
+        def counts(counter: Counter) -> Dict[str, int]:
+            return {str(key): value for key, value in counter.most_common() if value}
+
+        hours = sorted(hour for hour, value in self.claims_by_hour.items() if value)[-HOURS:]
+        return {
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "built_at": self.built_at,
+            "claims": {
+                "total": sum(self.claims_by_status.values()),
+                "by_status": counts(self.claims_by_status),
+                "by_problem_type": counts(self.claims_by_problem_type),
+                "by_hour": {_hour_label(hour): self.claims_by_hour[hour] for hour in hours}
+            },
+            "providers": {
+                provider: {"dispatches": int(dispatches), "mean_eta_minutes": round(total / dispatches, 2)}
+                for provider, (dispatches, total) in sorted(self.provider_etas.items()) if dispatches
+            },
+            "conversations": {
+                "total": self.conversations,
+                "handoffs": self.handoffs,
+                "handoff_rate": _rate(self.handoffs, self.conversations)
+            },
+            "coverage": {
+                "decisions": self.coverage_decisions,
+                "denied": self.coverage_denied,
+                "denial_rate": _rate(self.coverage_denied, self.coverage_decisions),
+                "by_exclusion": {
+                    exclusion: {"flagged": flagged, "denied": denied, "denial_rate": _rate(denied, flagged)}
+                    for exclusion, (flagged, denied) in sorted(self.exclusions.items())
+                }
+            }
+        }
+
+    def rows(self) -> Iterable[Tuple[str, str, int, Optional[float]]]:
+        """The snapshot as (metric, key, count, value) rows, for the columnar file"""
+        snapshot = self.snapshot()
+        for section in ("by_status", "by_problem_type", "by_hour"):
+            for key, count in snapshot["claims"][section].items():
+                yield f"claims.{section}", key, count, None
+        for provider, values in snapshot["providers"].items():
+            yield "providers.mean_eta_minutes", provider, values["dispatches"], values["mean_eta_minutes"]
+        conversations = snapshot["conversations"]
+        yield "conversations.handoff_rate", "", conversations["total"], conversations["handoff_rate"]
+        coverage = snapshot["coverage"]
+        yield "coverage.denial_rate", "", coverage["decisions"], coverage["denial_rate"]
+        for exclusion, values in coverage["by_exclusion"].items():
+            yield "coverage.denial_rate_by_exclusion", exclusion, values["flagged"], values["denial_rate"]
+
+
+aggregates = Aggregates()
+storage.add_listener(aggregates.on_save)
+
+
+def record_conversation_turn(previous_step: Any, state: Optional[Dict[str, Any]]):
+    """Count the coverage decision made in this /api/conversation turn, if any"""
+    if previous_step not in (1, 1.5) or not state or state.get("step") not in (2, 5):
+        return
+    collected = state.get("collected") or {}
+    if "is_covered" in collected:
+        aggregates.record_coverage_decision(collected)
+
+
+# ==================== BACKGROUND JOB ====================
+
+def refresh():
+    """Rebuild the aggregates of any store they no longer match"""
+    for store in (storage.claims(), storage.conversations()):
+        # records() re-reads the file if it changed, which bumps the generation
+        store.records()
+        if not aggregates.is_current(store):
+            started = time.perf_counter()
+            aggregates.rebuild(store)
+            log_event(logger, logging.INFO, "stats_rebuilt", store=store.name, records=len(store.records()),
+                      seconds=round(time.perf_counter() - started, 3))
+
+
+def write_snapshot(path: str) -> bool:
+    """Write the aggregates as Parquet or Arrow IPC; False when pyarrow is not installed"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return False
+    metric, key, count, value = (list(column) for column in zip(*aggregates.rows())) if aggregates.ready() else ([], [], [], [])
+    table = pa.table({
+        "metric": pa.array(metric, pa.string()),
+        "key": pa.array(key, pa.string()),
+        "count": pa.array(count, pa.int64()),
+        "value": pa.array(value, pa.float64())
+    })
+    temporary = f"{path}.tmp"
+    if path.endswith((".arrow", ".feather")):
+        with pa.OSFile(temporary, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        import pyarrow.parquet as pq
+        pq.write_table(table, temporary)
+    os.replace(temporary, path)
+    return True
+
+
+async def run(check_interval: float = CHECK_INTERVAL, snapshot_path: str = SNAPSHOT_PATH, snapshot_interval: float = SNAPSHOT_INTERVAL):
+    """Keep the aggregates built, and the columnar snapshot written, until cancelled"""
+    last_snapshot = 0.0
+    while True:
+        try:
+            await asyncio.to_thread(refresh)
+            if snapshot_path and time.monotonic() - last_snapshot >= snapshot_interval:
+                last_snapshot = time.monotonic()
+                if not await asyncio.to_thread(write_snapshot, snapshot_path):
+                    log_event(logger, logging.WARNING, "stats_snapshot_skipped", reason="pyarrow is not installed")
+                    snapshot_path = None
+        except Exception as e:
+            log_event(logger, logging.ERROR, "stats_refresh_failed", error_type=type(e).__name__, error=str(e))
+        await asyncio.sleep(check_interval)
@@ -0,0 +1,241 @@
+"""Claims and conversations storage: JSON files with an in-memory record cache.
+
+``claims()`` and ``conversations()`` return the ``RecordStore`` for the
+current storage file. A store parses its file once into ``app.records``
+objects, indexes them by id, and writes the file back after each change.
+Only the changed records are encoded again; the rest of the file is copied
+from what the store wrote last. The new contents go to a temporary file that
+then replaces the old one, so a failed write leaves the file as it was. Before every access the file is stat'ed; if
+another process (or a person) changed it, it is parsed again.
+
+Paths are resolved against the working directory at call time, as the rest
+of the app does, so a new store is opened when it changes.
+
+Functions registered with ``add_listener`` are called after every save with
+the store and the records that changed, for derived data such as
+``app.stats``. A store's ``generation`` goes up each time it parses its
+file, so listeners can tell when their view of it is out of date.
+"""
+import logging
+import os
+import threading
+import time
+from array import array
+from itertools import accumulate
+from typing import Any, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+from app import metrics, serialization
+from app.log import log_event
+from app.records import Claim, Conversation
+
+logger = logging.getLogger(__name__)
+
+# Claims file path
+CLAIMS_FILE = "claims.json"
+# Active conversations file path
+CONVERSATIONS_FILE = "conversations.json"
+
+R = TypeVar("R", Claim, Conversation)
+
+# Called as listener(store, changed records) after each save; records is None when any of them may have changed
+_listeners: List[Callable[["RecordStore", Optional[List[Any]]], None]] = []
+
+
+def add_listener(listener: Callable[["RecordStore", Optional[List[Any]]], None]):
+    _listeners.append(listener)
+
+
+def load_json_file(path: str, default: Any = None) -> Any:
+    """Parsed contents of a storage file, or default if it is missing or unreadable"""
+    started = time.perf_counter()
+    try:
+        if not os.path.exists(path):
+            return default
+        return serialization.load_file(path)
+    except Exception as e:
+        log_event(logger, logging.ERROR, "storage_read_failed", file=os.path.basename(path),
+                  error_type=type(e).__name__, error=str(e))
+        return default
+    finally:
+        metrics.STORAGE_DURATION.labels(os.path.basename(path), "read").observe(time.perf_counter() - started)
+
+
+def _write_file(path: str, payload: bytes):
+    """Replace the file in one step: readers and a failed write never see a partial file"""
+    started = time.perf_counter()
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    finally:
+        metrics.STORAGE_DURATION.labels(os.path.basename(path), "write").observe(time.perf_counter() - started)
+
+
+def _file_version(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class RecordStore(Generic[R]):
+    """Records of one storage file, cached and indexed by id.
+
+    Records returned by ``records()`` and ``get()`` are the cached objects:
+    after changing one, call ``save()`` with its id.
+    """
+
+    def __init__(self, path: str, name: str, record_type: Callable[[Dict[str, Any]], R]):
+        self.path = path
+        self.name = name
+        self.record_type = record_type
+        self.lock = threading.RLock()
+        self._records: List[R] = []
+        self._positions: Dict[Any, int] = {}
+        # (mtime, size, inode) of the file the cache matches; False before the first load
+        self._version: Any = False
+        # Encoded length of each record, when the file was last written by this store
+        self._lengths: Optional[array] = None
+        self.generation = 0
+
+    def _refresh(self):
+        version = _file_version(self.path)
+        if version == self._version:
+            return
+        data = load_json_file(self.path, [])
+        if not isinstance(data, list):
+            data = []
+        self._records = [self.record_type.from_dict(item) for item in data if isinstance(item, dict)]
+        self._positions = {}
+        for position, record in enumerate(self._records):
+            # The first record with an id wins, as the old linear scans did
+            self._positions.setdefault(record.key, position)
+        self._version = version
+        self._lengths = None
+        self.generation += 1
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def records(self) -> List[R]:
+        """All records in file order"""
+        with self.lock:
+            self._refresh()
+            return self._records
+
+    def get(self, record_id: Any) -> Optional[R]:
+        with self.lock:
+            self._refresh()
+            position = self._positions.get(record_id)
+            return None if position is None else self._records[position]
+
+    def put(self, record_id: Any, record: R):
+        """Replace the record stored under record_id, or append it, and save"""
+        with self.lock:
+            self._refresh()
+            position = self._positions.get(record_id)
+            if position is None:
+                self._positions[record_id] = len(self._records)
+                self._records.append(record)
+            else:
+                self._records[position] = record
+            self.save(record_id)
+
+    def save(self, *changed_ids: Any):
+        """Write the records back to the file.
+
+        With changed_ids, and a file this store wrote last, only those records
+        (and any appended since) are encoded again; the others are copied
+        from the file. Without them every record is encoded. On failure the
+        cache is dropped and the error propagates.
+        """
+        with self.lock:
+            try:
+                if changed_ids and self._lengths is not None and _file_version(self.path) == self._version:
+                    pieces = self._splice(changed_ids)
+                else:
+                    pieces = [serialization.dumps(record.to_dict()) for record in self._records]
+                    self._lengths = array("Q", map(len, pieces))
+                _write_file(self.path, b"[" + b",".join(pieces) + b"]")
+            except Exception:
+                self._version = False
+                self._lengths = None
+                raise
+            self._version = _file_version(self.path)
+            self._notify(changed_ids)
+
+    def _notify(self, changed_ids: Tuple[Any, ...]):
+        changed = None
+        if changed_ids:
+            changed = [self._records[self._positions[record_id]] for record_id in changed_ids if record_id in self._positions]
+        for listener in _listeners:
+            try:
+                listener(self, changed)
+            except Exception as e:
+                log_event(logger, logging.ERROR, "storage_listener_failed", store=self.name, error_type=type(e).__name__, error=str(e))
+
+    def _splice(self, changed_ids: Tuple[Any, ...]) -> List[bytes]:
+        """File pieces: runs of unchanged records sliced from the current file, changed ones encoded"""
+        lengths = self._lengths
+        written = len(lengths)
+        dirty = {self._positions[record_id] for record_id in changed_ids if record_id in self._positions}
+        dirty.update(range(written, len(self._records)))
+        with open(self.path, 'rb') as f:
+            current = f.read()
+        # Byte offset of each written record: after "[" and one "," per record
+        starts = list(accumulate(map((1).__add__, lengths), initial=1))
+        pieces = []
+        run_start = 0
+        for position in sorted(dirty):
+            run_end = min(position, written)
+            if run_end > run_start:
+                pieces.append(current[starts[run_start]:starts[run_end] - 1])
+            piece = serialization.dumps(self._records[position].to_dict())
+            pieces.append(piece)
+            if position < written:
+                lengths[position] = len(piece)
+            else:
+                lengths.append(len(piece))
+            run_start = position + 1
+        if run_start < written:
+            pieces.append(current[starts[run_start]:starts[written] - 1])
+        return pieces
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Every record as a new dict.
+
+        The file always matches the cache, and parsing it is faster than
+        ``to_dict()`` on each record.
+        """
+        with self.lock:
+            self._refresh()
+            return load_json_file(self.path, []) if self._records else []
+
+
+_stores: Dict[str, RecordStore] = {}
+_stores_lock = threading.Lock()
+
+
+def _store(name: str, record_type: Callable[[Dict[str, Any]], Any]) -> RecordStore:
+    path = os.path.abspath(name)
+    with _stores_lock:
+        store = _stores.get(name)
+        if store is None or store.path != path:
+            store = _stores[name] = RecordStore(path, name, record_type)
+        return store
+
+
+def claims() -> RecordStore[Claim]:
+    return _store(CLAIMS_FILE, Claim)
+
+
+def conversations() -> RecordStore[Conversation]:
+    return _store(CONVERSATIONS_FILE, Conversation)
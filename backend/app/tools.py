@@ -1,24 +1,21 @@
 import json
 import uuid
-import os
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
-import math
-from openai import OpenAI
+import logging
+from app import catalog, classifier, llm_gateway, metrics, prompts, rules, storage
+from app.board import board, card
+from app.geo import calculate_distance
+from app.records import MISSING, Claim, Conversation, HistoryEntry, Message
+from app.log import log_event
 
-# OpenAI client - initialized lazily
-_client = None
+logger = logging.getLogger(__name__)
 
 def get_openai_client():
-    """Get OpenAI client, initializing it lazily"""
-    global _client
-    if _client is None:
-        api_key = os.getenv("OPENAI_API_KEY")
-        if api_key and api_key != "your_openai_api_key_here":
-            _client = OpenAI(api_key=api_key)
-        else:
-            _client = None  # Will trigger fallback
-    return _client
+    """Get the gateway-backed OpenAI client; None (use the fallback) without a key or while the circuit is open"""
+    return llm_gateway.get_client()
+
+# Built-in demo data, served as the default tenant's catalog (see app/catalog.py)
 
 # Mock Policy Data for John Doe
 JOHN_DOE_POLICY = {
@@ -61,12 +58,16 @@ SERVICE_PROVIDERS = {
 # Customer's fixed location (51.554257, -0.293532)
 CUSTOMER_LOCATION = {"lat": 51.554257, "lon": -0.293532}
 
-# Claims file path
-CLAIMS_FILE = "claims.json"
-# Active conversations file path
-CONVERSATIONS_FILE = "conversations.json"
+# Storage file paths (claims and active conversations)
+CLAIMS_FILE = storage.CLAIMS_FILE
+CONVERSATIONS_FILE = storage.CONVERSATIONS_FILE
+
+_FALLBACK_CONVERSATION = metrics.FALLBACK_ACTIVATIONS.labels("conversation")
+_FALLBACK_PROBLEM_ANALYSIS = metrics.FALLBACK_ACTIVATIONS.labels("problem_analysis")
+_FALLBACK_CLARIFICATION = metrics.FALLBACK_ACTIVATIONS.labels("clarification_analysis")
 
 # ==================== AGENT 1: Conversational AI Agent ====================
+@metrics.time_agent("conversational_ai_agent")
 def conversational_ai_agent(message: str, conversation_state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Enhanced conversational agent using OpenAI GPT-5-mini for natural interactions.
@@ -74,59 +75,30 @@ def conversational_ai_agent(message: str, conversation_state: Dict[str, Any]) ->
     step = conversation_state.get("step", 0)
     collected = conversation_state.get("collected", {})
     
-    print(f"[DEBUG] conversational_ai_agent called with:")
-    print(f"  - message: '{message}'")
-    print(f"  - step: {step}")
-    print(f"  - collected: {collected}")
+    log_event(logger, logging.DEBUG, "conversation_turn", sampled=True,
+              step=step, message_chars=len(message), collected_keys=sorted(collected))
     
     try:
-        # Build conversation context for the LLM
-        system_prompt = f"""You are a helpful insurance roadside assistance agent. Your job is to guide customers through our assistance process with empathy and professionalism.
-
-CURRENT SITUATION:
-- Conversation step: {step}
-- Information collected: {collected}
-
-YOUR ROLE BY STEP:
-- Step 1: Customer described their problem. Ask for their full name for policy verification.
-- Step 1.5: If clarification needed about potential exclusions, ask tactful questions about circumstances.
-- Step 2: Customer provided name. Thank them, verify their policy coverage, and ask for their exact location (street name, landmarks, etc.) all in one response.
-- Step 3: (Deprecated - skip to step 4)
-- Step 4: Location received. Thank them and confirm you have all the information needed. DO NOT mention dispatch - just say you'll process their request.
-- Step 5: Process complete.
-
-GUIDELINES:
-- Be empathetic and professional
-- Keep responses concise (2-3 sentences max)
-- When asking clarification questions, be tactful and natural
-- Never directly ask about exclusions - gather context naturally
-- In step 2, combine policy verification with location request
-- Sound natural and human-like
-- Show understanding of their situation"""
+        # Static instructions first, per-turn state last, so the prefix stays cacheable
+        prompt = catalog.current().prompts.conversation_prompt(step, collected)
 
         user_message = message.strip() if message.strip() else "Hello"
         
-        # system_prompt already formatted with f-string above
-        prompt = system_prompt
-        
         if step == 0:
             # Initial greeting
             reply = "Hello! I'm here to help with your roadside assistance request. Can you briefly describe what's happening with your vehicle?"
-            print(f"[DEBUG] Step 0 - returning initial greeting")
             return {
                 "reply": reply,
                 "state": {"step": 1, "collected": collected}
             }
         
         # Get OpenAI client
-        print(f"[DEBUG] Getting OpenAI client for step {step}")
         client = get_openai_client()
         if not client:
-            print(f"[DEBUG] No OpenAI client, using fallback")
-            # No API key configured, use fallback
+            log_event(logger, logging.DEBUG, "llm_unavailable", sampled=True, agent="conversation", step=step)
+            # No API key configured (or circuit open), use fallback
             return fallback_conversational_agent(message, conversation_state)
         
-        print(f"[DEBUG] Making OpenAI API call for step {step}")
         # Use OpenAI Responses API for natural responses
         response = client.responses.create(
             model="gpt-4o",  # Use a valid model name
@@ -136,18 +108,19 @@ GUIDELINES:
             store=False  # Don't store for privacy
         )
         
-        print(f"[DEBUG] OpenAI API response received for step {step}")
+        usage = prompts.record_usage("conversation", response, prompt)
+        log_event(logger, logging.DEBUG, "llm_response", sampled=True, agent="conversation", step=step, **usage)
         
         # Check for incomplete response
         if hasattr(response, 'status') and response.status == "incomplete":
-            print(f"[DEBUG] Incomplete response: {response.incomplete_details.reason if hasattr(response, 'incomplete_details') else 'unknown'}")
+            log_event(logger, logging.WARNING, "llm_incomplete_response", agent="conversation",
+                      reason=response.incomplete_details.reason if hasattr(response, 'incomplete_details') else 'unknown')
             reply = "I apologize, but I need to process that again. Could you please repeat your message?"
         else:
             # Extract text from the response using the output_text helper
             reply = ""
             if hasattr(response, 'output_text') and response.output_text:
                 reply = response.output_text.strip()
-                print(f"[DEBUG] Extracted reply: '{reply}'")
             else:
                 # Fallback: manually extract from output array
                 if response.output and len(response.output) > 0:
@@ -156,18 +129,18 @@ GUIDELINES:
                             for content in output_item.content:
                                 if content.type == "refusal":
                                     reply = "I apologize, but I cannot assist with that request. How else can I help you today?"
-                                    print(f"[DEBUG] Model refused request: {content.refusal if hasattr(content, 'refusal') else 'No details'}")
+                                    log_event(logger, logging.WARNING, "llm_refusal", agent="conversation",
+                                              refusal=content.refusal if hasattr(content, 'refusal') else 'No details')
                                     break
                                 elif content.type == "output_text":
                                     reply = content.text.strip()
-                                    print(f"[DEBUG] Extracted reply from fallback: '{reply}'")
                                     break
                             if reply:
                                 break
         
         if not reply:
             reply = "I'm here to help! Could you please repeat that?"
-            print(f"[DEBUG] No reply extracted, using fallback")
+            log_event(logger, logging.WARNING, "llm_empty_reply", agent="conversation", step=step)
         
         # Update state based on step
         if step == 1:
@@ -176,7 +149,8 @@ GUIDELINES:
             collected["problem_description"] = message
             collected["problem_type"] = problem_analysis["problem_type"]
             
-            print(f"[DEBUG] Step 1: analyzed problem '{problem_analysis['problem_type']}', needs_clarification: {problem_analysis.get('needs_clarification', False)}")
+            log_event(logger, logging.DEBUG, "problem_analyzed", sampled=True, problem_type=problem_analysis["problem_type"],
+                      needs_clarification=problem_analysis.get("needs_clarification", False))
             
             # Check if clarification is needed
             if problem_analysis.get("needs_clarification"):
@@ -217,7 +191,7 @@ GUIDELINES:
             collected["coverage_reason"] = clarification_analysis["coverage_reason"]
             collected["exclusions_apply"] = clarification_analysis.get("exclusions_apply", False)
             
-            print(f"[DEBUG] Step 1.5 -> next: clarification analysis complete, covered: {clarification_analysis['is_covered']}")
+            log_event(logger, logging.DEBUG, "clarification_analyzed", sampled=True, is_covered=clarification_analysis["is_covered"])
             
             # If not covered due to exclusions, end the conversation
             if not clarification_analysis["is_covered"]:
@@ -234,7 +208,7 @@ GUIDELINES:
         elif step == 2:
             # Collect name and immediately verify policy
             collected["customer_name"] = message
-            print(f"[DEBUG] Step 2 -> 4: collected name '{message}', auto-verifying policy")
+            log_event(logger, logging.DEBUG, "step_transition", sampled=True, from_step=2, to_step=4)
             
             # Auto-verify policy and ask for location in the same response
             # The OpenAI response should handle the policy verification message + location request
@@ -244,7 +218,7 @@ GUIDELINES:
             }
         elif step == 3:
             # This step should not be reached anymore, but keeping as fallback
-            print(f"[DEBUG] Step 3 -> 4: policy verification step (fallback)")
+            log_event(logger, logging.DEBUG, "step_transition", sampled=True, from_step=3, to_step=4)
             return {
                 "reply": reply,
                 "state": {"step": 4, "collected": collected}
@@ -252,28 +226,27 @@ GUIDELINES:
         elif step == 4:
             # Location collected, ready for dispatch
             collected["location_description"] = message
-            print(f"[DEBUG] Step 4 -> 5: collected location '{message}', ready for dispatch")
+            log_event(logger, logging.DEBUG, "step_transition", sampled=True, from_step=4, to_step=5)
             return {
                 "reply": reply,
                 "state": {"step": 5, "collected": collected, "ready_for_dispatch": True}
             }
         else:
             # Complete
-            print(f"[DEBUG] Step {step}: conversation complete")
+            log_event(logger, logging.DEBUG, "step_transition", sampled=True, from_step=step, to_step=5)
             return {
                 "reply": reply,
                 "state": {"step": 5, "collected": collected, "complete": True}
             }
             
     except Exception as e:
-        print(f"[DEBUG] Exception in conversational_ai_agent: {e}")
-        print(f"[DEBUG] Exception type: {type(e).__name__}")
-        print(f"[DEBUG] Falling back to rule-based agent")
+        log_event(logger, logging.WARNING, "llm_call_failed", agent="conversation", error_type=type(e).__name__, error=str(e))
         # Fallback to rule-based responses if OpenAI fails
         return fallback_conversational_agent(message, conversation_state)
 
 def fallback_conversational_agent(message: str, conversation_state: Dict[str, Any]) -> Dict[str, Any]:
     """Fallback rule-based agent when OpenAI is unavailable"""
+    _FALLBACK_CONVERSATION.inc()
     step = conversation_state.get("step", 0)
     collected = conversation_state.get("collected", {})
     
@@ -361,8 +334,22 @@ def fallback_conversational_agent(message: str, conversation_state: Dict[str, An
             "state": {"step": 5, "collected": collected, "complete": True}
         }
 
+@metrics.time_agent("analyze_problem_description")
 def analyze_problem_description(description: str, location_context: str = None) -> Dict[str, Any]:
     """LLM-based analysis to categorize problem type and check policy coverage with exclusion detection"""
+    # Local classifier answers confident, exclusion-free cases without the LLM
+    local_result = classifier.classify(description, location_context)
+    if local_result:
+        problem_type, confidence = local_result
+        log_event(logger, logging.DEBUG, "local_classifier_hit", sampled=True, problem_type=problem_type, confidence=round(confidence, 3))
+        return {
+            "problem_type": problem_type,
+            "needs_clarification": False,
+            "clarification_questions": None,
+            "potential_exclusions": None,
+            **PROBLEM_TYPE_OUTCOMES[problem_type]
+        }
+    
     client = get_openai_client()
     
     if not client:
@@ -370,43 +357,8 @@ def analyze_problem_description(description: str, location_context: str = None)
         return fallback_problem_analysis(description, location_context)
     
     try:
-        # Get the policy coverage details for analysis
-        policy_coverage = JOHN_DOE_POLICY["coverage"]["roadside_assistance"]["services"]
-        exclusions = JOHN_DOE_POLICY["exclusions"]
-        
-        system_prompt = f"""You are an insurance policy analyzer. Analyze the customer's problem description and determine:
-1. The specific problem type
-2. Whether there are potential exclusions that need clarification
-3. Whether it's covered under the policy (only if no clarification needed)
-4. If clarification is needed, what tactful questions to ask
-
-POLICY COVERAGE:
-{json.dumps(policy_coverage, indent=2)}
-
-POLICY EXCLUSIONS:
-{exclusions}
-
-IMPORTANT: If the description might involve exclusions (commercial use, racing events, off-road use), set "needs_clarification": true and provide tactful questions instead of immediately denying coverage.
-
-Return your analysis in this exact JSON format:
-{{
-    "problem_type": "specific problem category",
-    "needs_clarification": true/false,
-    "clarification_questions": ["tactful question 1", "tactful question 2"] or null,
-    "potential_exclusions": ["exclusion1", "exclusion2"] or null,
-    "is_covered": true/false/null,
-    "coverage_reason": "explanation of coverage decision or why clarification needed",
-    "suggested_service": "recommended service type if covered"
-}}
-
-Examples of tactful questions:
-- "To help me find the best assistance for you, could you tell me a bit more about where this happened? Were you on a main road or perhaps somewhere more remote?"
-- "I'd like to make sure I get you the right help - were you driving for personal use when this occurred?"
-- "To ensure I dispatch the most appropriate service, could you describe the area where you're located? Is it easily accessible by our service vehicles?"
-
-Be tactful and professional - never directly ask "were you off-roading?" but gather context naturally."""
-
         location_info = f"\nLocation context: {location_context}" if location_context else ""
+        system_prompt = build_problem_analysis_prompt()
         
         response = client.chat.completions.create(
             model="gpt-4o-mini",
@@ -417,71 +369,127 @@ Be tactful and professional - never directly ask "were you off-roading?" but gat
             max_tokens=500,
             temperature=0.1  # Low temperature for consistent analysis
         )
+        prompts.record_usage("problem_analysis", response, system_prompt)
         
         result_text = response.choices[0].message.content.strip()
         
         # Parse JSON response
         try:
-            result = json.loads(result_text)
-            return {
-                "problem_type": result.get("problem_type", "general roadside assistance"),
-                "needs_clarification": result.get("needs_clarification", False),
-                "clarification_questions": result.get("clarification_questions"),
-                "potential_exclusions": result.get("potential_exclusions"),
-                "is_covered": result.get("is_covered"),
-                "coverage_reason": result.get("coverage_reason", "Standard coverage applies"),
-                "suggested_service": result.get("suggested_service", "repair_truck")
-            }
+            return normalize_problem_analysis(json.loads(result_text))
         except json.JSONDecodeError:
-            print(f"[DEBUG] Failed to parse LLM response as JSON: {result_text}")
+            log_event(logger, logging.WARNING, "llm_invalid_json", agent="problem_analysis", response_chars=len(result_text))
             return fallback_problem_analysis(description, location_context)
             
     except Exception as e:
-        print(f"[DEBUG] LLM problem analysis failed: {e}")
+        log_event(logger, logging.WARNING, "llm_call_failed", agent="problem_analysis", error_type=type(e).__name__, error=str(e))
         return fallback_problem_analysis(description, location_context)
 
+def build_problem_analysis_prompt() -> str:
+    """System prompt for problem analysis, compiled once per policy version"""
+    return catalog.current().prompts.problem_analysis
+
+def normalize_problem_analysis(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Coerce a parsed LLM analysis into the standard analysis shape"""
+    return {
+        "problem_type": result.get("problem_type", "general roadside assistance"),
+        "needs_clarification": result.get("needs_clarification", False),
+        "clarification_questions": result.get("clarification_questions"),
+        "potential_exclusions": result.get("potential_exclusions"),
+        "is_covered": result.get("is_covered"),
+        "coverage_reason": result.get("coverage_reason", "Standard coverage applies"),
+        "suggested_service": result.get("suggested_service", "repair_truck")
+    }
+
+BATCH_ANALYSIS_INSTRUCTIONS = """You will receive a numbered list of customer problems. Analyze each one independently and return a JSON array containing exactly one analysis object per problem, in the same order, each in the format above. Return only the JSON array."""
+
+# Most descriptions analyzed in one LLM call (each is given 300 output tokens)
+MAX_ANALYSIS_BATCH = 25
+
+@metrics.time_agent("analyze_problem_descriptions_batch")
+def analyze_problem_descriptions_batch(descriptions: List[str]) -> List[Tuple[Dict[str, Any], bool]]:
+    """Analyze several problem descriptions with a single LLM call.
+
+    Returns (analysis, from_llm) per description; from_llm is False where the
+    rule-engine fallback answered (no client, a failed call, or a skipped item).
+    """
+    if len(descriptions) > MAX_ANALYSIS_BATCH:
+        raise ValueError(f"At most {MAX_ANALYSIS_BATCH} descriptions per call")
+    client = get_openai_client()
+    
+    if not client:
+        return [(fallback_problem_analysis(d), False) for d in descriptions]
+    
+    results: List[Optional[Dict[str, Any]]] = [None] * len(descriptions)
+    try:
+        numbered = "\n".join(f"{i + 1}. {d}" for i, d in enumerate(descriptions))
+        system_prompt = build_problem_analysis_prompt()
+        response = client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": BATCH_ANALYSIS_INSTRUCTIONS},
+                {"role": "user", "content": f"Customer problems:\n{numbered}"}
+            ],
+            max_tokens=300 * len(descriptions),
+            temperature=0.1
+        )
+        prompts.record_usage("problem_analysis_batch", response, system_prompt + BATCH_ANALYSIS_INSTRUCTIONS)
+        
+        parsed = json.loads(response.choices[0].message.content.strip())
+        if isinstance(parsed, dict):
+            # Tolerate {"analyses": [...]} style wrappers
+            parsed = next((v for v in parsed.values() if isinstance(v, list)), [])
+        for i, item in enumerate(parsed[:len(descriptions)]):
+            if isinstance(item, dict):
+                results[i] = normalize_problem_analysis(item)
+    except Exception as e:
+        log_event(logger, logging.WARNING, "llm_call_failed", agent="problem_analysis_batch", error_type=type(e).__name__, error=str(e))
+    
+    # Anything the model skipped or garbled falls back to the rule engine
+    return [(r, True) if r is not None else (fallback_problem_analysis(d), False) for r, d in zip(results, descriptions)]
+
+# Clarification question asked for each potential exclusion
+EXCLUSION_CLARIFICATION_QUESTIONS = {
+    "off_road_use": "To help me find the best assistance for you, could you tell me a bit more about where this happened? Were you on a main road or perhaps somewhere more remote?",
+    "commercial_use": "I'd like to make sure I get you the right help - were you driving for personal use when this occurred?",
+    "racing_events": "Could you tell me a bit more about what you were doing when this issue occurred?"
+}
+
+# Coverage outcome for each problem type detected by the rule engine
+PROBLEM_TYPE_OUTCOMES = {
+    "flat tire": {"is_covered": True, "coverage_reason": "Flat tire service is covered under policy", "suggested_service": "repair_truck"},
+    "battery issue": {"is_covered": True, "coverage_reason": "Battery jumpstart is covered under policy", "suggested_service": "repair_truck"},
+    "lockout": {"is_covered": True, "coverage_reason": "Lockout service is covered under policy", "suggested_service": "repair_truck"},
+    "fuel delivery": {"is_covered": False, "coverage_reason": "Fuel delivery is not covered under your policy", "suggested_service": None},
+    "breakdown requiring tow": {"is_covered": True, "coverage_reason": "Towing service is covered under policy", "suggested_service": "tow_truck"},
+    "general roadside assistance": {"is_covered": True, "coverage_reason": "General roadside assistance is covered", "suggested_service": "repair_truck"}
+}
+
 def fallback_problem_analysis(description: str, location_context: str = None) -> Dict[str, Any]:
     """Fallback keyword-based analysis with policy checking and exclusion detection"""
-    desc_lower = description.lower()
-    location_lower = location_context.lower() if location_context else ""
+    _FALLBACK_PROBLEM_ANALYSIS.inc()
+    return rule_problem_analysis(description, location_context)
+
+def rule_problem_analysis(description: str, location_context: str = None) -> Dict[str, Any]:
+    """Keyword-based analysis from the rule engine; unlike the fallback it is not counted as one"""
+    matches = rules.match_rules(description)
+    problem_types = matches.problem_type
+    problem_type = problem_types[0] if problem_types else "general roadside assistance"
     
     # Check for potential exclusions that need clarification
-    potential_exclusions = []
-    clarification_questions = []
+    potential_exclusions = list(matches.exclusion)
     
-    # Check for off-road indicators
-    if any(word in desc_lower or word in location_lower for word in ["trail", "dirt", "mud", "forest", "mountain", "desert", "beach", "sand", "creek", "river"]):
-        potential_exclusions.append("off_road_use")
-        clarification_questions.append("To help me find the best assistance for you, could you tell me a bit more about where this happened? Were you on a main road or perhaps somewhere more remote?")
-    
-    # Check for commercial use indicators
-    if any(word in desc_lower for word in ["delivery", "work", "business", "commercial", "company", "job"]):
-        potential_exclusions.append("commercial_use")
-        clarification_questions.append("I'd like to make sure I get you the right help - were you driving for personal use when this occurred?")
-    
-    # Check for racing/event indicators
-    if any(word in desc_lower for word in ["race", "track", "event", "competition", "racing", "speed"]):
-        potential_exclusions.append("racing_events")
-        clarification_questions.append("Could you tell me a bit more about what you were doing when this issue occurred?")
+    # Off-road indicators also count when they appear in the location
+    if location_context and "off_road_use" not in potential_exclusions:
+        if "off_road_use" in rules.match_rules(location_context).exclusion:
+            potential_exclusions.insert(0, "off_road_use")
     
     # If potential exclusions found, ask for clarification
     if potential_exclusions:
-        problem_type = "general roadside assistance"
-        if any(word in desc_lower for word in ["flat", "tire", "puncture", "wheel"]):
-            problem_type = "flat tire"
-        elif any(word in desc_lower for word in ["battery", "dead", "won't start", "wont start", "no start"]):
-            problem_type = "battery issue"
-        elif any(word in desc_lower for word in ["locked", "keys", "lock"]):
-            problem_type = "lockout"
-        elif any(word in desc_lower for word in ["fuel", "gas", "petrol", "empty"]):
-            problem_type = "fuel delivery"
-        elif any(word in desc_lower for word in ["engine", "breakdown", "broken", "tow"]):
-            problem_type = "breakdown requiring tow"
-            
         return {
             "problem_type": problem_type,
             "needs_clarification": True,
-            "clarification_questions": clarification_questions,
+            "clarification_questions": [EXCLUSION_CLARIFICATION_QUESTIONS[e] for e in potential_exclusions],
             "potential_exclusions": potential_exclusions,
             "is_covered": None,
             "coverage_reason": "Need to verify circumstances to ensure coverage applies",
@@ -489,67 +497,15 @@ def fallback_problem_analysis(description: str, location_context: str = None) ->
         }
     
     # No potential exclusions, proceed with normal analysis
-    if any(word in desc_lower for word in ["flat", "tire", "puncture", "wheel"]):
-        return {
-            "problem_type": "flat tire",
-            "needs_clarification": False,
-            "clarification_questions": None,
-            "potential_exclusions": None,
-            "is_covered": True,
-            "coverage_reason": "Flat tire service is covered under policy",
-            "suggested_service": "repair_truck"
-        }
-    elif any(word in desc_lower for word in ["battery", "dead", "won't start", "wont start", "no start"]):
-        return {
-            "problem_type": "battery issue",
-            "needs_clarification": False,
-            "clarification_questions": None,
-            "potential_exclusions": None,
-            "is_covered": True,
-            "coverage_reason": "Battery jumpstart is covered under policy",
-            "suggested_service": "repair_truck"
-        }
-    elif any(word in desc_lower for word in ["locked", "keys", "lock"]):
-        return {
-            "problem_type": "lockout",
-            "needs_clarification": False,
-            "clarification_questions": None,
-            "potential_exclusions": None,
-            "is_covered": True, 
-            "coverage_reason": "Lockout service is covered under policy",
-            "suggested_service": "repair_truck"
-        }
-    elif any(word in desc_lower for word in ["fuel", "gas", "petrol", "empty"]):
-        return {
-            "problem_type": "fuel delivery",
-            "needs_clarification": False,
-            "clarification_questions": None,
-            "potential_exclusions": None,
-            "is_covered": False,
-            "coverage_reason": "Fuel delivery is not covered under your policy",
-            "suggested_service": None
-        }
-    elif any(word in desc_lower for word in ["engine", "breakdown", "broken", "tow"]):
-        return {
-            "problem_type": "breakdown requiring tow",
-            "needs_clarification": False,
-            "clarification_questions": None,
-            "potential_exclusions": None,
-            "is_covered": True,
-            "coverage_reason": "Towing service is covered under policy", 
-            "suggested_service": "tow_truck"
-        }
-    else:
-        return {
-            "problem_type": "general roadside assistance",
-            "needs_clarification": False,
-            "clarification_questions": None,
-            "potential_exclusions": None,
-            "is_covered": True,
-            "coverage_reason": "General roadside assistance is covered",
-            "suggested_service": "repair_truck"
-        }
+    return {
+        "problem_type": problem_type,
+        "needs_clarification": False,
+        "clarification_questions": None,
+        "potential_exclusions": None,
+        **PROBLEM_TYPE_OUTCOMES[problem_type]
+    }
 
+@metrics.time_agent("analyze_clarification_response")
 def analyze_clarification_response(clarification_response: str, potential_exclusions: List[str], problem_type: str) -> Dict[str, Any]:
     """Analyze customer's response to clarification questions to determine final coverage"""
     client = get_openai_client()
@@ -558,28 +514,7 @@ def analyze_clarification_response(clarification_response: str, potential_exclus
         return fallback_clarification_analysis(clarification_response, potential_exclusions, problem_type)
     
     try:
-        system_prompt = f"""You are an insurance policy analyzer. Based on the customer's clarification response, determine if their situation falls under policy exclusions.
-
-POLICY EXCLUSIONS TO CHECK:
-{potential_exclusions}
-
-EXCLUSION DEFINITIONS:
-- off_road_use: Driving on unpaved roads, trails, beaches, or any non-public roadways
-- commercial_use: Using vehicle for business purposes, deliveries, or work-related activities  
-- racing_events: Participating in races, competitions, or high-speed events
-
-Analyze the customer's response and determine if any exclusions apply.
-
-Return your analysis in this exact JSON format:
-{{
-    "exclusions_apply": true/false,
-    "applicable_exclusions": ["exclusion1", "exclusion2"] or [],
-    "is_covered": true/false,
-    "coverage_reason": "explanation of coverage decision",
-    "confidence": 0.0-1.0
-}}
-
-Be conservative - if there's clear evidence of exclusion activity, deny coverage. If unclear or likely covered, approve."""
+        system_prompt = catalog.current().prompts.clarification_analysis
 
         response = client.chat.completions.create(
             model="gpt-4o-mini",
@@ -590,6 +525,7 @@ Be conservative - if there's clear evidence of exclusion activity, deny coverage
             max_tokens=300,
             temperature=0.1
         )
+        prompts.record_usage("clarification_analysis", response, system_prompt)
         
         result_text = response.choices[0].message.content.strip()
         
@@ -603,32 +539,18 @@ Be conservative - if there's clear evidence of exclusion activity, deny coverage
                 "confidence": result.get("confidence", 0.8)
             }
         except json.JSONDecodeError:
-            print(f"[DEBUG] Failed to parse clarification analysis JSON: {result_text}")
+            log_event(logger, logging.WARNING, "llm_invalid_json", agent="clarification_analysis", response_chars=len(result_text))
             return fallback_clarification_analysis(clarification_response, potential_exclusions, problem_type)
             
     except Exception as e:
-        print(f"[DEBUG] LLM clarification analysis failed: {e}")
+        log_event(logger, logging.WARNING, "llm_call_failed", agent="clarification_analysis", error_type=type(e).__name__, error=str(e))
         return fallback_clarification_analysis(clarification_response, potential_exclusions, problem_type)
 
 def fallback_clarification_analysis(clarification_response: str, potential_exclusions: List[str], problem_type: str) -> Dict[str, Any]:
     """Fallback keyword-based analysis of clarification response"""
-    response_lower = clarification_response.lower()
-    applicable_exclusions = []
-    
-    # Check for off-road exclusion
-    if "off_road_use" in potential_exclusions:
-        if any(word in response_lower for word in ["trail", "dirt", "mud", "off-road", "offroad", "forest", "mountain", "beach", "sand", "creek", "river", "remote", "unpaved"]):
-            applicable_exclusions.append("off_road_use")
-    
-    # Check for commercial use exclusion  
-    if "commercial_use" in potential_exclusions:
-        if any(word in response_lower for word in ["work", "business", "delivery", "commercial", "company", "job", "employer"]):
-            applicable_exclusions.append("commercial_use")
-    
-    # Check for racing events exclusion
-    if "racing_events" in potential_exclusions:
-        if any(word in response_lower for word in ["race", "racing", "track", "competition", "event", "speed"]):
-            applicable_exclusions.append("racing_events")
+    _FALLBACK_CLARIFICATION.inc()
+    matched = rules.match_rules(clarification_response).clarification_exclusion
+    applicable_exclusions = [e for e in matched if e in potential_exclusions]
     
     exclusions_apply = len(applicable_exclusions) > 0
     
@@ -651,65 +573,60 @@ def fallback_clarification_analysis(clarification_response: str, potential_exclu
         }
 
 # ==================== AGENT 2: Verification & Policy Agent ====================
+@metrics.time_agent("verification_policy_agent")
 def verification_policy_agent(customer_name: str) -> Dict[str, Any]:
     """Verifies customer identity and checks policy coverage."""
-    if customer_name.lower().strip() == "john doe":
-        policy = JOHN_DOE_POLICY
-        start_date = datetime.strptime(policy["start_date"], "%Y-%m-%d")
-        end_date = datetime.strptime(policy["end_date"], "%Y-%m-%d")
-        current_date = datetime.now()
-        
-        if start_date <= current_date <= end_date:
-            return {
-                "verified": True,
-                "policy": policy,
-                "coverage_status": "active",
-                "roadside_covered": policy["coverage"]["roadside_assistance"]["is_covered"]
-            }
-        else:
-            return {
-                "verified": True,
-                "policy": policy,
-                "coverage_status": "expired",
-                "roadside_covered": False
-            }
-    else:
+    store = catalog.current().policies
+    entry = store.lookup_holder(customer_name)
+    name_match = {}
+    if entry is None:
+        # Voice transcripts ("jon doe", "John A. Doe") rarely match exactly
+        fuzzy = store.fuzzy_lookup_holder(customer_name)
+        if fuzzy:
+            entry, matched_name, score = fuzzy
+            name_match = {"name_match": {"method": "fuzzy", "matched_name": matched_name, "score": score}}
+    
+    if entry is None:
         return {
             "verified": False,
             "policy": None,
             "coverage_status": "not_found",
             "roadside_covered": False
         }
+    
+    policy = entry.policy
+    if entry.is_active():
+        return {
+            "verified": True,
+            "policy": policy,
+            "coverage_status": "active",
+            "roadside_covered": policy["coverage"]["roadside_assistance"]["is_covered"],
+            **name_match
+        }
+    else:
+        return {
+            "verified": True,
+            "policy": policy,
+            "coverage_status": "expired",
+            "roadside_covered": False,
+            **name_match
+        }
 
 # ==================== AGENT 3: Geolocation Agent ====================
+@metrics.time_agent("geolocation_agent")
 def geolocation_agent() -> Dict[str, Any]:
     """Determines customer's exact location."""
+    location = catalog.current().location
     return {
         "location_method": "gps_coordinates",
-        "latitude": CUSTOMER_LOCATION["lat"],
-        "longitude": CUSTOMER_LOCATION["lon"],
+        "latitude": location["lat"],
+        "longitude": location["lon"],
         "accuracy": "high",
-        "address_estimate": "Near Harrow, London"
+        "address_estimate": location["address_estimate"]
     }
 
 # ==================== AGENT 4: Dispatch & Logistics Agent ====================
-def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Calculate distance between two coordinates using Haversine formula"""
-    R = 6371  # Earth's radius in kilometers
-    
-    lat1_rad = math.radians(lat1)
-    lon1_rad = math.radians(lon1)
-    lat2_rad = math.radians(lat2)
-    lon2_rad = math.radians(lon2)
-    
-    dlat = lat2_rad - lat1_rad
-    dlon = lon2_rad - lon1_rad
-    
-    a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    
-    return R * c
-
+@metrics.time_agent("dispatch_logistics_agent")
 def dispatch_logistics_agent(problem_type: str, customer_location: Dict[str, float]) -> Dict[str, Any]:
     """Finds the best service provider and dispatches them."""
     customer_lat = customer_location["lat"]
@@ -726,35 +643,25 @@ def dispatch_logistics_agent(problem_type: str, customer_location: Dict[str, flo
         preferred_type = "tow_truck"
         fallback_type = "repair_truck"
     
-    # Find closest providers
-    all_providers = SERVICE_PROVIDERS["repair_trucks"]
-    
-    # Calculate distances and filter by type
-    candidates = []
-    for provider in all_providers:
-        distance = calculate_distance(customer_lat, customer_lon, provider["lat"], provider["lon"])
-        if provider["type"] == preferred_type:
-            candidates.append({**provider, "distance": distance, "priority": 1})
-        elif provider["type"] == fallback_type:
-            candidates.append({**provider, "distance": distance, "priority": 2})
-    
-    # Sort by priority then distance
-    candidates.sort(key=lambda x: (x["priority"], x["distance"]))
-    
-    if candidates:
-        best_provider = candidates[0]
-        
+    # Closest provider of the preferred type, else of the fallback type
+    snapshot = catalog.current()
+    priorities = {preferred_type: 1, fallback_type: 2}
+    candidates = {}
+    for provider_type, priority in priorities.items():
+        match = snapshot.nearest_provider(provider_type, customer_lat, customer_lon)
+        if match:
+            distance, provider = match
+            candidates[provider_type] = {**provider, "distance": distance, "priority": priority}
+    
+    best_provider = candidates.get(preferred_type) or candidates.get(fallback_type)
+    if best_provider:
         # Check if closest garage is > 50km for repair trucks
         if best_provider["type"] == "repair_truck":
-            closest_garage_distance = min(
-                calculate_distance(customer_lat, customer_lon, garage["lat"], garage["lon"])
-                for garage in SERVICE_PROVIDERS["garages"]
-            )
+            closest_garage = snapshot.nearest_garage(customer_lat, customer_lon)
             
-            if closest_garage_distance > 50:
-                tow_candidates = [c for c in candidates if c["type"] == "tow_truck"]
-                if tow_candidates:
-                    best_provider = tow_candidates[0]
+            if closest_garage is None or closest_garage[0] > 50:
+                if "tow_truck" in candidates:
+                    best_provider = candidates["tow_truck"]
         
         eta_minutes = max(15, int(best_provider["distance"] * 2.5))
         
@@ -811,7 +718,7 @@ def create_claim(policy_holder: str, policy_number: str, problem_type: str) -> s
     """Creates a new claim and returns claim_id"""
     claim_id = str(uuid.uuid4())
     
-    claim = {
+    claim = Claim.from_dict({
         "claim_id": claim_id,
         "policy_holder": policy_holder,
         "policy_number": policy_number,
@@ -825,54 +732,34 @@ def create_claim(policy_holder: str, policy_number: str, problem_type: str) -> s
                 "details": f"Claim created for {problem_type}"
             }
         ]
-    }
-    
-    # Load existing claims or create new file
-    claims = []
-    if os.path.exists(CLAIMS_FILE):
-        try:
-            with open(CLAIMS_FILE, 'r') as f:
-                claims = json.load(f)
-        except:
-            claims = []
-    
-    claims.append(claim)
+    })
     
-    # Save to file
-    with open(CLAIMS_FILE, 'w') as f:
-        json.dump(claims, f, indent=2)
+    # Append and save (the file is created if needed)
+    storage.claims().put(claim_id, claim)
     
     return claim_id
 
 def update_claim(claim_id: str, new_status: str, details_dict: Dict[str, Any]) -> bool:
     """Updates an existing claim"""
-    if not os.path.exists(CLAIMS_FILE):
-        return False
-    
-    try:
-        with open(CLAIMS_FILE, 'r') as f:
-            claims = json.load(f)
-    except:
-        return False
-    
-    # Find and update claim
-    for claim in claims:
-        if claim["claim_id"] == claim_id:
-            claim["status"] = new_status
-            claim["history"].append({
-                "timestamp": datetime.now().isoformat(),
-                "status": new_status,
-                "details": details_dict
-            })
-            
-            # Save updated claims
-            with open(CLAIMS_FILE, 'w') as f:
-                json.dump(claims, f, indent=2)
-            return True
-    
-    return False
+    claims = storage.claims()
+    with claims.lock:
+        claim = claims.get(claim_id)
+        if claim is None:
+            return False
+        
+        claim.set("status", new_status)
+        claim.history.append(HistoryEntry.from_dict({
+            "timestamp": datetime.now().isoformat(),
+            "status": new_status,
+            "details": details_dict
+        }))
+        
+        # Save updated claims
+        claims.save(claim_id)
+        return True
 
 # ==================== ORCHESTRATOR FUNCTION ====================
+@metrics.time_agent("process_roadside_assistance_request")
 def process_roadside_assistance_request(conversation_state: Dict[str, Any]) -> Dict[str, Any]:
     """Main orchestrator that coordinates all 6 agents."""
     collected = conversation_state.get("collected", {})
@@ -966,6 +853,7 @@ def process_roadside_assistance_request(conversation_state: Dict[str, Any]) -> D
     
     return results
 
+@metrics.time_agent("confirm_dispatch_and_cab")
 def confirm_dispatch_and_cab(conversation_state: Dict[str, Any], help_confirmed: bool, cab_requested: bool) -> Dict[str, Any]:
     """Handle user confirmations and complete dispatch if confirmed"""
     collected = conversation_state.get("collected", {})
@@ -1057,14 +945,7 @@ def confirm_dispatch_and_cab(conversation_state: Dict[str, Any], help_confirmed:
 # ==================== ADMIN FUNCTIONS ====================
 def get_all_cases_for_admin() -> List[Dict[str, Any]]:
     """Get all cases with full details for admin dashboard"""
-    if not os.path.exists(CLAIMS_FILE):
-        return []
-    
-    try:
-        with open(CLAIMS_FILE, 'r') as f:
-            claims = json.load(f)
-    except:
-        return []
+    claims = storage.claims().to_dicts()
     
     admin_cases = []
     
@@ -1145,6 +1026,7 @@ def generate_mock_decisions(claim: Dict[str, Any]) -> List[Dict[str, Any]]:
     
     # Parse the created time and generate decision timestamps
     base_time = datetime.fromisoformat(created_time.replace('Z', '+00:00'))
+    location = catalog.current().location
     
     decisions = [
         {
@@ -1175,10 +1057,10 @@ def generate_mock_decisions(claim: Dict[str, Any]) -> List[Dict[str, Any]]:
             "agent": "Geolocation Agent",
             "decision": "Located customer at coordinates",
             "details": {
-                "latitude": CUSTOMER_LOCATION["lat"],
-                "longitude": CUSTOMER_LOCATION["lon"],
+                "latitude": location["lat"],
+                "longitude": location["lon"],
                 "method": "gps_coordinates",
-                "address_estimate": "Near Harrow, London"
+                "address_estimate": location["address_estimate"]
             },
             "timestamp": (base_time - timedelta(minutes=3)).isoformat()
         }
@@ -1231,54 +1113,22 @@ def generate_mock_decisions(claim: Dict[str, Any]) -> List[Dict[str, Any]]:
 # ==================== CONVERSATION TRACKING ====================
 def save_conversation(conversation_id: str, conversation_data: Dict[str, Any]) -> bool:
     """Save or update a conversation"""
-    conversations = []
-    if os.path.exists(CONVERSATIONS_FILE):
-        try:
-            with open(CONVERSATIONS_FILE, 'r') as f:
-                conversations = json.load(f)
-        except:
-            conversations = []
-    
     # Update existing or add new conversation
-    updated = False
-    for i, conv in enumerate(conversations):
-        if conv.get("conversation_id") == conversation_id:
-            conversations[i] = conversation_data
-            updated = True
-            break
-    
-    if not updated:
-        conversations.append(conversation_data)
-    
     try:
-        with open(CONVERSATIONS_FILE, 'w') as f:
-            json.dump(conversations, f, indent=2)
-        return True
+        conv = Conversation.from_dict(conversation_data)
+        storage.conversations().put(conversation_id, conv)
     except:
         return False
+    board.publish(conv, "saved")
+    return True
 
 def get_all_conversations() -> List[Dict[str, Any]]:
     """Get all active conversations"""
-    if not os.path.exists(CONVERSATIONS_FILE):
-        return []
-    
-    try:
-        with open(CONVERSATIONS_FILE, 'r') as f:
-            return json.load(f)
-    except:
-        return []
+    return storage.conversations().to_dicts()
 
 def detect_human_handoff_request(message: str) -> bool:
     """Detect if user is requesting human assistance"""
-    message_lower = message.lower()
-    handoff_keywords = [
-        "human", "person", "speak to someone", "talk to someone",
-        "representative", "agent", "operator", "help me",
-        "customer service", "supervisor", "manager", "real person",
-        "not working", "frustrated", "unhappy", "complaint"
-    ]
-    
-    return any(keyword in message_lower for keyword in handoff_keywords)
+    return bool(rules.match_rules(message).handoff)
 
 def create_conversation_entry(conversation_id: str, customer_name: str = None, problem_type: str = None) -> Dict[str, Any]:
     """Create a new conversation entry"""
@@ -1295,72 +1145,264 @@ def create_conversation_entry(conversation_id: str, customer_name: str = None, p
         "is_active": True
     }
 
+def ensure_conversation(conversation_id: str, customer_name: str = None, problem_type: str = None) -> bool:
+    """Create the conversation unless it exists (an existing one is left as it is); True if it was created"""
+    conversations = storage.conversations()
+    with conversations.lock:
+        if conversations.get(conversation_id) is not None:
+            return False
+        conv = Conversation.from_dict(create_conversation_entry(conversation_id, customer_name, problem_type))
+        conversations.put(conversation_id, conv)
+    board.publish(conv, "saved")
+    return True
+
+# Most messages accepted by one add_messages_to_conversations call
+MAX_BULK_MESSAGES = 1000
+
+def _append_message(conv: Conversation, message_type: str, content: str, sender: str = None) -> bool:
+    """Append a message to a conversation record; True if it flagged the conversation for a human"""
+    conv.messages.append(Message.from_dict({
+        "timestamp": datetime.now().isoformat(),
+        "type": message_type,  # 'user', 'agent', 'admin'
+        "content": content,
+        "sender": sender or message_type
+    }))
+    conv.set("last_updated", datetime.now().isoformat())
+    
+    # Check if user is requesting human help
+    if message_type == "user" and detect_human_handoff_request(content):
+        handoff = conv.status != "REQUIRES_HUMAN"
+        conv.set("requires_human", True)
+        conv.set("status", "REQUIRES_HUMAN")
+        return handoff
+    return False
+
 def add_message_to_conversation(conversation_id: str, message_type: str, content: str, sender: str = None) -> bool:
     """Add a message to a conversation"""
-    conversations = get_all_conversations()
-    
-    for conv in conversations:
-        if conv.get("conversation_id") == conversation_id:
-            conv["messages"].append({
-                "timestamp": datetime.now().isoformat(),
-                "type": message_type,  # 'user', 'agent', 'admin'
-                "content": content,
-                "sender": sender or message_type
-            })
-            conv["last_updated"] = datetime.now().isoformat()
-            
-            # Check if user is requesting human help
-            if message_type == "user" and detect_human_handoff_request(content):
-                conv["requires_human"] = True
-                conv["status"] = "REQUIRES_HUMAN"
-            
-            save_conversation(conversation_id, conv)
-            return True
-    
-    return False
+    conversations = storage.conversations()
+    with conversations.lock:
+        conv = conversations.get(conversation_id)
+        if conv is None:
+            return False
+        
+        handoff = _append_message(conv, message_type, content, sender)
+        
+        try:
+            conversations.save(conversation_id)
+        except Exception:
+            return False
+    if handoff:
+        board.publish(conv, "handoff")
+    return True
+
+def add_messages_to_conversations(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Add a batch of messages, across any number of conversations, with one write.
+
+    Items are {conversation_id, message_type, content, sender}. Returns one
+    result per item, in order. Invalid items are skipped; if the write fails,
+    none of the batch is stored.
+    """
+    conversations = storage.conversations()
+    results = []
+    changed = {}
+    handoffs = {}
+    with conversations.lock:
+        for index, item in enumerate(messages):
+            conversation_id = item.get("conversation_id")
+            message_type = item.get("message_type", "user")
+            content = item.get("content")
+            result = {"index": index, "conversation_id": conversation_id, "success": False}
+            results.append(result)
+            if not content or not isinstance(content, str):
+                result["error"] = "Message content is required"
+                continue
+            conv = conversations.get(conversation_id) if isinstance(conversation_id, str) else None
+            if conv is None:
+                result["error"] = "Conversation not found"
+                continue
+            if type(conv.messages) is not list:
+                conv.set("messages", [])
+            if _append_message(conv, message_type, content, item.get("sender", message_type)):
+                handoffs[conversation_id] = conv
+            changed[conversation_id] = None
+            result["success"] = True
+        
+        if changed:
+            try:
+                conversations.save(*changed)
+            except Exception as e:
+                # The store drops its cache on a failed save, so the in-memory appends are discarded as well
+                log_event(logger, logging.ERROR, "bulk_messages_save_failed", conversations=len(changed),
+                          error_type=type(e).__name__, error=str(e))
+                for result in results:
+                    if result["success"]:
+                        result["success"] = False
+                        result["error"] = "Failed to save conversation"
+                return results
+    for conv in handoffs.values():
+        board.publish(conv, "handoff")
+    return results
+
+def sync_conversation_history(conversation_id: str, messages: List[Dict[str, Any]], customer_name: str = None,
+                              problem_type: str = None, base_seq: int = 0) -> Dict[str, Any]:
+    """Append the messages the conversation has not seen yet, by client sequence number.
+
+    Each message carries a "seq" (its 1-based position when omitted). The
+    conversation keeps the highest seq it has stored as "sync_seq"; messages
+    at or below it are skipped, so resending a history is a no-op. Status,
+    admin assignment and created_at of an existing conversation are kept.
+
+    A message already stored without a seq (posted through /message or the
+    bulk endpoint) with the same type and content is given the seq instead
+    of being stored twice. base_seq is the sync_seq the client believes the
+    conversation has; if it has less, nothing is stored and "resync" tells
+    the client to send everything past the returned sync_seq.
+    """
+    conversations = storage.conversations()
+    with conversations.lock:
+        conv = conversations.get(conversation_id)
+        created = conv is None
+        if created:
+            conv = Conversation.from_dict(create_conversation_entry(conversation_id, customer_name, problem_type))
+        elif type(conv.messages) is not list:
+            conv.set("messages", [])
+        high_water = conv.extra.get("sync_seq", 0) if conv.extra else 0
+        if high_water < base_seq:
+            return {"appended": 0, "adopted": 0, "sync_seq": high_water, "created": created, "resync": True}
+
+        unsynced: Dict[Any, List[Message]] = {}
+        for stored in conv.messages:
+            if type(stored) is Message and not (stored.extra and "seq" in stored.extra):
+                unsynced.setdefault((stored.type, stored.content), []).append(stored)
+
+        unseen = sorted(
+            ((message.get("seq", position + 1), message) for position, message in enumerate(messages)),
+            key=lambda item: item[0]
+        )
+        appended = adopted = 0
+        for seq, message in unseen:
+            if seq <= high_water:
+                continue
+            high_water = seq
+            matches = unsynced.get((message.get("type"), message.get("content")))
+            if matches:
+                stored = matches.pop(0)
+                stored.extra = {**(stored.extra or {}), "seq": seq}
+                adopted += 1
+                continue
+            conv.messages.append(Message.from_dict({
+                "timestamp": message.get("timestamp"),
+                "type": message.get("type"),
+                "content": message.get("content"),
+                "sender": message.get("sender"),
+                "seq": seq
+            }))
+            appended += 1
+
+        renamed = False
+        for key, value in (("customer_name", customer_name), ("problem_type", problem_type)):
+            if value and not created and getattr(conv, key) != value:
+                conv.set(key, value)
+                renamed = True
+
+        if appended or adopted or renamed or created:
+            conv.set("sync_seq", high_water)
+            conv.set("last_updated", datetime.now().isoformat())
+            if created:
+                conversations.put(conversation_id, conv)
+            else:
+                conversations.save(conversation_id)
+    if created:
+        board.publish(conv, "saved")
+    return {"appended": appended, "adopted": adopted, "sync_seq": high_water, "created": created, "resync": False}
+
+# admin_user the client view sets when a customer asks for a human: no admin holds the conversation yet
+SYSTEM_ADMIN = "System"
+CONVERSATION_ACTIONS = ("takeover", "close", "reopen", "assign")
+
+def transition_conversation(conversation_id: str, action: str, admin_user: str = None,
+                            expected: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Apply an admin action (takeover, close, reopen, assign) to one conversation, atomically.
+
+    expected maps "status" and/or "admin_user" to the values the caller last
+    saw; if the conversation no longer has them the action is a conflict
+    (compare-and-set). A takeover is also a conflict while another admin
+    holds the conversation, so of two concurrent takeovers the first wins.
+    Repeating an action that is already in effect succeeds without a write.
+    """
+    conversations = storage.conversations()
+    with conversations.lock:
+        conv = conversations.get(conversation_id)
+        if conv is None:
+            return {"success": False, "conflict": False, "error": "Conversation not found"}
+        
+        def conflict(error: str) -> Dict[str, Any]:
+            return {"success": False, "conflict": True, "error": error, "conversation": card(conv)}
+        
+        current = card(conv)
+        for key, value in (expected or {}).items():
+            if current.get(key) != value:
+                return conflict(f"{key} is {current.get(key)!r}, expected {value!r}")
+        
+        if action == "takeover":
+            if current["admin_user"] not in (None, SYSTEM_ADMIN, admin_user):
+                return conflict(f"Already taken over by {current['admin_user']}")
+            if current["status"] == "CLOSED":
+                return conflict("Conversation is closed")
+            updates = {"status": "REQUIRES_HUMAN", "admin_user": admin_user}
+        elif action == "close":
+            updates = {"status": "CLOSED", "is_active": False}
+        elif action == "reopen":
+            if current["status"] != "CLOSED":
+                return conflict("Conversation is not closed")
+            updates = {"status": "OPEN", "is_active": True}
+        elif action == "assign":
+            updates = {"admin_user": admin_user}
+        else:
+            raise ValueError(f"Unknown conversation action {action}")
+        
+        changed = any(getattr(conv, key) is MISSING or current[key] != value for key, value in updates.items())
+        if changed:
+            for key, value in updates.items():
+                conv.set(key, value)
+            conv.set("last_updated", datetime.now().isoformat())
+            conversations.save(conversation_id)
+    if changed:
+        board.publish(conv, action)
+    return {"success": True, "changed": changed, "conversation": card(conv)}
 
 def takeover_case(case_id: str, admin_user: str, reason: str) -> Dict[str, Any]:
     """Take over a case for manual handling"""
-    if not os.path.exists(CLAIMS_FILE):
+    claims = storage.claims()
+    if not claims.exists():
         return {"success": False, "error": "Claims file not found"}
     
-    try:
-        with open(CLAIMS_FILE, 'r') as f:
-            claims = json.load(f)
-    except:
-        return {"success": False, "error": "Failed to read claims file"}
-    
-    # Find the claim
-    claim_found = False
-    for claim in claims:
-        if claim["claim_id"] == case_id:
-            claim_found = True
-            
-            # Update claim status to taken over
-            claim["status"] = "MANUAL_TAKEOVER"
-            claim["taken_over_by"] = admin_user
-            claim["takeover_reason"] = reason
-            claim["takeover_timestamp"] = datetime.now().isoformat()
-            
-            # Add to history
-            claim["history"].append({
-                "timestamp": datetime.now().isoformat(),
-                "status": "MANUAL_TAKEOVER",
-                "details": {
-                    "admin_user": admin_user,
-                    "reason": reason,
-                    "action": "Case taken over for manual handling"
-                }
-            })
-            break
-    
-    if not claim_found:
-        return {"success": False, "error": "Case not found"}
-    
-    # Save updated claims
-    try:
-        with open(CLAIMS_FILE, 'w') as f:
-            json.dump(claims, f, indent=2)
-        return {"success": True, "message": "Case taken over successfully"}
-    except:
-        return {"success": False, "error": "Failed to update claims file"}
+    with claims.lock:
+        # Find the claim
+        claim = claims.get(case_id)
+        if claim is None:
+            return {"success": False, "error": "Case not found"}
+        
+        # Update claim status to taken over
+        claim.set("status", "MANUAL_TAKEOVER")
+        claim.set("taken_over_by", admin_user)
+        claim.set("takeover_reason", reason)
+        claim.set("takeover_timestamp", datetime.now().isoformat())
+        
+        # Add to history
+        claim.history.append(HistoryEntry.from_dict({
+            "timestamp": datetime.now().isoformat(),
+            "status": "MANUAL_TAKEOVER",
+            "details": {
+                "admin_user": admin_user,
+                "reason": reason,
+                "action": "Case taken over for manual handling"
+            }
+        }))
+        
+        # Save updated claims
+        try:
+            claims.save(case_id)
+            return {"success": True, "message": "Case taken over successfully"}
+        except:
+            return {"success": False, "error": "Failed to update claims file"}
@@ -0,0 +1 @@
+"""Benchmark scripts for the backend. Run from ``backend/`` with ``python -m benchmarks.<name>``."""
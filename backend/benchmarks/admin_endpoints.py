@@ -0,0 +1,136 @@
+"""Response time of the admin list endpoints before and after the serializer layer.
+
+``/api/admin/cases`` and ``/api/admin/conversations`` are requested in
+process, through ``TestClient``, against synthetic datasets. Variants:
+
+- ``before``: the endpoints as they were. Storage files are pretty-printed
+  and read with ``json``, and dicts are returned through FastAPI's
+  ``jsonable_encoder`` and default ``JSONResponse``;
+- ``after (json)``: the app's endpoints with the stdlib backend and compact
+  storage files;
+- ``after (orjson)``: the same with orjson, when it is installed.
+
+    cd backend && python -m benchmarks.admin_endpoints --sizes 1k,10k
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import serialization, tools
+from app.main import app
+from benchmarks import synthetic
+from benchmarks.e2e import RESULTS_DIR, git_commit
+
+ENDPOINTS = ["/api/admin/cases", "/api/admin/conversations"]
+
+
+def legacy_app() -> FastAPI:
+    """The two endpoints as they were: dicts through FastAPI's default response path"""
+    legacy = FastAPI()
+
+    @legacy.get("/api/admin/cases")
+    async def get_admin_cases():
+        return {"cases": tools.get_all_cases_for_admin()}
+
+    @legacy.get("/api/admin/conversations")
+    async def get_conversations():
+        conversations = tools.get_all_conversations()
+        return {"conversations": {
+            "open": [c for c in conversations if c["status"] == "OPEN"],
+            "requires_human": [c for c in conversations if c["status"] == "REQUIRES_HUMAN"],
+            "closed": [c for c in conversations if c["status"] == "CLOSED"]
+        }}
+
+    return legacy
+
+
+def prepare_files(source_dir: str, target_dir: str, pretty: bool):
+    """Copy the dataset's storage files, rewritten in the requested layout"""
+    for name in (tools.CLAIMS_FILE, tools.CONVERSATIONS_FILE):
+        with open(os.path.join(source_dir, name), 'r') as f:
+            data = json.load(f)
+        with open(os.path.join(target_dir, name), 'w') as f:
+            json.dump(data, f, indent=2 if pretty else None, separators=None if pretty else (",", ":"))
+
+
+def measure(client: TestClient, path: str, repeat: int) -> Dict[str, Any]:
+    samples = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(path)
+        samples.append(time.perf_counter() - started)
+        response.raise_for_status()
+        size = len(response.content)
+    return {"median_ms": round(statistics.median(samples) * 1000, 2), "min_ms": round(min(samples) * 1000, 2), "bytes": size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1k,10k", help=f"comma-separated dataset sizes from {sorted(synthetic.SIZES)}")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="result JSON path (default benchmarks/results/admin-<commit>-<timestamp>.json)")
+    args = parser.parse_args()
+
+    variants = [("before", legacy_app(), "json", True), ("after (json)", app, "json", False)]
+    if serialization.orjson is not None:
+        variants.append(("after (orjson)", app, "orjson", False))
+
+    results: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    previous_cwd = os.getcwd()
+    try:
+        for size in [s.strip().lower() for s in args.sizes.split(",") if s.strip()]:
+            source_dir = synthetic.ensure_dataset(size, args.seed)
+            for variant, target_app, json_backend, pretty in variants:
+                scratch = tempfile.mkdtemp(prefix="bench-admin-")
+                try:
+                    prepare_files(source_dir, scratch, pretty)
+                    os.chdir(scratch)
+                    serialization.set_backend(json_backend)
+                    # No context manager: the lifespan warm-up is not part of this measurement
+                    client = TestClient(target_app)
+                    for path in ENDPOINTS:
+                        stats = measure(client, path, args.repeat)
+                        results.setdefault(f"{path} {size}", {})[variant] = stats
+                        print(f"  {path:<28}{size:>6}  {variant:<16}{stats['median_ms']:>10.1f} ms  {stats['bytes'] / 1e6:>8.1f} MB", flush=True)
+                finally:
+                    os.chdir(previous_cwd)
+                    shutil.rmtree(scratch, ignore_errors=True)
+    finally:
+        serialization.set_backend()
+
+    print()
+    names = [variant for variant, *_ in variants]
+    print(f"{'endpoint':<36}" + "".join(f"{name:>18}" for name in names) + f"{'speedup':>10}")
+    for key, by_variant in results.items():
+        cells = "".join(f"{by_variant[name]['median_ms']:>15.1f} ms" for name in names)
+        print(f"{key:<36}{cells}{by_variant['before']['median_ms'] / by_variant[names[-1]]['median_ms']:>9.1f}x")
+
+    output_data = {
+        "benchmark": "admin_endpoints",
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": {k: v for k, v in vars(args).items() if k != "output"},
+        "results": results
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"admin-{output_data['commit']}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(output_data, f, indent=2)
+    print(f"results: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""End-to-end latency benchmark against a local fake OpenAI server.
+
+Starts ``benchmarks.fake_openai`` and the FastAPI app (in a scratch working
+directory, so claims/conversations files start empty). It then drives
+scripted multi-turn conversations at the requested concurrency:
+
+- ``/api/conversation`` turns, with a clarification turn when one is asked for;
+- ``/api/process_claim`` and ``/api/confirm_dispatch``;
+- WebSocket fan-out from client to admin and from admin to client.
+
+Throughput and p50/p95/p99 are reported per endpoint and written as JSON
+(default ``benchmarks/results/e2e-<commit>-<timestamp>.json``), together
+with the app's LLM gateway counters and an ``-X importtime`` summary of the
+app's imports (see ``benchmarks.startup``).
+
+    cd backend && python -m benchmarks.e2e --conversations 200 --concurrency 20 --chat-latency-ms 300
+    python -m benchmarks.e2e --compare results/old.json results/new.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+import websockets
+
+from benchmarks.startup import import_time_summary, print_import_summary
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+# (problem description, answer if a clarification question is asked)
+SCENARIOS = [
+    ("I have a flat tire on the motorway", "I was on the main road driving home"),
+    ("My car won't start, the battery seems dead", "It's parked outside my house"),
+    ("I locked my keys in the car", "I was at the supermarket"),
+    ("I ran out of petrol on the A40", "Just driving to see family"),
+    ("The engine is making a loud noise and smoking", "On the high street in town"),
+    ("I got stuck in the mud on a forest trail", "Yes, I was on a dirt trail"),
+    ("The tire burst while I was doing a delivery for work", "It was a personal trip actually"),
+]
+LOCATIONS = ["Harrow Road near the shopping centre", "Outside 10 Wembley Park Drive", "A40 westbound by the petrol station"]
+MAX_TURNS = 8
+
+
+class Recorder:
+    """Latency samples and error counts per endpoint"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+
+    async def request(self, name: str, http: httpx.AsyncClient, method: str, url: str, **kwargs) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            response = await http.request(method, url, **kwargs)
+            response.raise_for_status()
+            self.samples[name].append(time.perf_counter() - started)
+            return response.json()
+        except (httpx.HTTPError, ValueError):
+            self.errors[name] += 1
+            return None
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+async def websocket_round_trip(recorder: Recorder, name: str, sender, receiver, message: Dict[str, Any], expected_type: str):
+    started = time.perf_counter()
+    try:
+        await sender.send(json.dumps(message))
+        while True:
+            received = json.loads(await asyncio.wait_for(receiver.recv(), timeout=10))
+            if received.get("type") == expected_type:
+                break
+        recorder.samples[name].append(time.perf_counter() - started)
+    except (asyncio.TimeoutError, websockets.WebSocketException):
+        recorder.errors[name] += 1
+
+
+async def run_conversation(http: httpx.AsyncClient, ws_url: str, rng: random.Random, recorder: Recorder, ws_messages: int) -> bool:
+    """One scripted customer journey; True if it completed"""
+    conversation_id = f"bench-{uuid.UUID(int=rng.getrandbits(128))}"
+    problem, clarification = rng.choice(SCENARIOS)
+    started = time.perf_counter()
+
+    state: Dict[str, Any] = {"step": 0, "collected": {}}
+    for _ in range(MAX_TURNS):
+        step = state.get("step", 0)
+        if step >= 5:
+            break
+        message = {0: "", 1: problem, 1.5: clarification, 2: "John Doe", 4: rng.choice(LOCATIONS)}.get(step, "ok")
+        result = await recorder.request("POST /api/conversation", http, "POST", "/api/conversation",
+                                        json={"message": message, "state": state, "conversation_id": conversation_id})
+        if result is None:
+            return False
+        state = result["state"]
+
+    if state.get("ready_for_dispatch"):
+        claim = await recorder.request("POST /api/process_claim", http, "POST", "/api/process_claim",
+                                       json={"conversation_state": state, "conversation_id": conversation_id})
+        if claim is None:
+            return False
+        # Confirmation does not re-verify the policy, so it is exercised even when the
+        # (date-dependent) demo policy check denies the claim
+        confirmed = await recorder.request("POST /api/confirm_dispatch", http, "POST", "/api/confirm_dispatch", json={
+            "conversation_state": state, "conversation_id": conversation_id, "help_confirmed": True, "cab_requested": rng.random() < 0.3
+        })
+        if confirmed is None:
+            return False
+
+    if ws_messages:
+        connect_started = time.perf_counter()
+        try:
+            async with websockets.connect(f"{ws_url}/ws/admin/{conversation_id}") as admin, \
+                    websockets.connect(f"{ws_url}/ws/client/{conversation_id}") as client:
+                recorder.samples["WS connect"].append((time.perf_counter() - connect_started) / 2)
+                for i in range(ws_messages):
+                    await websocket_round_trip(recorder, "WS client->admin", client, admin,
+                                               {"type": "message", "content": f"Any update? ({i})"}, "client_message")
+                    await websocket_round_trip(recorder, "WS admin->client", admin, client,
+                                               {"type": "admin_message", "content": f"On the way ({i})", "admin_user": "bench"}, "admin_message")
+        except (OSError, websockets.WebSocketException):
+            recorder.errors["WS connect"] += 1
+            return False
+
+    recorder.samples["conversation (end-to-end)"].append(time.perf_counter() - started)
+    return True
+
+
+async def drive(base_url: str, conversations: int, concurrency: int, ws_messages: int, seed: int) -> Dict[str, Any]:
+    recorder = Recorder()
+    rng = random.Random(seed)
+    seeds = [rng.getrandbits(32) for _ in range(conversations)]
+    semaphore = asyncio.Semaphore(concurrency)
+    ws_url = base_url.replace("http://", "ws://", 1)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as http:
+        async def one(conversation_seed: int) -> bool:
+            async with semaphore:
+                return await run_conversation(http, ws_url, random.Random(conversation_seed), recorder, ws_messages)
+
+        started = time.perf_counter()
+        completed = sum(await asyncio.gather(*(one(s) for s in seeds)))
+        wall = time.perf_counter() - started
+        gateway = (await http.get("/api/admin/llm_gateway")).json()
+
+    endpoints = {}
+    for name in sorted(set(recorder.samples) | set(recorder.errors)):
+        ordered = sorted(recorder.samples[name])
+        endpoints[name] = {
+            "count": len(ordered),
+            "errors": recorder.errors[name],
+            "throughput_rps": round(len(ordered) / wall, 2),
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0,
+            "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+            "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+            "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0
+        }
+    return {"wall_seconds": round(wall, 3), "conversations_completed": completed, "endpoints": endpoints, "llm_gateway": gateway}
+
+
+def start_process(args: List[str], cwd: str, env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, *args], cwd=cwd, env=env)
+
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"process exited early ({process.returncode}) before {url} was ready")
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_table(endpoints: Dict[str, Dict[str, Any]]):
+    print(f"{'endpoint':<28}{'count':>7}{'err':>5}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in endpoints.items():
+        print(f"{name:<28}{stats['count']:>7}{stats['errors']:>5}{stats['throughput_rps']:>9.1f}"
+              f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]):
+    """Print p50/p95/p99 and throughput changes between two result files"""
+    print(f"baseline {baseline.get('commit')} ({baseline.get('timestamp')}) -> current {current.get('commit')} ({current.get('timestamp')})")
+    print(f"{'endpoint':<28}{'p50 ms':>16}{'p95 ms':>16}{'p99 ms':>16}{'rps':>16}")
+
+    def delta(old: float, new: float) -> str:
+        change = f"{(new - old) / old * 100:+.0f}%" if old else "n/a"
+        return f"{new:.1f} ({change})"
+
+    for name, stats in current["endpoints"].items():
+        old = baseline["endpoints"].get(name)
+        if not old:
+            continue
+        print(f"{name:<28}{delta(old['p50_ms'], stats['p50_ms']):>16}{delta(old['p95_ms'], stats['p95_ms']):>16}"
+              f"{delta(old['p99_ms'], stats['p99_ms']):>16}{delta(old['throughput_rps'], stats['throughput_rps']):>16}")
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--ws-messages", type=int, default=2, help="client/admin WebSocket round trips per conversation (0 disables)")
+    parser.add_argument("--responses-latency-ms", type=float, default=50)
+    parser.add_argument("--chat-latency-ms", type=float, default=50)
+    parser.add_argument("--secret-latency-ms", type=float, default=20)
+    parser.add_argument("--llm-concurrency", type=int, default=32, help="LLM_MAX_CONCURRENCY for the app")
+    parser.add_argument("--log-level", default="ERROR", help="LOG_LEVEL for the app")
+    parser.add_argument("--app-port", type=int, default=8010)
+    parser.add_argument("--fake-port", type=int, default=8765)
+    parser.add_argument("--app-url", help="benchmark an already running app instead of starting one")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="result JSON path (default benchmarks/results/e2e-<commit>-<timestamp>.json)")
+    parser.add_argument("--baseline", help="result JSON to compare this run against")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="only compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(load_results(args.compare[0]), load_results(args.compare[1]))
+        return
+
+    processes: List[subprocess.Popen] = []
+    base_url = args.app_url
+    try:
+        if not base_url:
+            fake = start_process(["-m", "benchmarks.fake_openai", "--port", str(args.fake_port),
+                                  "--responses-latency-ms", str(args.responses_latency_ms),
+                                  "--chat-latency-ms", str(args.chat_latency_ms),
+                                  "--secret-latency-ms", str(args.secret_latency_ms)], BACKEND_DIR, dict(os.environ))
+            processes.append(fake)
+            wait_ready(f"http://127.0.0.1:{args.fake_port}/docs", fake)
+
+            env = {
+                **os.environ,
+                "OPENAI_API_KEY": "sk-bench",
+                "OPENAI_BASE_URL": f"http://127.0.0.1:{args.fake_port}/v1",
+                "LOG_LEVEL": args.log_level,
+                "LLM_MAX_CONCURRENCY": str(args.llm_concurrency),
+                # The benchmark measures the app, not the production rate limit
+                "LLM_RATE_PER_SEC": "100000",
+                "LLM_BURST": "100000",
+            }
+            app = start_process(["-m", "uvicorn", "app.main:app", "--app-dir", BACKEND_DIR, "--port", str(args.app_port),
+                                 "--log-level", "warning"], tempfile.mkdtemp(prefix="bench-"), env)
+            processes.append(app)
+            base_url = f"http://127.0.0.1:{args.app_port}"
+            wait_ready(f"{base_url}/ready", app)
+
+        run = asyncio.run(drive(base_url, args.conversations, args.concurrency, args.ws_messages, args.seed))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+    results = {
+        "benchmark": "e2e",
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "compare")},
+        **run,
+        "imports": import_time_summary()
+    }
+    print(f"{run['conversations_completed']}/{args.conversations} conversations in {run['wall_seconds']}s "
+          f"(concurrency {args.concurrency})")
+    print_table(run["endpoints"])
+    print_import_summary(results["imports"])
+
+    output = args.output or os.path.join(RESULTS_DIR, f"e2e-{results['commit']}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"results: {output}")
+
+    if args.baseline:
+        compare(load_results(args.baseline), results)
+
+
+if __name__ == "__main__":
+    main()
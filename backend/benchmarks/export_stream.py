@@ -0,0 +1,78 @@
+"""Peak memory and throughput of the streaming export against ``/api/admin/cases``.
+
+For each dataset size, the claims store is loaded first, so its records are
+not counted. Then, under tracemalloc:
+
+- ``admin cases``: what ``/api/admin/cases`` does, ``get_all_cases_for_admin``
+  and one JSON document;
+- ``export ndjson`` / ``export csv``: every chunk of ``export_chunks``,
+  consumed and dropped as the streaming response does.
+
+    cd backend && python -m benchmarks.export_stream --sizes 10k,100k
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict
+
+from app import export, serialization, storage, tools
+from benchmarks import synthetic
+
+
+def admin_cases() -> int:
+    return len(serialization.dumps({"cases": tools.get_all_cases_for_admin()}))
+
+
+def export_claims(export_format: str) -> Callable[[], int]:
+    def run() -> int:
+        return sum(len(chunk) for chunk in export.export_chunks("claims", export_format))
+    return run
+
+
+VARIANTS: Dict[str, Callable[[], int]] = {
+    "admin cases": admin_cases,
+    "export ndjson": export_claims("ndjson"),
+    "export csv": export_claims("csv")
+}
+
+
+def measure(fn: Callable[[], int]) -> Dict[str, Any]:
+    tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        size = fn()
+        seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"seconds": seconds, "peak_bytes": peak, "bytes": size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10k,100k", help=f"comma-separated dataset sizes from {sorted(synthetic.SIZES)}")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'size':<8}{'variant':<16}{'seconds':>10}{'output MB':>12}{'peak MB':>10}")
+    previous_cwd = os.getcwd()
+    for size in [s.strip().lower() for s in args.sizes.split(",") if s.strip()]:
+        source_dir = synthetic.ensure_dataset(size, args.seed)
+        scratch = tempfile.mkdtemp(prefix="bench-export-")
+        try:
+            shutil.copy(os.path.join(source_dir, "claims.json"), scratch)
+            os.chdir(scratch)
+            storage.claims().records()
+            for variant, fn in VARIANTS.items():
+                stats = measure(fn)
+                print(f"{size:<8}{variant:<16}{stats['seconds']:>10.2f}{stats['bytes'] / 1e6:>12.1f}{stats['peak_bytes'] / 1e6:>10.1f}", flush=True)
+        finally:
+            os.chdir(previous_cwd)
+            shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Deterministic local stand-in for the OpenAI endpoints the backend calls.
+
+Serves ``POST /v1/responses``, ``POST /v1/chat/completions`` and
+``POST /v1/realtime/client_secrets`` with a fixed, configurable latency per
+endpoint. Replies are derived from the request text only, so repeated runs see
+identical content. Usage blocks are filled in, and a system prompt seen before
+is reported as cached, which exercises the prompt token tracking.
+
+    cd backend && python -m benchmarks.fake_openai --port 8765 --chat-latency-ms 300
+
+Point the app at it with ``OPENAI_BASE_URL=http://127.0.0.1:8765/v1``.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from typing import Any, Dict, List
+
+import uvicorn
+from fastapi import Body, FastAPI
+
+# Keyword -> problem type, mirroring the categories the analysis prompt asks for
+PROBLEM_KEYWORDS = [
+    ("flat", "flat tire"), ("tire", "flat tire"), ("puncture", "flat tire"),
+    ("battery", "dead battery"), ("start", "dead battery"),
+    ("key", "lockout"), ("locked", "lockout"),
+    ("fuel", "out of fuel"), ("petrol", "out of fuel"), ("gas", "out of fuel"),
+    ("engine", "engine trouble"), ("smoke", "engine trouble"), ("noise", "engine trouble"),
+]
+EXCLUSION_KEYWORDS = [
+    ("trail", "off_road_use"), ("mud", "off_road_use"), ("beach", "off_road_use"),
+    ("delivery", "commercial_use"), ("work", "commercial_use"),
+    ("race", "racing_events"), ("track", "racing_events"),
+]
+SERVICES = {"flat tire": "tire_change", "dead battery": "jump_start", "lockout": "lockout_service",
+            "out of fuel": "fuel_delivery", "engine trouble": "tow_truck"}
+# Providers only cache prompt prefixes from this size up
+MIN_CACHED_TOKENS = 1024
+CACHE_BLOCK_TOKENS = 128
+
+
+class FakeSettings:
+    responses_latency = 0.0
+    chat_latency = 0.0
+    secret_latency = 0.0
+
+
+settings = FakeSettings()
+app = FastAPI(title="Fake OpenAI")
+_ids = itertools.count(1)
+_seen_prefixes = set()
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _cached_tokens(prefix: str) -> int:
+    """Tokens a provider would serve from its prefix cache for this static prefix"""
+    tokens = _tokens(prefix)
+    if prefix not in _seen_prefixes:
+        _seen_prefixes.add(prefix)
+        return 0
+    return tokens // CACHE_BLOCK_TOKENS * CACHE_BLOCK_TOKENS if tokens >= MIN_CACHED_TOKENS else 0
+
+
+def problem_analysis(text: str) -> Dict[str, Any]:
+    lowered = text.lower()
+    problem_type = next((label for word, label in PROBLEM_KEYWORDS if word in lowered), "general roadside assistance")
+    exclusions = sorted({label for word, label in EXCLUSION_KEYWORDS if word in lowered})
+    if exclusions:
+        return {
+            "problem_type": problem_type,
+            "needs_clarification": True,
+            "clarification_questions": ["Could you tell me a bit more about where this happened?"],
+            "potential_exclusions": exclusions,
+            "is_covered": None,
+            "coverage_reason": "Clarification needed about the circumstances",
+            "suggested_service": None
+        }
+    return {
+        "problem_type": problem_type,
+        "needs_clarification": False,
+        "clarification_questions": None,
+        "potential_exclusions": None,
+        "is_covered": True,
+        "coverage_reason": f"{problem_type.capitalize()} is covered under roadside assistance",
+        "suggested_service": SERVICES.get(problem_type, "repair_truck")
+    }
+
+
+def clarification_analysis(text: str) -> Dict[str, Any]:
+    response = text.lower().rsplit("customer response:", 1)[-1]
+    applicable = sorted({label for word, label in EXCLUSION_KEYWORDS if word in response})
+    return {
+        "exclusions_apply": bool(applicable),
+        "applicable_exclusions": applicable,
+        "is_covered": not applicable,
+        "coverage_reason": "Excluded activity" if applicable else "Covered under the policy",
+        "confidence": 0.9
+    }
+
+
+def chat_reply(messages: List[Dict[str, Any]]) -> str:
+    system = "\n".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    user = "\n".join(m.get("content", "") for m in messages if m.get("role") == "user")
+    if "numbered list" in system:
+        items = [line.split(". ", 1)[-1] for line in user.splitlines()[1:] if line.strip()]
+        return json.dumps([problem_analysis(item) for item in items])
+    if "clarification response" in system:
+        return json.dumps(clarification_analysis(user))
+    return json.dumps(problem_analysis(user))
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(payload: Dict[str, Any] = Body(...)):
+    await asyncio.sleep(settings.chat_latency)
+    messages = payload.get("messages", [])
+    content = chat_reply(messages)
+    system = "".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    prompt_tokens = _tokens("".join(m.get("content", "") for m in messages))
+    completion_tokens = _tokens(content)
+    return {
+        "id": f"chatcmpl-fake-{next(_ids)}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": payload.get("model", "fake"),
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": _cached_tokens(system)}
+        }
+    }
+
+
+@app.post("/v1/responses")
+async def responses(payload: Dict[str, Any] = Body(...)):
+    await asyncio.sleep(settings.responses_latency)
+    instructions = payload.get("instructions") or ""
+    text = "Thank you, I understand. Could you tell me a little more so I can help?"
+    input_tokens = _tokens(instructions + str(payload.get("input", "")))
+    # The per-turn state sits after the static instructions; only the static part is cacheable
+    static_prefix = instructions.split("\n\nCURRENT SITUATION:", 1)[0]
+    return {
+        "id": f"resp_fake_{next(_ids)}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "status": "completed",
+        "model": payload.get("model", "fake"),
+        "output": [{
+            "type": "message",
+            "id": f"msg_fake_{next(_ids)}",
+            "status": "completed",
+            "role": "assistant",
+            "content": [{"type": "output_text", "text": text, "annotations": []}]
+        }],
+        "usage": {
+            "input_tokens": input_tokens,
+            "output_tokens": _tokens(text),
+            "total_tokens": input_tokens + _tokens(text),
+            "input_tokens_details": {"cached_tokens": _cached_tokens(static_prefix)}
+        }
+    }
+
+
+@app.post("/v1/realtime/client_secrets")
+async def client_secrets(payload: Dict[str, Any] = Body(default={})):
+    await asyncio.sleep(settings.secret_latency)
+    return {"value": f"ek_fake_{next(_ids)}", "expires_at": int(time.time()) + 600, "session": payload.get("session", {})}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic fake OpenAI server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--responses-latency-ms", type=float, default=0)
+    parser.add_argument("--chat-latency-ms", type=float, default=0)
+    parser.add_argument("--secret-latency-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    settings.responses_latency = args.responses_latency_ms / 1000
+    settings.chat_latency = args.chat_latency_ms / 1000
+    settings.secret_latency = args.secret_latency_ms / 1000
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
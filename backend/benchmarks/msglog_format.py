@@ -0,0 +1,122 @@
+"""Size and parse time of conversations.json against the binary message log.
+
+For pretty-printed JSON (the original storage format), compact JSON (the
+current one) and a message log per available codec, reports:
+
+- file size;
+- full parse (``json.load`` / ``MessageLogReader.read_all``);
+- opening the log (mmap plus index load);
+- looking up one conversation's messages. JSON has to parse the whole file
+  and scan it; the log decodes one block.
+
+    cd backend && python -m benchmarks.msglog_format --size 100k
+    python -m benchmarks.msglog_format --source conversations.json
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from app import msglog
+from benchmarks import synthetic
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> float:
+    """Median seconds over repeat calls"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def json_lookup(path: str, conversation_id: str):
+    with open(path, 'r') as f:
+        conversations = json.load(f)
+    return next((c["messages"] for c in conversations if c.get("conversation_id") == conversation_id), None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", help="conversations JSON file (default: a synthetic dataset)")
+    parser.add_argument("--size", choices=sorted(synthetic.SIZES), default="1k", help="synthetic dataset size")
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions of whole-file operations")
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    source = args.source or os.path.join(synthetic.ensure_dataset(args.size, args.seed), "conversations.json")
+    with open(source, 'r') as f:
+        conversations = json.load(f)
+    ids = [c.get("conversation_id") for c in conversations if isinstance(c.get("messages"), list)]
+    rng = random.Random(args.seed)
+    lookup_ids = [rng.choice(ids) for _ in range(args.lookups)]
+    messages = sum(len(c.get("messages") or []) for c in conversations)
+    print(f"{source}: {len(conversations):,} conversations, {messages:,} messages")
+
+    scratch = tempfile.mkdtemp(prefix="bench-msglog-")
+    rows: List[Dict[str, Any]] = []
+    try:
+        pretty = os.path.join(scratch, "pretty.json")
+        with open(pretty, 'w') as f:
+            json.dump(conversations, f, indent=2)
+        compact = os.path.join(scratch, "compact.json")
+        with open(compact, 'w') as f:
+            json.dump(conversations, f, separators=(",", ":"))
+        for name, path in (("json (indent=2)", pretty), ("json (compact)", compact)):
+            def load(path=path):
+                with open(path, 'r') as f:
+                    return json.load(f)
+            rows.append({
+                "format": name,
+                "bytes": os.path.getsize(path),
+                "full_parse_s": timed(load, args.repeat),
+                "open_s": None,
+                # Each lookup re-reads the file, as tools.py does
+                "lookup_us": timed(lambda path=path: json_lookup(path, lookup_ids[0]), args.repeat) * 1e6
+            })
+
+        codecs = ["none", "zlib"] + (["zstd"] if msglog.zstandard is not None else [])
+        for codec in codecs:
+            path = os.path.join(scratch, f"conversations.{codec}.msglog")
+            started = time.perf_counter()
+            msglog.write_message_log(path, conversations, codec)
+            convert_s = time.perf_counter() - started
+
+            def read_all(path=path):
+                with msglog.MessageLogReader(path) as reader:
+                    return reader.read_all()
+
+            with msglog.MessageLogReader(path) as reader:
+                assert reader.read_all() == conversations, f"{codec} log does not round-trip"
+                started = time.perf_counter()
+                for conversation_id in lookup_ids:
+                    reader.messages(conversation_id)
+                lookup_us = (time.perf_counter() - started) / len(lookup_ids) * 1e6
+            rows.append({
+                "format": f"msglog ({codec})",
+                "bytes": os.path.getsize(path),
+                "full_parse_s": timed(read_all, args.repeat),
+                "open_s": timed(lambda path=path: msglog.MessageLogReader(path).close(), args.repeat),
+                "lookup_us": lookup_us,
+                "convert_s": convert_s
+            })
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print(f"{'format':<20}{'size MB':>10}{'vs json':>9}{'full parse s':>14}{'open ms':>10}{'lookup us':>14}")
+    baseline = rows[0]["bytes"]
+    for row in rows:
+        open_ms = f"{row['open_s'] * 1000:.2f}" if row["open_s"] is not None else "-"
+        print(f"{row['format']:<20}{row['bytes'] / 1e6:>10.2f}{row['bytes'] / baseline:>8.0%}"
+              f"{row['full_parse_s']:>14.3f}{open_ms:>10}{row['lookup_us']:>14,.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Memory held per claim and per message: parsed dicts against ``app.records``.
+
+For each record kind and representation a child process parses synthetic
+records from JSON in chunks, as the stores load them, and keeps them all.
+The memory they hold is divided by the record count. It is measured with
+tracemalloc (live Python allocations), or with ``--method rss`` as the growth
+of the resident set size, which also counts allocator fragmentation. Messages
+are measured on their own, flattened out of synthetic conversations.
+
+    cd backend && python -m benchmarks.records_memory               # 1M of each
+    python -m benchmarks.records_memory --count 100000 --method rss
+"""
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, Iterator
+
+from app import serialization
+from app.records import Claim, Message
+from benchmarks import synthetic
+from benchmarks.e2e import RESULTS_DIR, git_commit
+
+KINDS = {"claims": Claim, "messages": Message}
+REPRESENTATIONS = ["dicts", "records"]
+CHUNK = 10_000
+METHODS = ["tracemalloc", "rss"]
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process (Linux)"""
+    with open("/proc/self/statm", 'r') as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def memory_in_use(method: str) -> int:
+    return tracemalloc.get_traced_memory()[0] if method == "tracemalloc" else rss_bytes()
+
+
+def source_records(kind: str, count: int, seed: int) -> Iterator[Dict[str, Any]]:
+    if kind == "claims":
+        return synthetic.generate_claims(count, seed)
+    conversations = synthetic.generate_conversations(count, seed)
+    return itertools.islice((message for conversation in conversations for message in conversation["messages"]), count)
+
+
+def measure_child(kind: str, representation: str, count: int, seed: int, method: str) -> Dict[str, Any]:
+    """Hold count records in this process and report the memory they take"""
+    if method == "tracemalloc":
+        tracemalloc.start()
+    convert = KINDS[kind].from_dict if representation == "records" else None
+    held = []
+    raw_bytes = 0
+    gc.collect()
+    baseline = memory_in_use(method)
+    source = source_records(kind, count, seed)
+    while True:
+        chunk = list(itertools.islice(source, CHUNK))
+        if not chunk:
+            break
+        encoded = serialization.dumps(chunk)
+        raw_bytes += len(encoded) - 2 - (len(chunk) - 1)
+        parsed = serialization.loads(encoded)
+        held.extend(map(convert, parsed) if convert else parsed)
+        del chunk, encoded, parsed
+    gc.collect()
+    held_bytes = memory_in_use(method) - baseline
+    return {"count": len(held), "bytes": held_bytes, "raw_json_bytes": raw_bytes}
+
+
+def run_child(kind: str, representation: str, count: int, seed: int, method: str) -> Dict[str, Any]:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.records_memory", "--child", kind, representation,
+         "--count", str(count), "--seed", str(seed), "--method", method],
+        check=True, capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000, help="records of each kind")
+    parser.add_argument("--kinds", default=",".join(KINDS), help=f"comma-separated from {list(KINDS)}")
+    parser.add_argument("--method", choices=METHODS, default="tracemalloc")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="result JSON path (default benchmarks/results/records-memory-<commit>-<timestamp>.json)")
+    parser.add_argument("--child", nargs=2, metavar=("KIND", "REPRESENTATION"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure_child(args.child[0], args.child[1], args.count, args.seed, args.method)))
+        return
+
+    results: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for kind in [k.strip() for k in args.kinds.split(",") if k.strip()]:
+        for representation in REPRESENTATIONS:
+            stats = run_child(kind, representation, args.count, args.seed, args.method)
+            stats["bytes_per_record"] = round(stats["bytes"] / stats["count"], 1)
+            stats["raw_json_bytes_per_record"] = round(stats["raw_json_bytes"] / stats["count"], 1)
+            results.setdefault(kind, {})[representation] = stats
+            print(f"  {kind:<10}{representation:<10}{stats['count']:>12,}{stats['bytes'] / 1e6:>12.1f} MB", flush=True)
+
+    print()
+    print(f"{'kind':<12}{'json B/rec':>12}" + "".join(f"{name + ' B/rec':>16}" for name in REPRESENTATIONS) + f"{'saved':>8}")
+    for kind, by_representation in results.items():
+        dicts, records = by_representation["dicts"], by_representation["records"]
+        cells = "".join(f"{by_representation[name]['bytes_per_record']:>16,.1f}" for name in REPRESENTATIONS)
+        print(f"{kind:<12}{dicts['raw_json_bytes_per_record']:>12,.1f}{cells}{1 - records['bytes'] / dicts['bytes']:>8.0%}")
+
+    output_data = {
+        "benchmark": "records_memory",
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "child")},
+        "results": results
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"records-memory-{output_data['commit']}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(output_data, f, indent=2)
+    print(f"results: {output}")
+
+
+if __name__ == "__main__":
+    main()
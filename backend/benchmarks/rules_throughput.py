@@ -0,0 +1,77 @@
+"""Throughput of the rule-based fallbacks in messages/sec.
+
+Compares the compiled rule engine against the previous per-call
+``any(word in text ...)`` keyword scans.
+
+    cd backend && python -m benchmarks.rules_throughput --messages 50000
+"""
+import argparse
+import random
+import time
+
+from app import rules, tools
+
+SAMPLE_MESSAGES = [
+    "Hi, I have a flat tire on the motorway",
+    "My car won't start, I think the battery is dead",
+    "I locked my keys in the car outside the supermarket",
+    "I ran out of petrol on the way home",
+    "The engine made a loud noise and now it's broken down",
+    "I was driving on a dirt trail in the forest and got stuck in the mud",
+    "I was doing a delivery for work when the tire burst",
+    "We were at the track for a racing event",
+    "Can I please speak to someone, this is not working",
+    "I'm on Harrow Road near the main shopping area",
+    "Yes, send help (no cab needed)",
+    "John Doe",
+]
+
+
+def legacy_scan(text: str) -> bool:
+    """The previous implementation: one substring scan per keyword list"""
+    text = text.lower()
+    lists = [
+        ["trail", "dirt", "mud", "forest", "mountain", "desert", "beach", "sand", "creek", "river"],
+        ["delivery", "work", "business", "commercial", "company", "job"],
+        ["race", "track", "event", "competition", "racing", "speed"],
+        ["flat", "tire", "puncture", "wheel"],
+        ["battery", "dead", "won't start", "wont start", "no start"],
+        ["locked", "keys", "lock"],
+        ["fuel", "gas", "petrol", "empty"],
+        ["engine", "breakdown", "broken", "tow"],
+        ["human", "person", "speak to someone", "talk to someone",
+         "representative", "agent", "operator", "help me",
+         "customer service", "supervisor", "manager", "real person",
+         "not working", "frustrated", "unhappy", "complaint"],
+    ]
+    return any([any(word in text for word in words) for words in lists])
+
+
+def measure(fn, messages) -> float:
+    start = time.perf_counter()
+    for message in messages:
+        fn(message)
+    return len(messages) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    messages = [random.choice(SAMPLE_MESSAGES) for _ in range(args.messages)]
+
+    def full_pass(message):
+        tools.fallback_problem_analysis(message)
+        tools.detect_human_handoff_request(message)
+
+    print(f"messages: {len(messages)}")
+    print(f"legacy keyword scans:      {measure(legacy_scan, messages):>12,.0f} msg/s")
+    print(f"compiled match_rules:      {measure(rules.match_rules, messages):>12,.0f} msg/s")
+    print(f"fallback analysis+handoff: {measure(full_pass, messages):>12,.0f} msg/s")
+
+
+if __name__ == "__main__":
+    main()
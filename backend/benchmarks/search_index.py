@@ -0,0 +1,87 @@
+"""Build time, size and query latency of the conversation search index.
+
+For each dataset size, the conversations store is loaded into a scratch
+directory and the index built from it (``search.refresh``, as at startup).
+Then each query runs ``--rounds`` times through ``SearchIndex.search`` and
+its p50/p95 latency is printed, along with the cost of indexing one message
+through ``add_message_to_conversation``.
+
+    cd backend && python -m benchmarks.search_index --sizes 10k,100k
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from app import search, storage, tools
+from benchmarks import synthetic
+
+QUERIES: Dict[str, Dict[str, object]] = {
+    "customer name": {"q": "Priya Smith"},
+    "problem type": {"q": "flat tire"},
+    "common words": {"q": "battery dead"},
+    "phrase": {"q": '"on the way"'},
+    "deep page": {"q": "help", "offset": 5000},
+    "no match": {"q": "zebracorn"}
+}
+
+
+def percentiles(fn: Callable[[], object], rounds: int) -> List[float]:
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return [statistics.median(timings), timings[min(len(timings) - 1, int(len(timings) * 0.95))]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10k,100k", help=f"comma-separated dataset sizes from {sorted(synthetic.SIZES)}")
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    previous_cwd = os.getcwd()
+    for size in [s.strip().lower() for s in args.sizes.split(",") if s.strip()]:
+        source_dir = synthetic.ensure_dataset(size, args.seed)
+        scratch = tempfile.mkdtemp(prefix="bench-search-")
+        try:
+            shutil.copy(os.path.join(source_dir, "conversations.json"), scratch)
+            os.chdir(scratch)
+            records = storage.conversations().records()
+            messages = sum(len(conversation.messages) for conversation in records)
+            started = time.perf_counter()
+            search.refresh()
+            build_seconds = time.perf_counter() - started
+            index = search.get_index()
+            index.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            index_mb = os.path.getsize(index.path) / 1e6
+            print(f"{size}: {len(records)} conversations, {messages} messages, "
+                  f"built in {build_seconds:.1f} s, index {index_mb:.1f} MB")
+
+            print(f"  {'query':<16}{'matches':>10}{'p50 ms':>10}{'p95 ms':>10}")
+            for name, params in QUERIES.items():
+                result = index.search(params["q"], offset=params.get("offset", 0))
+                p50, p95 = percentiles(lambda: index.search(params["q"], offset=params.get("offset", 0)), args.rounds)
+                total = f"{result['total']}{'' if result['total_is_exact'] else '+'}"
+                print(f"  {name:<16}{total:>10}{p50:>10.2f}{p95:>10.2f}", flush=True)
+
+            conversation_id = records[len(records) // 2].conversation_id
+            p50, p95 = percentiles(
+                lambda: tools.add_message_to_conversation(conversation_id, "user", "benchmark message", "Benchmark"),
+                min(args.rounds, 20)
+            )
+            print(f"  {'add message':<16}{'':>10}{p50:>10.2f}{p95:>10.2f}", flush=True)
+            index.close()
+        finally:
+            os.chdir(previous_cwd)
+            shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Cold-start cost of the app: import time and time until live/ready.
+
+- Import time comes from ``python -X importtime -c "import app.main"``. It is
+  summarised as the total plus self time grouped by top-level package, so a
+  dependency that creeps back onto the import path stands out.
+- Start-up time spawns uvicorn and records how long after the process starts
+  ``/health`` (live) and ``/ready`` (warm-up finished) first answer 200.
+
+Medians over ``--runs``. ``benchmarks.e2e`` includes the import summary in its
+results.
+
+    cd backend && python -m benchmarks.startup --runs 5
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def parse_importtime(output: str, module: str) -> Dict[str, Any]:
+    """Total microseconds for module and self time per top-level package"""
+    total = 0
+    by_package: Dict[str, int] = defaultdict(int)
+    for line in output.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, name = int(match.group(1)), int(match.group(2)), match.group(4)
+        if name == module:
+            total = cumulative_us
+        by_package[name.split(".")[0]] += self_us
+    return {"total_us": total, "by_package": dict(by_package)}
+
+
+def import_time_summary(module: str = "app.main", runs: int = 3, top: int = 10) -> Dict[str, Any]:
+    """Median import time of module and its most expensive packages, in ms"""
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=BACKEND_DIR,
+                                capture_output=True, text=True, env={**os.environ, "LOG_LEVEL": "ERROR"})
+        if result.returncode != 0:
+            raise RuntimeError(f"importing {module} failed:\n{result.stderr[-2000:]}")
+        samples.append(parse_importtime(result.stderr, module))
+
+    packages = {name for sample in samples for name in sample["by_package"]} - {module.split(".")[0]}
+    by_package = {name: statistics.median(s["by_package"].get(name, 0) for s in samples) / 1000 for name in packages}
+    ranked = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "module": module,
+        "runs": runs,
+        "total_ms": round(statistics.median(s["total_us"] for s in samples) / 1000, 1),
+        "top_packages_ms": {name: round(ms, 1) for name, ms in ranked}
+    }
+
+
+def time_to_ready(port: int, timeout: float = 30) -> Dict[str, Optional[float]]:
+    """Seconds from spawning uvicorn until /health and /ready first return 200"""
+    env = {**os.environ, "LOG_LEVEL": "ERROR"}
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--app-dir", BACKEND_DIR,
+                                "--port", str(port), "--log-level", "warning"], cwd=tempfile.mkdtemp(prefix="bench-"), env=env)
+    timings: Dict[str, Optional[float]] = {"health": None, "ready": None}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1) as http:
+            while time.perf_counter() - started < timeout and timings["ready"] is None:
+                if process.poll() is not None:
+                    raise RuntimeError(f"app exited early ({process.returncode})")
+                for name in ("health", "ready"):
+                    if timings[name] is not None:
+                        continue
+                    try:
+                        if http.get(f"/{name}").status_code == 200:
+                            timings[name] = round(time.perf_counter() - started, 3)
+                    except httpx.HTTPError:
+                        break
+                time.sleep(0.005)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return timings
+
+
+def print_import_summary(summary: Dict[str, Any]):
+    print(f"import {summary['module']}: {summary['total_ms']:.1f} ms (median of {summary['runs']})")
+    for name, ms in summary["top_packages_ms"].items():
+        print(f"  {name:<24}{ms:>8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    summary = import_time_summary(args.module, args.runs)
+    print_import_summary(summary)
+
+    starts: List[Dict[str, Optional[float]]] = [time_to_ready(args.port) for _ in range(args.runs)]
+    startup = {}
+    for name in ("health", "ready"):
+        values = [s[name] for s in starts if s[name] is not None]
+        startup[f"{name}_seconds"] = round(statistics.median(values), 3) if values else None
+    print(f"process start -> /health 200: {startup['health_seconds']} s, -> /ready 200: {startup['ready_seconds']} s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"imports": summary, "startup": startup}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
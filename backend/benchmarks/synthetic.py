@@ -0,0 +1,209 @@
+"""Synthetic claims, conversations and service providers for benchmarks.
+
+Records have the same shape as the ones the app writes (``create_claim``,
+``create_conversation_entry``/``add_message_to_conversation``,
+``SERVICE_PROVIDERS``). Generation is seeded, and records are streamed to disk
+one at a time, so the 1M datasets do not have to fit in memory as Python
+objects.
+
+    cd backend && python -m benchmarks.synthetic --size 100k --out benchmarks/data/100k
+    python -m benchmarks.synthetic --claims 5000 --conversations 200 --providers 50 --out /tmp/data
+
+Writes ``claims.json``, ``conversations.json`` and ``providers.json`` into
+``--out``.
+"""
+import argparse
+import json
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+# Bumped when the on-disk layout changes, so cached datasets are regenerated
+DATASET_FORMAT = 2
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+FIRST_NAMES = ["John", "Jane", "Amir", "Priya", "Tom", "Olivia", "Chen", "Sofia", "Liam", "Fatima"]
+LAST_NAMES = ["Doe", "Smith", "Khan", "Patel", "Brown", "Jones", "Wang", "Garcia", "Murphy", "Ali"]
+PROBLEM_TYPES = ["flat tire", "battery issue", "lockout", "out of fuel", "engine trouble", "accident"]
+STATUS_FLOW = ["OPEN", "DISPATCHED", "RESOLVED"]
+USER_MESSAGES = [
+    "Hi, I have a flat tire on the motorway",
+    "My car won't start, I think the battery is dead",
+    "I locked my keys in the car outside the supermarket",
+    "I ran out of petrol on the way home",
+    "The engine made a loud noise and now it's broken down",
+    "I was driving on a dirt trail and got stuck in the mud",
+    "Can I please speak to someone, this is not working",
+    "I'm on Harrow Road near the main shopping area",
+    "Yes, send help",
+]
+AGENT_MESSAGES = [
+    "I'm sorry to hear that. Let me check your coverage.",
+    "Could you confirm your full name as it appears on your policy?",
+    "Thanks. Where are you right now?",
+    "Help is on the way.",
+]
+# Providers are spread around the demo customer location in north-west London
+CENTER_LAT, CENTER_LON, SPREAD = 51.554257, -0.293532, 0.5
+BASE_TIME = datetime(2025, 1, 1)
+
+_ID_NAMESPACE = uuid.UUID("6f1c1a52-3c4e-4f54-9a53-0b1f3d1e6a00")
+
+
+def claim_id(index: int) -> str:
+    """Deterministic id of the index-th generated claim"""
+    return str(uuid.uuid5(_ID_NAMESPACE, f"claim-{index}"))
+
+
+def conversation_id(index: int) -> str:
+    """Deterministic id of the index-th generated conversation"""
+    return f"conv_synth_{index:07d}"
+
+
+def generate_claims(count: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    rng = random.Random(seed)
+    for i in range(count):
+        created = BASE_TIME + timedelta(seconds=i * 37)
+        problem_type = rng.choice(PROBLEM_TYPES)
+        steps = rng.randint(1, len(STATUS_FLOW))
+        history = [{
+            "timestamp": created.isoformat(),
+            "status": "OPEN",
+            "details": f"Claim created for {problem_type}"
+        }]
+        if steps > 1:
+            history.append({
+                "timestamp": (created + timedelta(seconds=2)).isoformat(),
+                "status": "DISPATCHED",
+                "details": {"provider": f"Provider {rng.randrange(1000)}", "eta_minutes": rng.randint(15, 90), "service_type": rng.choice(["tow_truck", "repair_truck"])}
+            })
+        if steps > 2:
+            history.append({
+                "timestamp": (created + timedelta(minutes=rng.randint(20, 120))).isoformat(),
+                "status": "RESOLVED",
+                "details": {"resolution": "Service provider arrived and assisted customer"}
+            })
+        yield {
+            "claim_id": claim_id(i),
+            "policy_holder": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "policy_number": f"XYZ-{rng.randrange(100000):05d}",
+            "problem_type": problem_type,
+            "status": STATUS_FLOW[steps - 1],
+            "created_at": created.isoformat(),
+            "history": history
+        }
+
+
+def generate_conversations(count: int, seed: int = 0, max_messages: int = 12) -> Iterator[Dict[str, Any]]:
+    rng = random.Random(seed + 1)
+    for i in range(count):
+        created = BASE_TIME + timedelta(seconds=i * 41)
+        customer_name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        messages = []
+        for m in range(rng.randint(2, max_messages)):
+            is_user = m % 2 == 0
+            messages.append({
+                "timestamp": (created + timedelta(seconds=m * 15)).isoformat(),
+                "type": "user" if is_user else "agent",
+                "content": rng.choice(USER_MESSAGES if is_user else AGENT_MESSAGES),
+                "sender": customer_name if is_user else "AI Agent"
+            })
+        requires_human = rng.random() < 0.05
+        yield {
+            "conversation_id": conversation_id(i),
+            "customer_name": customer_name,
+            "problem_type": rng.choice(PROBLEM_TYPES),
+            "status": "REQUIRES_HUMAN" if requires_human else rng.choice(["OPEN", "CLOSED"]),
+            "created_at": created.isoformat(),
+            "last_updated": messages[-1]["timestamp"],
+            "messages": messages,
+            "requires_human": requires_human,
+            "admin_user": None,
+            "is_active": True
+        }
+
+
+def generate_providers(count: int, seed: int = 0) -> Dict[str, Any]:
+    """A ``SERVICE_PROVIDERS``-shaped dict with count trucks and count/20 garages"""
+    rng = random.Random(seed + 2)
+
+    def point() -> Dict[str, float]:
+        return {"lat": round(CENTER_LAT + rng.uniform(-SPREAD, SPREAD), 6), "lon": round(CENTER_LON + rng.uniform(-SPREAD, SPREAD), 6)}
+
+    return {
+        "repair_trucks": [{"name": f"Provider {i}", **point(), "type": rng.choice(["repair_truck", "tow_truck"])} for i in range(count)],
+        "garages": [{"name": f"Garage {i}", **point()} for i in range(max(1, count // 20))]
+    }
+
+
+def write_json_array(path: str, records: Iterable[Dict[str, Any]]) -> int:
+    """Stream records into a compact JSON array, as the app's storage files are written"""
+    written = 0
+    with open(path, 'w') as f:
+        f.write("[")
+        for record in records:
+            if written:
+                f.write(",")
+            f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+            written += 1
+        f.write("]")
+    return written
+
+
+def generate_dataset(out_dir: str, claims: int, conversations: int, providers: int, seed: int = 0) -> Dict[str, Any]:
+    """Write the three dataset files into out_dir and return a manifest"""
+    os.makedirs(out_dir, exist_ok=True)
+    write_json_array(os.path.join(out_dir, "claims.json"), generate_claims(claims, seed))
+    write_json_array(os.path.join(out_dir, "conversations.json"), generate_conversations(conversations, seed))
+    with open(os.path.join(out_dir, "providers.json"), 'w') as f:
+        json.dump(generate_providers(providers, seed), f)
+    manifest = {"claims": claims, "conversations": conversations, "providers": providers, "seed": seed, "format": DATASET_FORMAT}
+    with open(os.path.join(out_dir, "manifest.json"), 'w') as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def ensure_dataset(size: str, seed: int = 0, data_dir: str = DATA_DIR) -> str:
+    """Directory holding the named dataset, generating it on first use"""
+    count = SIZES[size]
+    out_dir = os.path.join(data_dir, size)
+    expected = {"claims": count, "conversations": count, "providers": count, "seed": seed, "format": DATASET_FORMAT}
+    try:
+        with open(os.path.join(out_dir, "manifest.json"), 'r') as f:
+            if json.load(f) == expected:
+                return out_dir
+    except (OSError, ValueError):
+        pass
+    generate_dataset(out_dir, count, count, count, seed)
+    return out_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", choices=sorted(SIZES), help="same count of claims, conversations and providers")
+    parser.add_argument("--claims", type=int)
+    parser.add_argument("--conversations", type=int)
+    parser.add_argument("--providers", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="output directory (default benchmarks/data/<size>)")
+    args = parser.parse_args()
+
+    default = SIZES[args.size] if args.size else 1_000
+    counts = {name: getattr(args, name) if getattr(args, name) is not None else default
+              for name in ("claims", "conversations", "providers")}
+    out_dir = args.out or os.path.join(DATA_DIR, args.size or "custom")
+
+    started = time.perf_counter()
+    generate_dataset(out_dir, counts["claims"], counts["conversations"], counts["providers"], args.seed)
+    sizes = {name: os.path.getsize(os.path.join(out_dir, name)) for name in ("claims.json", "conversations.json", "providers.json")}
+    print(f"wrote {out_dir} in {time.perf_counter() - started:.1f}s")
+    for name, size in sizes.items():
+        print(f"  {name:<20}{size / 1e6:>10.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
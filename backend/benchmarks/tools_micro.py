@@ -0,0 +1,265 @@
+"""Micro-benchmarks for the hot functions in ``app.tools`` on synthetic datasets.
+
+Each function is timed in rounds, in the way pytest-benchmark does it. A
+round repeats the call enough times to last at least ``ROUND_TIME``. Rounds
+continue until ``--max-time`` has passed and ``--min-rounds`` are done. A
+function slower than ``--max-time`` gets a single round. Reported: min, mean,
+median, stddev and ops/sec.
+
+Functions that read the storage files, or the provider list, are measured
+against the 1k, 100k and 1M datasets from ``benchmarks.synthetic``
+(generated into ``benchmarks/data`` on first use). This shows how the JSON
+file design scales. Per-message functions do not depend on the dataset size
+and are measured once.
+
+    cd backend && python -m benchmarks.tools_micro --sizes 1k,100k
+    python -m benchmarks.tools_micro --sizes 1m --only update_claim,add_message_to_conversation
+    python -m benchmarks.tools_micro --compare results/old.json results/new.json
+
+At 1M the claims file is about 0.6 GB of JSON and the conversations file about
+1.6 GB. Parsing either one takes several GB of memory.
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple
+
+from app import catalog, tools
+from benchmarks import synthetic
+from benchmarks.e2e import RESULTS_DIR, git_commit, load_results
+
+# Fast calls are repeated so one round lasts at least this long (timer resolution)
+ROUND_TIME = 0.005
+BULK_MESSAGES = 50
+
+
+class Dataset(NamedTuple):
+    size: str
+    count: int
+    directory: str
+    providers: Dict[str, Any]
+    messages: List[str]
+
+
+class Benchmark(NamedTuple):
+    name: str
+    scales: bool
+    prepare: Callable[[Dataset], Callable[[], Any]]
+
+
+def _calculate_distance(data: Dataset) -> Callable[[], Any]:
+    points = itertools.cycle([(p["lat"], p["lon"]) for p in data.providers["repair_trucks"][:1000]])
+    customer = tools.CUSTOMER_LOCATION
+    return lambda: tools.calculate_distance(customer["lat"], customer["lon"], *next(points))
+
+
+def _dispatch_logistics_agent(data: Dataset) -> Callable[[], Any]:
+    problem_types = itertools.cycle(["flat tire", "lockout", "engine trouble"])
+    return lambda: tools.dispatch_logistics_agent(next(problem_types), tools.CUSTOMER_LOCATION)
+
+
+def _fallback_problem_analysis(data: Dataset) -> Callable[[], Any]:
+    messages = itertools.cycle(data.messages)
+    return lambda: tools.fallback_problem_analysis(next(messages))
+
+
+def _detect_human_handoff_request(data: Dataset) -> Callable[[], Any]:
+    messages = itertools.cycle(data.messages)
+    return lambda: tools.detect_human_handoff_request(next(messages))
+
+
+def _add_message_to_conversation(data: Dataset) -> Callable[[], Any]:
+    # Middle of the file: the average position for the linear lookup
+    target = synthetic.conversation_id(data.count // 2)
+    return lambda: tools.add_message_to_conversation(target, "user", "Any update on the truck?")
+
+
+def _add_messages_to_conversations(data: Dataset) -> Callable[[], Any]:
+    # One bulk call: 50 messages over 10 conversations around the middle of the file
+    batch = [
+        {"conversation_id": synthetic.conversation_id(data.count // 2 + i % 10), "message_type": "user", "content": "Any update on the truck?"}
+        for i in range(BULK_MESSAGES)
+    ]
+    return lambda: tools.add_messages_to_conversations(batch)
+
+
+def _get_all_cases_for_admin(data: Dataset) -> Callable[[], Any]:
+    return tools.get_all_cases_for_admin
+
+
+def _update_claim(data: Dataset) -> Callable[[], Any]:
+    target = synthetic.claim_id(data.count // 2)
+    return lambda: tools.update_claim(target, "DISPATCHED", {"provider": "Bench Towing", "eta_minutes": 20})
+
+
+BENCHMARKS = [
+    Benchmark("calculate_distance", False, _calculate_distance),
+    Benchmark("fallback_problem_analysis", False, _fallback_problem_analysis),
+    Benchmark("detect_human_handoff_request", False, _detect_human_handoff_request),
+    Benchmark("dispatch_logistics_agent", True, _dispatch_logistics_agent),
+    Benchmark("update_claim", True, _update_claim),
+    Benchmark("add_message_to_conversation", True, _add_message_to_conversation),
+    Benchmark("add_messages_to_conversations_x50", True, _add_messages_to_conversations),
+    Benchmark("get_all_cases_for_admin", True, _get_all_cases_for_admin),
+]
+
+
+def measure(fn: Callable[[], Any], max_time: float, min_rounds: int) -> Dict[str, Any]:
+    """Round-based timing; per-call seconds"""
+    started = time.perf_counter()
+    fn()
+    first = time.perf_counter() - started
+    if first >= max_time:
+        times, iterations = [first], 1
+    else:
+        iterations = max(1, int(ROUND_TIME / first)) if first > 0 else 1000
+        times = []
+        started = time.perf_counter()
+        while len(times) < min_rounds or time.perf_counter() - started < max_time:
+            round_started = time.perf_counter()
+            for _ in range(iterations):
+                fn()
+            times.append((time.perf_counter() - round_started) / iterations)
+            # Slow functions: do not insist on min_rounds beyond a multiple of the budget
+            if time.perf_counter() - started >= max_time * min_rounds:
+                break
+    mean = statistics.fmean(times)
+    return {
+        "rounds": len(times),
+        "iterations": iterations,
+        "min_us": round(min(times) * 1e6, 3),
+        "max_us": round(max(times) * 1e6, 3),
+        "mean_us": round(mean * 1e6, 3),
+        "median_us": round(statistics.median(times) * 1e6, 3),
+        "stddev_us": round(statistics.stdev(times) * 1e6, 3) if len(times) > 1 else 0.0,
+        "ops": round(1 / mean, 2) if mean else 0.0
+    }
+
+
+@contextlib.contextmanager
+def dataset_environment(data: Dataset):
+    """Run tools against a scratch copy of the dataset files, with its providers in the default catalog"""
+    scratch = tempfile.mkdtemp(prefix="bench-tools-")
+    for name in (tools.CLAIMS_FILE, tools.CONVERSATIONS_FILE):
+        shutil.copyfile(os.path.join(data.directory, name), os.path.join(scratch, name))
+    previous_cwd = os.getcwd()
+    previous_catalog = catalog.catalogs.get()
+    os.chdir(scratch)
+    catalog.catalogs.install(catalog.build_catalog(
+        previous_catalog.tenant, previous_catalog.policies, data.providers,
+        previous_catalog.location, previous_catalog.policy
+    ))
+    try:
+        yield
+    finally:
+        catalog.catalogs.install(previous_catalog)
+        os.chdir(previous_cwd)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def load_dataset(size: str, seed: int) -> Dataset:
+    directory = synthetic.ensure_dataset(size, seed)
+    with open(os.path.join(directory, "providers.json"), 'r') as f:
+        providers = json.load(f)
+    # Per-message benchmarks cycle through a fixed message sample
+    messages = [conversation["messages"][0]["content"] for conversation in synthetic.generate_conversations(1000, seed)]
+    return Dataset(size, synthetic.SIZES[size], directory, providers, messages)
+
+
+def print_table(results: Dict[str, Dict[str, Dict[str, Any]]], sizes: List[str]):
+    print(f"{'function':<32}" + "".join(f"{size + ' mean':>16}" for size in sizes) + f"{'ops/s (last)':>16}")
+    for name, by_size in results.items():
+        cells = []
+        for index, size in enumerate(sizes):
+            # Size-independent functions are measured once, shown under the first size
+            stats = by_size.get(size) or (by_size.get("-") if index == 0 else None)
+            cells.append(f"{_format_duration(stats['mean_us']):>16}" if stats else f"{'':>16}")
+        last = by_size.get(sizes[-1]) or by_size.get("-")
+        print(f"{name:<32}" + "".join(cells) + f"{last['ops']:>16,.2f}")
+
+
+def _format_duration(microseconds: float) -> str:
+    if microseconds >= 1e6:
+        return f"{microseconds / 1e6:.2f} s"
+    if microseconds >= 1e3:
+        return f"{microseconds / 1e3:.2f} ms"
+    return f"{microseconds:.2f} us"
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]):
+    """Print mean changes per function and size between two result files"""
+    print(f"baseline {baseline.get('commit')} ({baseline.get('timestamp')}) -> current {current.get('commit')} ({current.get('timestamp')})")
+    for name, by_size in current["results"].items():
+        for size, stats in by_size.items():
+            old = baseline["results"].get(name, {}).get(size)
+            if not old:
+                continue
+            change = (stats["mean_us"] - old["mean_us"]) / old["mean_us"] * 100 if old["mean_us"] else 0.0
+            print(f"{name:<32}{size:>6}{_format_duration(old['mean_us']):>14} ->{_format_duration(stats['mean_us']):>12} ({change:+.0f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1k,100k,1m", help=f"comma-separated dataset sizes from {sorted(synthetic.SIZES)}")
+    parser.add_argument("--only", help="comma-separated function names to run")
+    parser.add_argument("--max-time", type=float, default=1.0, help="seconds of rounds per function and size")
+    parser.add_argument("--min-rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="result JSON path (default benchmarks/results/tools-<commit>-<timestamp>.json)")
+    parser.add_argument("--baseline", help="result JSON to compare this run against")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="only compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(load_results(args.compare[0]), load_results(args.compare[1]))
+        return
+
+    sizes = [size.strip().lower() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in synthetic.SIZES]
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(unknown)}")
+    selected = [b for b in BENCHMARKS if not args.only or b.name in args.only.split(",")]
+
+    results: Dict[str, Dict[str, Dict[str, Any]]] = {b.name: {} for b in selected}
+    for index, size in enumerate(sizes):
+        data = load_dataset(size, args.seed)
+        with dataset_environment(data):
+            for bench in selected:
+                if not bench.scales and index > 0:
+                    continue
+                label = size if bench.scales else "-"
+                stats = measure(bench.prepare(data), args.max_time, args.min_rounds)
+                results[bench.name][label] = stats
+                print(f"  {bench.name:<32}{label:>6}{_format_duration(stats['mean_us']):>14}  ({stats['rounds']} rounds)", flush=True)
+
+    print()
+    print_table(results, sizes)
+
+    output_data = {
+        "benchmark": "tools_micro",
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "compare")},
+        "results": results
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"tools-{output_data['commit']}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(output_data, f, indent=2)
+    print(f"results: {output}")
+
+    if args.baseline:
+        compare(load_results(args.baseline), output_data)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,12 @@ import { RealtimeAgent, RealtimeSession } from "@openai/agents/realtime";
 import { tool } from "@openai/agents/realtime";
 import { z } from "zod";
 
+// How long conversation messages are held so a burst goes out in one bulk request
+const MESSAGE_BATCH_DELAY_MS = 250;
+// Status long-poll: how long the server may hold a request, and the pause while the WebSocket is up
+const STATUS_LONG_POLL_SECONDS = 25;
+const STATUS_POLL_IDLE_MS = 3000;
+
 export default function ClientView() {
   const [state, setState] = useState<any>({ step: 0 });
   const [, setStatusMessage] = useState<string>("No updates yet.");
@@ -39,6 +45,22 @@ export default function ClientView() {
   const [isWebSocketConnected, setIsWebSocketConnected] = useState(false);
   const [isHandedOffToHuman, setIsHandedOffToHuman] = useState(false);
   const syncTimeoutRef = useRef<NodeJS.Timeout | null>(null);
+  // History sync: sequence number per message id, and the highest one the backend has stored
+  const syncSeqByIdRef = useRef<Map<string, number>>(new Map());
+  const syncedSeqRef = useRef(0);
+  // Conversation messages waiting to be posted in one bulk request
+  const pendingMessagesRef = useRef<Array<{ conversation_id: string; message_type: string; content: string; sender: string }>>([]);
+  const pendingFlushRef = useRef<NodeJS.Timeout | null>(null);
+  // Status channel of this conversation: sequence number of the last update shown
+  const statusSeqRef = useRef(0);
+  const webSocketOpenRef = useRef(false);
+
+  const applyStatusUpdate = (data: { message?: string | null; seq?: number }) => {
+    if (data?.message && (data.seq ?? 0) > statusSeqRef.current) {
+      statusSeqRef.current = data.seq ?? 0;
+      setStatusMessage(data.message);
+    }
+  };
   const [showConfirmationButtons, setShowConfirmationButtons] = useState(false);
   const [confirmationData, setConfirmationData] = useState<any>(null);
 
@@ -515,6 +537,16 @@ Keep your responses concise and focused on gathering the required information fo
           ws.onopen = () => {
             console.log('Client WebSocket connected');
             setIsWebSocketConnected(true);
+            webSocketOpenRef.current = true;
+            // Catch up on any status published while the socket was down or by another worker
+            const params = new URLSearchParams({
+              conversation_id: conversationIdRef.current ?? '',
+              since: String(statusSeqRef.current)
+            });
+            fetch(`http://localhost:8000/api/get_status?${params}`)
+              .then(res => res.json())
+              .then(applyStatusUpdate)
+              .catch(error => console.error("Failed to fetch status:", error));
           };
 
           ws.onmessage = (event) => {
@@ -547,6 +579,8 @@ Keep your responses concise and focused on gathering the required information fo
                 setTimeout(() => {
                   chatEndRef.current?.scrollIntoView({ behavior: 'smooth' });
                 }, 100);
+              } else if (data.type === 'status_update') {
+                applyStatusUpdate(data);
               }
             } catch (error) {
               console.error('Error parsing WebSocket message:', error);
@@ -556,6 +590,7 @@ Keep your responses concise and focused on gathering the required information fo
           ws.onclose = () => {
             console.log('Client WebSocket disconnected');
             setIsWebSocketConnected(false);
+            webSocketOpenRef.current = false;
             // Attempt to reconnect after 3 seconds if still mounted
             if (isMounted) {
               setTimeout(connectWebSocket, 3000);
@@ -565,6 +600,7 @@ Keep your responses concise and focused on gathering the required information fo
           ws.onerror = (error) => {
             console.error('Client WebSocket error:', error);
             setIsWebSocketConnected(false);
+            webSocketOpenRef.current = false;
           };
         } catch (error) {
           console.error('Failed to connect WebSocket:', error);
@@ -575,19 +611,37 @@ Keep your responses concise and focused on gathering the required information fo
       connectWebSocket();
     };
     
-    const interval = setInterval(async () => {
-      try {
-        const res = await fetch("http://localhost:8000/api/get_status");
-        const data = await res.json();
-        if (data?.message) setStatusMessage(data.message);
-      } catch (error) {
-        console.error("Failed to fetch status:", error);
+    // Status updates arrive over the client WebSocket; while it is down, long-poll instead
+    const pollStatus = async () => {
+      while (isMounted) {
+        if (webSocketOpenRef.current || !conversationIdRef.current) {
+          await new Promise(resolve => setTimeout(resolve, STATUS_POLL_IDLE_MS));
+          continue;
+        }
+        try {
+          const params = new URLSearchParams({
+            conversation_id: conversationIdRef.current,
+            since: String(statusSeqRef.current),
+            wait: String(STATUS_LONG_POLL_SECONDS)
+          });
+          const res = await fetch(`http://localhost:8000/api/get_status?${params}`);
+          applyStatusUpdate(await res.json());
+        } catch (error) {
+          console.error("Failed to fetch status:", error);
+          await new Promise(resolve => setTimeout(resolve, STATUS_POLL_IDLE_MS));
+        }
       }
-    }, 3000);
+    };
+    void pollStatus();
+
+    // Closing the tab does not unmount the component, so queued messages are sent here too
+    const flushOnPageHide = () => { void flushPendingMessages(); };
+    window.addEventListener('pagehide', flushOnPageHide);
 
     return () => {
       isMounted = false;
-      clearInterval(interval);
+      window.removeEventListener('pagehide', flushOnPageHide);
+      void flushPendingMessages();
       // Proper cleanup of WebSocket connection
       if (sessionRef.current) {
         console.log('Cleaning up Realtime session on unmount');
@@ -664,15 +718,25 @@ Keep your responses concise and focused on gathering the required information fo
     }
   };
 
-  // Sync complete conversation history to backend
-  const syncConversationHistory = async (messages: typeof chatMessages) => {
+  // Sync new conversation history to backend: each message gets a sequence number the
+  // first time it is seen, and only messages past the backend's high-water mark are sent.
+  // If the backend has less than we think (its record was replaced), send again from its mark.
+  const syncConversationHistory = async (messages: typeof chatMessages, resyncing = false) => {
     if (!conversationIdRef.current) return;
     
     try {
-      // Filter out the initial greeting and prepare messages for backend
+      const seqById = syncSeqByIdRef.current;
       const messagesToSync = messages
         .filter(message => message.id !== 'initial')
-        .map(message => ({
+        .map(message => {
+          if (!seqById.has(message.id)) {
+            seqById.set(message.id, seqById.size + 1);
+          }
+          return { message, seq: seqById.get(message.id)! };
+        })
+        .filter(({ seq }) => seq > syncedSeqRef.current)
+        .map(({ message, seq }) => ({
+          seq,
           timestamp: message.timestamp.toISOString(),
           type: message.type === 'user' ? 'user' : 
                 message.type === 'agent' ? 'agent' : 'system',
@@ -680,39 +744,71 @@ Keep your responses concise and focused on gathering the required information fo
           sender: message.type === 'user' ? 'Customer' : 
                  message.type === 'agent' ? 'AI Agent' : 'System'
         }));
+      if (messagesToSync.length === 0) return;
 
-      // Sync complete conversation history using the new endpoint
-      await fetch(`http://localhost:8000/api/admin/conversations/${conversationIdRef.current}/sync_history`, {
+      const response = await fetch(`http://localhost:8000/api/admin/conversations/${conversationIdRef.current}/sync_history`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({
           messages: messagesToSync,
+          base_seq: syncedSeqRef.current,
           customer_name: state?.collected?.customer_name || "Customer",
           problem_type: state?.collected?.problem_type || "Roadside Assistance"
         }),
       });
+      if (response.ok) {
+        const result = await response.json();
+        const serverSeq = result.sync_seq ?? 0;
+        if (result.resync || serverSeq < syncedSeqRef.current) {
+          syncedSeqRef.current = serverSeq;
+          if (!resyncing) {
+            await syncConversationHistory(messages, true);
+          }
+          return;
+        }
+        syncedSeqRef.current = serverSeq;
+      }
       
-      console.log(`Synced ${messagesToSync.length} messages to backend`);
+      console.log(`Synced ${messagesToSync.length} new messages to backend`);
     } catch (error) {
       console.error('Failed to sync conversation history:', error);
     }
   };
 
-  const addMessageToConversation = async (type: string, content: string) => {
-    if (!conversationIdRef.current) return;
+  // Messages are queued and posted together to the bulk endpoint, one request (and one
+  // storage write) per burst instead of one per message
+  const flushPendingMessages = async () => {
+    if (pendingFlushRef.current) {
+      clearTimeout(pendingFlushRef.current);
+      pendingFlushRef.current = null;
+    }
+    const batch = pendingMessagesRef.current.splice(0);
+    if (batch.length === 0) return;
     
     try {
-      await fetch(`http://localhost:8000/api/admin/conversations/${conversationIdRef.current}/message`, {
+      await fetch("http://localhost:8000/api/admin/conversations/messages", {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({
-          message_type: type,
-          content: content,
-          sender: type === "user" ? "Customer" : "AI Agent"
-        }),
+        body: JSON.stringify({ messages: batch }),
+        // Lets the request finish when it is sent as the page unloads
+        keepalive: true,
       });
     } catch (error) {
-      console.error('Failed to add message to conversation:', error);
+      console.error('Failed to add messages to conversation:', error);
+    }
+  };
+
+  const addMessageToConversation = async (type: string, content: string) => {
+    if (!conversationIdRef.current) return;
+    
+    pendingMessagesRef.current.push({
+      conversation_id: conversationIdRef.current,
+      message_type: type,
+      content: content,
+      sender: type === "user" ? "Customer" : "AI Agent"
+    });
+    if (!pendingFlushRef.current) {
+      pendingFlushRef.current = setTimeout(flushPendingMessages, MESSAGE_BATCH_DELAY_MS);
     }
   };
 
@@ -851,8 +947,8 @@ Keep your responses concise and focused on gathering the required information fo
       }
     }
 
-    // Track the user message (chat will be updated via history_updated event)
-    await addMessageToConversation("user", text);
+    // The message reaches the conversation record through the history sync (it is part of
+    // the session history), so it is not posted separately
     
     // Send text message through RealtimeSession using sendMessage method
     try {
@@ -883,7 +979,7 @@ Keep your responses concise and focused on gathering the required information fo
     const res = await fetch("http://localhost:8000/api/process_claim", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ conversation_state: state }),
+      body: JSON.stringify({ conversation_state: state, conversation_id: conversationIdRef.current }),
     });
     const data = await res.json();
     localStorage.setItem("copilot_analysis", JSON.stringify(data));
@@ -949,6 +1045,7 @@ Keep your responses concise and focused on gathering the required information fo
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ 
         conversation_state: state,
+        conversation_id: conversationIdRef.current,
         help_confirmed: helpConfirmed,
         cab_requested: cabRequested
       }),